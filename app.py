@@ -1,44 +1,328 @@
-from flask import Flask, render_template, request, jsonify, session
-import requests
+from flask import Flask, render_template, request, jsonify, session, Response
 from flask_socketio import SocketIO, join_room, leave_room
 import threading
 import time
-import json
+import os
 import uuid
 from collections import defaultdict
 import sys # For sys.exit
-import re # Import regular expressions module
 import random # Import random module
+import bisect
+from contextlib import nullcontext
 
 # Import the Docker initialization script
-from initialize_docker import initialize_ollama_services, list_models_in_container, pull_model_in_container as pull_docker_model, delete_model_from_container, DEFAULT_MODEL_NAME
+from initialize_docker import initialize_ollama_services, pull_model_in_container as pull_docker_model, delete_model_from_container, DEFAULT_MODEL_NAME, CONTAINERS_CONFIG, container_base_url
+import ollama_client
+from streaming import ChunkCoalescer, ThoughtFilter, CancelToken, THOUGHT_MODES, THOUGHT_MODE
+from scheduler import GenerationScheduler
+from backends import BackendRegistry
+from model_inventory import ModelInventory
+from session_store import SessionStore
+from locks import InstrumentedLock, LockStripes
+import persistence
+import atexit
+from residency import ResidencyManager, OLLAMA_MAX_LOADED_MODELS, keep_alive_for
+import context_window
+from generation_cache import GenerationCache, cache_key, replay
+from generation_options import GenerationBudget, parse_request_options, role_options, NUMERIC_OPTIONS
+import metrics
+from messages import Message, Role, speaker_label, stream_message_id
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'llm-debate-secret-key'  # Needed for session management
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
 
 DEFAULT_MAX_TURNS = 1 # Default number of exchanges
+# Older turns are summarized (see context_window.py), so long debates keep a bounded prompt
+MAX_DEBATE_TURNS = int(os.environ.get("MAX_DEBATE_TURNS", "20"))
 
+# How a debater's turn carries the debate so far:
+#   "chat"   - the full transcript as /api/chat messages; the prefix is identical from turn to turn,
+#              so Ollama reuses its KV cache and only the newest messages are prefilled
+#   "window" - the last three messages pasted into a stateless /api/generate prompt (legacy behaviour)
+CONTEXT_MODES = ("chat", "window")
+DEBATE_CONTEXT_MODE = os.environ.get("DEBATE_CONTEXT_MODE", "chat")
+if DEBATE_CONTEXT_MODE not in CONTEXT_MODES:
+    DEBATE_CONTEXT_MODE = "chat"
+
+EVALUATOR_MODEL = os.environ.get("EVALUATOR_MODEL", DEFAULT_MODEL_NAME)  # Judge model that picks the winner
+DEBATE_SEED = os.environ.get("DEBATE_SEED", "")  # Default sampling seed of new debates; empty samples randomly
+
+# The first two configured instances back the "For" (ollama1) and "Against" (ollama2) panels
+# of the UI and are each side's preferred instance. Turns are routed to whichever healthy
+# instance with the model is least loaded, so extra instances in CONTAINERS_CONFIG add capacity.
 # For LLM -> Ollama Instance 1 (ollama, port 3001)
 # Against LLM -> Ollama Instance 2 (ollama2, port 3002)
-OLLAMA_FOR_URL = "http://localhost:3001/api/generate" # Instance 1 for "For"
-OLLAMA_AGAINST_URL = "http://localhost:3002/api/generate" # Instance 2 for "Against"
+_FOR_CONTAINER_CONFIG = CONTAINERS_CONFIG[0]
+_AGAINST_CONTAINER_CONFIG = CONTAINERS_CONFIG[1] if len(CONTAINERS_CONFIG) > 1 else CONTAINERS_CONFIG[0]
+
+OLLAMA_FOR_BASE_URL = container_base_url(_FOR_CONTAINER_CONFIG)
+OLLAMA_AGAINST_BASE_URL = container_base_url(_AGAINST_CONTAINER_CONFIG)
 
-# Helper to get base URLs for API calls like delete, show, etc.
-OLLAMA_FOR_BASE_URL = OLLAMA_FOR_URL.replace("/api/generate", "")
-OLLAMA_AGAINST_BASE_URL = OLLAMA_AGAINST_URL.replace("/api/generate", "")
+OLLAMA_FOR_CONTAINER_NAME = _FOR_CONTAINER_CONFIG["name"]
+OLLAMA_AGAINST_CONTAINER_NAME = _AGAINST_CONTAINER_CONFIG["name"]
 
-OLLAMA_FOR_CONTAINER_NAME = "ollama"
-OLLAMA_AGAINST_CONTAINER_NAME = "ollama2"
+# Instance names used by the UI panels
+UI_INSTANCE_ALIASES = {"ollama1": OLLAMA_FOR_CONTAINER_NAME, "ollama2": OLLAMA_AGAINST_CONTAINER_NAME}
 
-sessions = {}
-session_lock = threading.Lock()
+# Per-session state is guarded by the session's lock stripe (session_locks.for_key(session_id));
+# session_lock only guards flask_to_socketio_map and is never held across I/O
+session_locks = LockStripes()
+session_lock = InstrumentedLock()
 flask_to_socketio_map = {}
+socket_sessions = {}  # Socket id -> the debate session it is attached to (guarded by session_lock)
+
+def is_session_pinned(session_data):
+    """Running debates and evaluations are never evicted from the session store."""
+    return session_data['active'] or session_data.get('evaluating', False)
+
+def forget_evicted_session(session_id, session_data, reason):
+    """Drops the browser mapping of a session evicted from the store."""
+    flask_session_id = session_data.get('flask_session_id')
+    with session_lock:
+        if flask_session_id and flask_to_socketio_map.get(flask_session_id) == session_id:
+            del flask_to_socketio_map[flask_session_id]
+    print(f"Evicted session {session_id} ({reason}).")
+
+# Durable copy of every session and message (SQLite by default, see persistence.py)
+session_backend = persistence.create_backend()
+atexit.register(session_backend.close)
+
+def new_session_data(flask_session_id=None):
+    default_topic = "God's existence"
+    return {
+        'conversation': [],
+        'summary': new_summary(),
+        'active': False,
+        'topic': default_topic,
+        'for_position_label': f"For {default_topic}",
+        'against_position_label': f"Against {default_topic}",
+        'flask_session_id': flask_session_id,
+        'selected_for_model': DEFAULT_MODEL_NAME,
+        'selected_against_model': DEFAULT_MODEL_NAME,
+        'max_turns': DEFAULT_MAX_TURNS, # Add default max_turns
+        'thought_mode': THOUGHT_MODE, # What clients see of <think> blocks (see streaming.py)
+        'seed': parse_seed(DEBATE_SEED), # Sampling seed of the debate's generations, None for random
+        'generation_options': {}, # Per-role overrides of the Ollama options (see generation_options.py)
+        'evaluation_transcript': [], # Cleaned transcript lines for the evaluator, built as messages arrive
+        'next_seq': 1, # Sequence number of the next message
+        'conversation_epoch': 1 # Bumped whenever the conversation is cleared
+    }
+
+def load_persisted_session(session_id):
+    """Rebuilds a session that is not in memory from the durable store; its debate is not running."""
+    stored = session_backend.load_session(session_id)
+    if stored is None:
+        return None
+    settings, messages = stored
+    session_data = session_from_settings(settings)
+    labels = session_labels(session_data)
+    session_data['conversation'] = [Message.from_dict(entry, labels) for entry in messages]
+    session_data['evaluation_transcript'] = [line for line in map(evaluation_line, session_data['conversation']) if line]
+    if messages:
+        # Settings are saved less often than messages are appended
+        session_data['next_seq'] = max(session_data['next_seq'], messages[-1]['seq'] + 1)
+    return session_data
+
+def stored_session_view(session_id):
+    """Settings of a session that is not in memory, read from the durable store without its messages; None if unknown."""
+    settings = session_backend.load_settings(session_id)
+    return None if settings is None else session_from_settings(settings)
+
+def session_from_settings(settings):
+    session_data = new_session_data(settings.get('flask_session_id'))
+    session_data.update(settings)
+    return session_data
+
+def stored_messages_since(session_id, session_data, since):
+    """Like messages_since, for a session that is not in memory (session_data from stored_session_view)."""
+    labels = session_labels(session_data)
+    thoughts = session_data.get('thought_mode') == "show"
+    return [Message.from_dict(entry, labels).to_dict(labels, thoughts) for entry in session_backend.get_messages(session_id, since) or ()]
+
+def session_labels(session_data):
+    """The (for_label, against_label) that message roles are displayed as."""
+    return session_data['for_position_label'], session_data['against_position_label']
+
+def persist_session(session_id, session_data):
+    """Queues a write of the session's settings (call with the session's lock held so the snapshot is consistent)."""
+    session_backend.save_session(session_id, persistence.session_settings(session_data))
+
+# Only hot sessions stay in memory, bounded by idle TTL, session count and transcript size
+# (see session_store.py); the rest are loaded back from session_backend on demand
+sessions = SessionStore(session_locks.for_key, is_session_pinned, on_evict=forget_evicted_session, loader=load_persisted_session)
 
 # Global flag to indicate if a long Ollama operation (pull/delete) is in progress
 is_long_ollama_operation_active = False
 long_op_lock = threading.Lock()
 
+class ThreadingRuntime:
+    """Default execution mode: Flask-SocketIO threading server with one OS thread per debate."""
+
+    def emit(self, event, data, room=None):
+        socketio.emit(event, data, room=room)
+
+    def start_debate(self, session_id):
+        self._spawn(conversation_loop, session_id)
+
+    def start_evaluation(self, session_id):
+        self._spawn(evaluate_debate, session_id)
+
+    @staticmethod
+    def _spawn(target, session_id):
+        thread = threading.Thread(target=target, args=(session_id,))
+        thread.daemon = True
+        thread.start()
+
+# Replaced by async_app.AsyncioRuntime when the server runs in asyncio mode
+runtime = ThreadingRuntime()
+
+def emit(event, data, room=None):
+    """Emits a Socket.IO event through the active execution mode."""
+    emits_total.inc(event=event)
+    runtime.emit(event, data, room=room)
+
+# Bounds concurrent generations per Ollama instance and reports queue positions to waiting sessions
+scheduler = GenerationScheduler(on_queue_update=lambda session_id, payload: emit('queue_status', payload, room=session_id))
+
+backend_registry = BackendRegistry(scheduler)
+for _container_config in CONTAINERS_CONFIG:
+    backend_registry.register(
+        _container_config["name"],
+        container_base_url(_container_config),
+        max_in_flight=_container_config.get("max_in_flight"),
+        max_loaded_models=_container_config.get("max_loaded_models", OLLAMA_MAX_LOADED_MODELS)
+    )
+
+def resolve_backend(instance_name):
+    """Maps a UI instance name (ollama1/ollama2) or a container name to its registered backend."""
+    return backend_registry.get(UI_INSTANCE_ALIASES.get(instance_name, instance_name))
+
+# Cached /api/tags model lists per instance; also keeps the routing registry's inventory current
+model_inventory = ModelInventory(backend_registry)
+
+# Loaded models per instance (/api/ps), preloading and evaluator placement
+residency_manager = ResidencyManager(backend_registry)
+generation_cache = GenerationCache()
+
+# Prometheus-style metrics, served at /metrics (see metrics.py)
+emits_total = metrics.registry.counter("socketio_emits_total", "Socket.IO events emitted to clients.", ("event",))
+generations_total = metrics.registry.counter("ollama_generations_total", "Generations by outcome: completed, truncated, stopped, error or cached.", ("model", "backend", "outcome"))
+generation_ttft_seconds = metrics.registry.histogram("ollama_ttft_seconds", "Time from sending a generation request to its first token.", ("model", "backend"))
+generation_tokens_per_second = metrics.registry.histogram("ollama_tokens_per_second", "Decode speed of finished generations (eval_count / eval_duration).", ("model", "backend"), metrics.TOKENS_PER_SECOND_BUCKETS)
+prompt_eval_seconds = metrics.registry.histogram("ollama_prompt_eval_seconds", "Prompt processing time of finished generations (prompt_eval_duration).", ("model", "backend"))
+model_load_seconds = metrics.registry.histogram("ollama_load_seconds", "Model load time of finished generations (load_duration); large values are cold loads.", ("model", "backend"))
+generated_tokens_total = metrics.registry.counter("ollama_generated_tokens_total", "Tokens generated (eval_count).", ("model", "backend"))
+prompt_tokens_total = metrics.registry.counter("ollama_prompt_tokens_total", "Prompt tokens evaluated (prompt_eval_count).", ("model", "backend"))
+generation_cancel_seconds = metrics.registry.histogram("ollama_cancel_seconds", "Time from a stop, reset or disconnect until the cancelled generation freed its slot.", ("reason",), metrics.CANCEL_BUCKETS)
+
+def backend_label(base_url):
+    backend = backend_registry.by_url(base_url)
+    return backend.name if backend is not None else base_url
+
+def note_first_token(base_url, model, seconds):
+    generation_ttft_seconds.observe(seconds, model=model, backend=backend_label(base_url))
+
+def note_generation_done(base_url, model, chunk):
+    """Records the timings Ollama reports with the final chunk of a generation (durations in ns)."""
+    backend_registry.record_throughput(base_url, chunk.get('eval_count'), chunk.get('eval_duration'))
+    labels = {"model": model, "backend": backend_label(base_url)}
+    eval_count = chunk.get('eval_count') or 0
+    eval_duration = chunk.get('eval_duration') or 0
+    generated_tokens_total.inc(eval_count, **labels)
+    prompt_tokens_total.inc(chunk.get('prompt_eval_count') or 0, **labels)
+    if eval_count and eval_duration:
+        generation_tokens_per_second.observe(eval_count / (eval_duration / 1e9), **labels)
+    if chunk.get('prompt_eval_duration') is not None:
+        prompt_eval_seconds.observe(chunk['prompt_eval_duration'] / 1e9, **labels)
+    if chunk.get('load_duration') is not None:
+        model_load_seconds.observe(chunk['load_duration'] / 1e9, **labels)
+
+def _ns_to_ms(nanoseconds):
+    return round(nanoseconds / 1e6) if nanoseconds is not None else None
+
+def generation_stats(base_url, model, chunk, ttft_seconds):
+    """Stats of one reply, stored with its message: token counts and timings from Ollama's final chunk."""
+    eval_count = chunk.get('eval_count') or 0
+    eval_duration = chunk.get('eval_duration') or 0
+    return {
+        "model": model,
+        "backend": backend_label(base_url),
+        "prompt_tokens": chunk.get('prompt_eval_count'),
+        "tokens": chunk.get('eval_count'),
+        "tokens_per_second": round(eval_count / (eval_duration / 1e9), 1) if eval_count and eval_duration else None,
+        "ttft_ms": round(ttft_seconds * 1000) if ttft_seconds is not None else None,  # Includes a model load
+        "load_ms": _ns_to_ms(chunk.get('load_duration')),
+        "prompt_ms": _ns_to_ms(chunk.get('prompt_eval_duration')),
+        "eval_ms": _ns_to_ms(chunk.get('eval_duration')),
+        "total_ms": _ns_to_ms(chunk.get('total_duration')),
+    }
+
+def truncated_stats(base_url, model, tokens, requested_at, ttft_seconds, cap):
+    """Stats of a reply cut off at a hard cap, which never got Ollama's final chunk; timings are measured here."""
+    elapsed = time.monotonic() - requested_at
+    chunk = {"eval_count": tokens, "eval_duration": int((elapsed - (ttft_seconds or 0)) * 1e9), "total_duration": int(elapsed * 1e9)}
+    return {**generation_stats(base_url, model, chunk, ttft_seconds), "truncated": cap}
+
+def note_generation_outcome(base_url, model, outcome):
+    generations_total.inc(model=model, backend=backend_label(base_url), outcome=outcome)
+
+def _lock_metric(field):
+    return lambda: {("session_stripes",): session_locks.stats()[field], ("session_map",): session_lock.stats()[field]}
+
+metrics.registry.callback("ollama_in_flight_generations", "Generations running per Ollama instance.",
+                          lambda: {(backend.name,): scheduler.in_flight(backend.base_url) for backend in backend_registry.all()}, ("backend",))
+metrics.registry.callback("ollama_queued_generations", "Generations waiting for a slot per Ollama instance.",
+                          lambda: {(backend.name,): scheduler.load(backend.base_url) - scheduler.in_flight(backend.base_url) for backend in backend_registry.all()}, ("backend",))
+metrics.registry.callback("debate_active_debates", "Debates running.", lambda: {(): sum(1 for session_data in sessions.values() if session_data['active'])})
+metrics.registry.callback("debate_running_evaluations", "Evaluations running.", lambda: {(): sum(1 for session_data in sessions.values() if session_data.get('evaluating'))})
+metrics.registry.callback("debate_sessions_in_memory", "Sessions held in the in-memory session store.", lambda: {(): len(sessions)})
+metrics.registry.callback("debate_lock_wait_seconds_total", "Time spent waiting for session locks.", _lock_metric("wait_seconds"), ("lock",), kind="counter")
+metrics.registry.callback("debate_lock_contended_total", "Session lock acquisitions that had to wait.", _lock_metric("contended"), ("lock",), kind="counter")
+metrics.registry.callback("generation_cache_lookups_total", "Generation cache lookups by result.",
+                          lambda: {("hit",): generation_cache.counters["hits"], ("miss",): generation_cache.counters["misses"]}, ("result",), kind="counter")
+
+# With OLLAMA_BACKGROUND_INIT=1 the web server starts at once while the containers come up
+# concurrently in the background; clients receive 'backend_status' events until all are ready.
+OLLAMA_BACKGROUND_INIT = os.environ.get("OLLAMA_BACKGROUND_INIT", "0").lower() in ("1", "true", "yes")
+
+backend_init_status = {}  # container name -> starting / waiting_for_api / pulling_model / ready / failed
+backend_init_running = False
+
+def backend_status_payload():
+    return {"initializing": backend_init_running, "backends": dict(backend_init_status)}
+
+def report_backend_status(container_name, status):
+    """Records an instance's initialization progress and broadcasts it."""
+    backend_init_status[container_name] = status
+    backend = backend_registry.get(container_name)
+    if backend is not None:
+        backend.ready = status == "ready"
+        if backend.ready:
+            model_inventory.refresh(backend)
+            residency_manager.refresh(backend)
+    emit('backend_status', backend_status_payload())
+
+def start_background_initialization():
+    """Brings the Ollama containers up in a background thread while the server already accepts clients."""
+    global backend_init_running
+    backend_init_running = True
+    for backend in backend_registry.all():
+        backend.ready = False
+        backend_init_status[backend.name] = "pending"
+
+    def run():
+        global backend_init_running
+        all_successful = initialize_ollama_services(on_status=report_backend_status)
+        backend_init_running = False
+        emit('backend_status', backend_status_payload())
+        if not all_successful:
+            print("Some Ollama instances failed to initialize; debates will use the instances that are ready.")
+
+    init_thread = threading.Thread(target=run)
+    init_thread.daemon = True
+    init_thread.start()
+
 USER_SPECIFIED_PULLABLE_MODELS = ["qwen3:4b", "llama3.2:3b", "qwen2.5vl:3b"]
 PULLABLE_MODELS_LIST = [m for m in USER_SPECIFIED_PULLABLE_MODELS if m != DEFAULT_MODEL_NAME]
 
@@ -47,377 +331,901 @@ def generate_system_prompts(topic):
     against_prompt = f"You are strongly opposed and will always argue AGAINST {topic}. Present compelling arguments opposing this position."
     return for_prompt, against_prompt
 
-def generate_response(prompt, session_id, for_model_name, against_model_name, is_for_position=True):
-    """Get a response from one of the Ollama instances using streaming"""
-    with session_lock:
-        if session_id not in sessions:
-            return "Session expired"
+def is_session_live(session_id, require_active=True):
+    """True while a session exists (and, if require_active, its debate has not been stopped)."""
+    session_data = sessions.get(session_id)
+    return session_data is not None and (not require_active or session_data['active'])
+
+# Cancellation token of each session's in-flight generation: session_id -> (scope, token).
+# The scope is "debate" for turns and "evaluation" for the verdict, which outlives the debate.
+generation_tokens = {}
+
+def open_cancel_token(session_id, scope):
+    """Registers the token of a generation that is about to start.
+
+    A stop that lands between the turn's request being built and its token being registered
+    finds no token to cancel, so a debate turn's token starts out cancelled if its debate is
+    no longer active.
+    """
+    token = CancelToken()
+    with session_locks.for_key(session_id):
+        session_data = sessions.get(session_id)
+        if scope == "debate" and (session_data is None or not session_data['active']):
+            token.cancel("stop")
+        generation_tokens[session_id] = (scope, token)
+    return token
+
+def close_cancel_token(session_id, token):
+    with session_locks.for_key(session_id):
+        if generation_tokens.get(session_id, (None, None))[1] is token:
+            del generation_tokens[session_id]
+
+def cancel_generation(session_id, reason, scopes=("debate", "evaluation")):
+    """Cancels the session's in-flight generation; its upstream connection is dropped at once so Ollama stops generating.
+
+    Must not be called while holding the session's lock.
+    """
+    with session_locks.for_key(session_id):
+        scope, token = generation_tokens.get(session_id, (None, None))
+    if token is not None and scope in scopes:
+        token.cancel(reason)
+
+def note_cancelled(token):
+    """Records how long a cancelled generation held its slot after the cancel."""
+    generation_cancel_seconds.observe(time.monotonic() - token.cancelled_at, reason=token.reason)
+
+def session_thought_mode(session_id):
+    with session_locks.for_key(session_id):
+        session_data = sessions.get(session_id)
+        return session_data.get('thought_mode', THOUGHT_MODE) if session_data is not None else THOUGHT_MODE
+
+def session_generation_options(session_id, role):
+    """Ollama options of the session's next generation by role ("for", "against" or "evaluator")."""
+    with session_locks.for_key(session_id):
+        session_data = sessions.get(session_id)
+        if session_data is None:
+            return role_options(role)
+        return role_options(role, session_data.get('generation_options'), session_data.get('seed'))
+
+def parse_seed(value):
+    """Sampling seed from a request or DEBATE_SEED: an integer, or None for random sampling."""
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+class GenerationStream:
+    """Per-chunk state of one streamed generation, shared by the threading and asyncio runtimes.
+
+    Parses the NDJSON chunks, accumulates the reply in a list buffer, filters <think> blocks as
+    they stream (streaming.ThoughtFilter; the session's thought mode decides whether clients get
+    them), coalesces tokens into fewer emits (streaming.ChunkCoalescer), records TTFT and stats
+    and enforces the GenerationBudget. It does no I/O: each method returns the (event, payload)
+    pairs to emit to the session's room, and the runtime's driver reads the chunks, sends the
+    events and drops the connection when told to.
+    """
+
+    def __init__(self, session_id, speaker, base_url, data, message_id, error_prefix, token, cached=None):
+        self.session_id = session_id
+        self.speaker = speaker
+        self.base_url = base_url
+        self.model = data['model']
+        self.keep_alive = data.get('keep_alive')
+        self.message_id = message_id
+        self.error_prefix = error_prefix
+        self.token = token
+        self.cached = cached is not None
+        self.thought_mode = session_thought_mode(session_id)
+        self.response_parts = []
+        self.coalescer = ChunkCoalescer()
+        self.thought_filter = ThoughtFilter()
+        self.done_sent = False
+        self.completed = False
+        self.ended = False  # Set once the driver should stop reading chunks
+        self.first_token_pending = cached is None
+        self.requested_at = time.monotonic()
+        self.ttft_seconds = None
+        self.stats = {"model": self.model, "cached": True} if cached is not None else None
+        self.budget = GenerationBudget() if cached is None else None
+        self.truncated = None  # The cap a reply was cut off at; the driver then closes the response
+        self.error = None
+
+    def _live(self):
+        # Dict membership is atomic, so this liveness check needs no lock
+        return self.session_id in sessions
+
+    def _message(self, text, done):
+        payload = {"speaker": self.speaker, "message": text, "message_id": self.message_id, "done": done}
+        if self.thought_mode == "show":
+            # The mode the stream was started with; the client's select may have changed since
+            payload["thoughts"] = True
+        return ('stream_message', payload)
+
+    def begin(self):
+        return [('typing_indicator', {"speaker": self.speaker, "typing": True})]
+
+    def connected(self, abort):
+        """The upstream reply is streaming; abort drops its connection.
+
+        Registers abort with the cancel token and returns the seconds left until the time cap,
+        or None: the driver arms a timer that calls budget.expire(abort) then.
+        """
+        backend_registry.mark_healthy(self.base_url)
+        residency_manager.note_loaded(self.base_url, self.model, self.keep_alive)
+        self.token.on_abort(abort)
+        return self.budget.seconds_left()
+
+    def feed(self, chunk):
+        events = []
+        done = chunk.get('done', False)
+        chunk_text = ollama_client.chunk_text(chunk)
+        if self.first_token_pending and chunk_text:
+            self.ttft_seconds = time.monotonic() - self.requested_at
+            note_first_token(self.base_url, self.model, self.ttft_seconds)
+            self.first_token_pending = False
+        if done and not self.cached:
+            note_generation_done(self.base_url, self.model, chunk)
+            self.stats = generation_stats(self.base_url, self.model, chunk, self.ttft_seconds)
+        if chunk_text is not None:
+            if self.token.cancelled or not self._live():
+                self.ended = True
+                return events
+            self.response_parts.append(chunk_text)
+            was_thinking = self.thought_filter.thinking
+            visible_text = self.thought_filter.feed(chunk_text)
+            if self.thought_mode != "show":
+                chunk_text = visible_text + (self.thought_filter.finish() if done else "")
+            if self.thought_mode == "status" and self.thought_filter.thinking != was_thinking:
+                # Deliver the text before the block, then the status change
+                pending_text = self.coalescer.flush()
+                if pending_text:
+                    events.append(self._message(pending_text, False))
+                events.append(('thinking', {"speaker": self.speaker, "message_id": self.message_id, "thinking": self.thought_filter.thinking}))
+            # Batch tokens into fewer emits; the final chunk always flushes
+            pending_text = self.coalescer.add(chunk_text, force=done)
+            if pending_text is not None:
+                events.append(self._message(pending_text, done))
+                self.done_sent = done
+        if done:
+            self.completed = self._live()
+            self.ended = True
+            return events
+        self.truncated = self.budget.note_chunk() if self.budget is not None else None
+        if self.truncated:
+            # Hard cap reached: the driver stops reading and drops the connection, so Ollama stops generating
+            self._cut_off()
+            self.ended = True
+        return events
+
+    def _cut_off(self):
+        print(f"Cut off {self.model} on {self.base_url} at the {self.truncated} cap after {self.budget.tokens} tokens.")
+        self.stats = truncated_stats(self.base_url, self.model, self.budget.tokens, self.requested_at, self.ttft_seconds, self.truncated)
+
+    def end_of_stream(self):
+        """Stream ended without a 'done' chunk: delivers what is still buffered."""
+        if self.error is not None or self.done_sent or not self._live():
+            return []
+        held_text = self.thought_filter.finish()
+        return [self._message(self.coalescer.flush() + (held_text if self.thought_mode != "show" else ""), True)]
+
+    def fail(self, message):
+        """The generation failed; the error message becomes the reply."""
+        self.error = f"{self.error_prefix}: {message}"
+        note_generation_outcome(self.base_url, self.model, "error")
+        return [self._message(self.error, True)] if self._live() else []
+
+    def broken(self, e):
+        """The stream raised e: an error, unless the connection was dropped on purpose."""
+        if self.token.cancelled or (self.budget is not None and self.budget.expired):
+            return [self._message(self.coalescer.flush(), True)] if self._live() else []
+        if ollama_client.is_connection_error(e):
+            backend_registry.mark_unhealthy(self.base_url)
+        return self.fail(str(e))
+
+    def finish(self):
+        """Records the outcome once the stream is over."""
+        if self.error is not None:
+            return []
+        if self.budget is not None and self.budget.expired and not self.completed and not self.truncated:
+            # The deadline timer dropped the connection while no chunk arrived
+            self.truncated = self.budget.expired
+            self._cut_off()
+        note_generation_outcome(self.base_url, self.model, "cached" if self.cached else "completed" if self.completed else "truncated" if self.truncated else "stopped")
+        self.thought_filter.finish()
+        return [('typing_indicator', {"speaker": self.speaker, "typing": False})] if self._live() else []
+
+    def text(self):
+        return "".join(self.response_parts)
+
+    def result(self):
+        """(text, clean_text, stats): the reply with and without <think> blocks, and its stats."""
+        if self.error is not None:
+            return self.error, self.error, None
+        return self.text(), self.thought_filter.clean_text(), self.stats
+
+def emit_events(session_id, events):
+    for event, payload in events:
+        emit(event, payload, room=session_id)
+
+def stream_generation(session_id, speaker, base_url, path, data, message_id, error_prefix="Error", require_active=True):
+    """Waits for a generation slot on the backend, then streams the generation.
+
+    A reply found in the generation cache is replayed instead, without taking a slot.
+    Returns (text, clean_text, stats): the reply with and without <think> blocks, and its
+    generation stats (None if unavailable); the texts are empty if the debate is stopped while
+    its turn is still queued.
+    """
+    token = open_cancel_token(session_id, "debate" if require_active else "evaluation")
+    try:
+        if token.cancelled:
+            return "", "", None
+        key = cache_key(path, data) if generation_cache.enabled else None
+        cached = generation_cache.get(key) if key else None
+        if cached is not None:
+            return _stream_generation(session_id, speaker, base_url, path, data, message_id, error_prefix, token, cached=cached)
+        if not scheduler.acquire(base_url, session_id, lambda: not token.cancelled and is_session_live(session_id, require_active)):
+            return "", "", None
+        started_at = time.monotonic()
+        try:
+            return _stream_generation(session_id, speaker, base_url, path, data, message_id, error_prefix, token, key=key)
+        finally:
+            scheduler.release(base_url, time.monotonic() - started_at)
+            if token.cancelled:
+                note_cancelled(token)
+    finally:
+        close_cancel_token(session_id, token)
+
+def _stream_generation(session_id, speaker, base_url, path, data, message_id, error_prefix, token, key=None, cached=None):
+    """Streams one Ollama generation to the session's room and returns (text, clean_text, stats).
+
+    The threading driver of GenerationStream: reads the NDJSON stream, or replays cached, and
+    emits the events it returns, without sleeping or taking the session's lock. Cancelling
+    token (a stop, reset or disconnect) or reaching the time cap shuts the upstream connection
+    down, which ends the stream at once. A completed generation is stored in the cache under key.
+    """
+    stream = GenerationStream(session_id, speaker, base_url, data, message_id, error_prefix, token, cached)
+    emit_events(session_id, stream.begin())
+    deadline_timer = None
+    try:
+        with (ollama_client.stream_post(base_url, path, data) if cached is None else nullcontext()) as response:
+            if cached is not None:
+                chunks = replay(cached)
+            elif response.status_code != 200:
+                emit_events(session_id, stream.fail(f"{response.status_code} - {response.text}"))
+                return stream.result()
+            else:
+                abort = lambda: ollama_client.abort_stream(response)
+                seconds_left = stream.connected(abort)
+                if seconds_left is not None:
+                    # Ends the reply at the deadline even if Ollama stalls between chunks
+                    deadline_timer = threading.Timer(seconds_left, stream.budget.expire, args=(abort,))
+                    deadline_timer.daemon = True
+                    deadline_timer.start()
+                chunks = ollama_client.iter_stream_chunks(response)
+            for chunk in chunks:
+                emit_events(session_id, stream.feed(chunk))
+                if stream.ended:
+                    break
+            if stream.truncated:
+                response.close()
+            emit_events(session_id, stream.end_of_stream())
+    except Exception as e:
+        emit_events(session_id, stream.broken(e))
+    finally:
+        if deadline_timer is not None:
+            deadline_timer.cancel()
+
+    emit_events(session_id, stream.finish())
+    if stream.completed and key:
+        generation_cache.put(key, stream.text())
+    return stream.result()
+
+def new_summary():
+    """Rolling summary state of a session: summary text of conversation[:covered]."""
+    return {"text": "", "covered": 0}
+
+def with_summary(system_prompt, summary):
+    if not summary["text"]:
+        return system_prompt
+    return f"{system_prompt}\n\nSummary of the debate so far:\n{summary['text']}"
+
+def build_turn_prompt(conversation, topic, summary, budget_tokens):
+    """Builds the prompt for the next debater turn from the summary and the most recent messages that fit the budget."""
+    prefix = f"Continue this conversation about {topic}: "
+    if summary["text"]:
+        prefix += f"(Summary so far: {summary['text']}) "
+    recent = context_window.recent_messages(conversation, summary["covered"], budget_tokens - context_window.estimate_tokens(prefix))
+    last_messages = " ".join(text for _, _, text in recent)
+    return f"{prefix}{last_messages}"
+
+def build_chat_messages(conversation, role, labels, system_prompt, topic, summary, budget_tokens):
+    """Builds the /api/chat message list for a debater from the summary and the transcript.
+
+    The debater's own turns become assistant messages and everyone else's become user messages.
+    The transcript is append-only and the summary changes only when older turns are folded into
+    it, so most turns' lists extend the previous one unchanged and Ollama can reuse the KV cache
+    of that prefix instead of re-prefilling the debate.
+    """
+    system_content = with_summary(system_prompt, summary)
+    messages = [{"role": "system", "content": system_content}]
+    recent = context_window.recent_messages(conversation, summary["covered"], budget_tokens - context_window.estimate_tokens(system_content))
+    for _, msg_role, text in recent:
+        if msg_role == role:
+            chat_role, content = "assistant", text
+        else:
+            chat_role, content = "user", f"{speaker_label(msg_role, labels)}: {text}"
+        if messages[-1]['role'] == chat_role:
+            # Consecutive messages from the same side only ever occur after this debater's last turn
+            messages[-1] = {"role": chat_role, "content": f"{messages[-1]['content']}\n\n{content}"}
+        else:
+            messages.append({"role": chat_role, "content": content})
+    if messages[-1]['role'] != "user":
+        # This debater also spoke last (e.g. closing one exchange and opening the next)
+        messages.append({"role": "user", "content": f"Continue the debate about {topic}."})
+    return messages
+
+def build_turn_request(session_id, for_model_name, against_model_name, is_for_position=True):
+    """Returns (base_url, path, speaker, payload) for a debater turn, or None if the debate was stopped or removed."""
+    side = "for" if is_for_position else "against"
+    with session_locks.for_key(session_id):
+        if session_id not in sessions or not sessions[session_id]['active']:
+            return None
         session_data = sessions[session_id]
         topic = session_data['topic']
-        for_position_label = session_data['for_position_label']
-        against_position_label = session_data['against_position_label']
-        
-    # Determine endpoint and model based on position
+        labels = session_labels(session_data)
+        role = Role.FOR if is_for_position else Role.AGAINST
+        speaker = speaker_label(role, labels)
+        context_mode = session_data.get('context_modes', {}).get(side, DEBATE_CONTEXT_MODE)
+        # Snapshot the transcript; it is only ever appended to
+        conversation = list(session_data['conversation'])
+        summary = session_data.setdefault('summary', new_summary())
+        last_backend_url = session_data.get('turn_backends', {}).get(side)
+        options = role_options(side, session_data.get('generation_options'), session_data.get('seed'))
+
+    # Determine model based on position, then route to the least-loaded instance that has it.
+    # A side prefers the instance that served its previous turn, where its prefix is still cached.
     if is_for_position:
-        endpoint_url = OLLAMA_FOR_URL
+        preferred_url = last_backend_url or OLLAMA_FOR_BASE_URL
         current_model_name = for_model_name
-        speaker = for_position_label
     else: # Against position
-        endpoint_url = OLLAMA_AGAINST_URL
+        preferred_url = last_backend_url or OLLAMA_AGAINST_BASE_URL
         current_model_name = against_model_name
-        speaker = against_position_label
-            
-    headers = {"Content-Type": "application/json"}
+    base_url = backend_registry.pick(current_model_name, preferred_url)
+
+    with session_locks.for_key(session_id):
+        if session_id in sessions:
+            sessions[session_id].setdefault('turn_backends', {})[side] = base_url
+
     for_prompt, against_prompt = generate_system_prompts(topic)
     system_prompt = for_prompt if is_for_position else against_prompt
-    
-    socketio.emit('typing_indicator', {"speaker": speaker, "typing": True}, room=session_id)
-    
+    budget_tokens = context_window.token_budget(current_model_name)
+
+    if context_mode == "chat":
+        return base_url, "/api/chat", speaker, {
+            "model": current_model_name,
+            "messages": build_chat_messages(conversation, role, labels, system_prompt, topic, summary, budget_tokens),
+            "stream": True,
+            "keep_alive": keep_alive_for(current_model_name),
+            "options": options
+        }
+
     data = {
         "model": current_model_name,
-        "prompt": prompt,
+        "prompt": build_turn_prompt(conversation, topic, summary, budget_tokens - context_window.estimate_tokens(system_prompt)),
         "system": system_prompt,
         "stream": True,
-        "max_tokens": 350
+        "keep_alive": keep_alive_for(current_model_name),
+        "options": options
     }
-    
-    message_id = f"{int(time.time() * 1000)}-{speaker}"
-    full_response = ""
-    
-    try:
-        with requests.post(endpoint_url, headers=headers, json=data, stream=True) as response:
-            if response.status_code != 200:
-                error_msg = f"Error: {response.status_code} - {response.text}"
-                socketio.emit('stream_message', {
-                    "speaker": speaker,
-                    "message": error_msg,
-                    "message_id": message_id,
-                    "done": True
-                }, room=session_id)
-                return error_msg
-            
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        chunk = json.loads(line)
-                        if 'response' in chunk:
-                            chunk_text = chunk['response']
-                            full_response += chunk_text
-                            
-                            with session_lock:
-                                if session_id not in sessions:
-                                    break
-                            
-                            socketio.emit('stream_message', {
-                                "speaker": speaker,
-                                "message": chunk_text,
-                                "message_id": message_id,
-                                "done": chunk.get('done', False)
-                            }, room=session_id)
-                            
-                            time.sleep(0.01)
-                        
-                        if chunk.get('done', False):
-                            break
-                    except json.JSONDecodeError:
-                        continue
+    return base_url, "/api/generate", speaker, data
 
-    except Exception as e:
-        error_msg = f"Error: {str(e)}"
-        with session_lock:
+def response_steps(session_id, for_model_name, against_model_name, is_for_position=True):
+    """Steps that get a response from one of the Ollama instances using streaming.
+
+    Returns (response, clean_response, stats, seq) with the reply without <think> blocks, its
+    generation stats and the sequence number reserved for the message, or None if the debate
+    was stopped or removed before the turn started.
+    """
+    turn_request = build_turn_request(session_id, for_model_name, against_model_name, is_for_position)
+    if turn_request is None:
+        return None
+    base_url, path, speaker, data = turn_request
+    seq = reserve_seq(session_id)
+    if seq is None:
+        return None
+    reply = yield "stream", session_id, speaker, base_url, path, data, stream_message_id(session_id, seq), "Error", True
+    return (*reply, seq)
+
+def active_debate_models():
+    """Models the running debates still need; the evaluator avoids evicting them."""
+    # Reads one flag and two strings per session; a momentarily stale view is harmless here
+    models = set()
+    for session_data in sessions.values():
+        if session_data['active']:
+            models.add(session_data.get('selected_for_model', DEFAULT_MODEL_NAME))
+            models.add(session_data.get('selected_against_model', DEFAULT_MODEL_NAME))
+    return models
+
+def preload_debate_models(session_id, for_model_name, against_model_name):
+    """Starts loading the models a debate will use on the instances its turns will be routed to.
+
+    The evaluator model is only preloaded where that does not evict a model an active debate needs.
+    """
+    with session_locks.for_key(session_id):
+        if session_id not in sessions:
+            return
+        turn_backends = sessions[session_id].setdefault('turn_backends', {})
+        preferred_urls = {
+            "for": turn_backends.get("for") or OLLAMA_FOR_BASE_URL,
+            "against": turn_backends.get("against") or OLLAMA_AGAINST_BASE_URL,
+        }
+    for side, model_name in (("for", for_model_name), ("against", against_model_name)):
+        base_url = backend_registry.pick(model_name, preferred_urls[side])
+        with session_locks.for_key(session_id):
             if session_id in sessions:
-                socketio.emit('stream_message', {
-                    "speaker": speaker,
-                    "message": error_msg,
-                    "message_id": message_id,
-                    "done": True
-                }, room=session_id)
-        return error_msg
-    
-    with session_lock:
-        if session_id in sessions:
-            socketio.emit('typing_indicator', {"speaker": speaker, "typing": False}, room=session_id)
-    
-    return full_response
+                sessions[session_id].setdefault('turn_backends', {})[side] = base_url
+        residency_manager.preload(base_url, model_name, keep_alive_for(model_name))
+
+    # The debaters' models count as resident from here on, so the judge is only loaded where it fits beside them
+    prewarm_evaluator()
 
-def generate_evaluation_response(prompt_text, session_id):
-    """Get an evaluation response from an Ollama instance using streaming."""
+def build_evaluation_request(prompt_text, options=None):
+    """Returns (base_url, path, speaker, payload) for the evaluator; options default to the evaluator's."""
     speaker = "Evaluator"
     system_prompt_eval = "You will be shown a debate conversation. Your task is to determine who won the debate and provide a concise explanation for your decision. Focus on the strength of arguments, rebuttals, and overall persuasiveness. Avoid simply summarizing the debate."
-    endpoint_url = OLLAMA_FOR_URL # Use one of the instances
-    current_model_name = DEFAULT_MODEL_NAME
+    current_model_name = EVALUATOR_MODEL
+    # Run where the evaluator model is loaded (see prewarm_evaluator) or fits without evicting a
+    # model another debate is using, preferring the least loaded instance
+    base_url = residency_manager.place(current_model_name, active_debate_models(), OLLAMA_FOR_BASE_URL)
 
-    socketio.emit('typing_indicator', {"speaker": speaker, "typing": True}, room=session_id)
-    
-    headers = {"Content-Type": "application/json"}
     data = {
         "model": current_model_name,
         "prompt": prompt_text,
         "system": system_prompt_eval,
         "stream": True,
-        "max_tokens": 400 # Slightly more tokens for evaluation
+        "keep_alive": keep_alive_for(current_model_name, "evaluator"),
+        "options": options if options is not None else role_options("evaluator")
     }
-    
-    message_id = f"{int(time.time() * 1000)}-{speaker}"
-    full_response_text = ""
-    
-    try:
-        with requests.post(endpoint_url, headers=headers, json=data, stream=True) as response:
-            if response.status_code != 200:
-                error_msg = f"Error: {response.status_code} - {response.text}"
-                socketio.emit('stream_message', {
-                    "speaker": speaker,
-                    "message": error_msg,
-                    "message_id": message_id,
-                    "done": True
-                }, room=session_id)
-                return error_msg
-            
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        chunk = json.loads(line)
-                        if 'response' in chunk:
-                            chunk_text = chunk['response']
-                            full_response_text += chunk_text
-                            
-                            with session_lock:
-                                if session_id not in sessions: # Check if session still exists
-                                    break 
-                            
-                            socketio.emit('stream_message', {
-                                "speaker": speaker,
-                                "message": chunk_text,
-                                "message_id": message_id,
-                                "done": chunk.get('done', False)
-                            }, room=session_id)
-                            
-                            time.sleep(0.01)
-                        
-                        if chunk.get('done', False):
-                            break
-                    except json.JSONDecodeError:
-                        continue # Ignore malformed JSON lines
+    return base_url, "/api/generate", speaker, data
+
+def prewarm_evaluator():
+    """Loads the judge model during a debate's final exchange, where it fits without evicting a debater's model."""
+    residency_manager.prewarm(EVALUATOR_MODEL, active_debate_models(), keep_alive_for(EVALUATOR_MODEL, "evaluator"), OLLAMA_FOR_BASE_URL)
+
+def evaluation_response_steps(prompt_text, session_id):
+    """Steps that get an evaluation response from an Ollama instance using streaming.
+
+    Returns (response, clean_response, stats, seq) like response_steps, or None if the session is gone.
+    """
+    base_url, path, speaker, data = build_evaluation_request(prompt_text, session_generation_options(session_id, "evaluator"))
+    seq = reserve_seq(session_id)
+    if seq is None:
+        return None
+    reply = yield "stream", session_id, speaker, base_url, path, data, stream_message_id(session_id, seq), "Error during evaluation", False
+    return (*reply, seq)
+
+def build_summary_request(session_id):
+    """Returns (base_url, payload, fold) for folding older turns into the rolling summary.
+
+    Returns None while both sides' prompts still fit their token budget, or if the debate was stopped.
+    fold is handed back to apply_summary once the summary has been generated.
+    """
+    with session_locks.for_key(session_id):
+        session_data = sessions.get(session_id)
+        if session_data is None or not session_data['active']:
+            return None
+        summary = session_data.setdefault('summary', new_summary())
+        conversation = list(session_data['conversation'])
+        topic = session_data['topic']
+        labels = session_labels(session_data)
+        models = (session_data.get('selected_for_model', DEFAULT_MODEL_NAME), session_data.get('selected_against_model', DEFAULT_MODEL_NAME))
+        for_backend_url = session_data.get('turn_backends', {}).get('for')
 
+    # Room left for verbatim turns by the tighter of the two sides' budgets
+    system_tokens = max(context_window.estimate_tokens(with_summary(prompt, summary)) for prompt in generate_system_prompts(topic))
+    budget_tokens = min(context_window.token_budget(model) for model in models) - system_tokens
+    fold_to = context_window.fold_point(conversation, summary["covered"], budget_tokens)
+    if fold_to is None:
+        return None
+
+    folded_messages = context_window.debate_messages(conversation[:fold_to], summary["covered"])
+    system_prompt, prompt = context_window.summary_prompt(summary["text"], folded_messages, topic, labels)
+    # Summarize with the "For" debater's model, which is already loaded, so no model is swapped mid-debate
+    summary_model = models[0]
+    base_url = residency_manager.place(summary_model, active_debate_models(), for_backend_url or OLLAMA_FOR_BASE_URL)
+    data = {
+        "model": summary_model,
+        "prompt": prompt,
+        "system": system_prompt,
+        "stream": False,
+        "keep_alive": keep_alive_for(summary_model),
+        "options": {"num_predict": context_window.SUMMARY_MAX_TOKENS}
+    }
+    return base_url, data, (summary, folded_messages, fold_to, labels)
+
+def apply_summary(session_id, fold, summary_text):
+    """Stores a generated summary; falls back to an extractive one if generation failed."""
+    previous, folded_messages, fold_to, labels = fold
+    summary_text = context_window.strip_thoughts(summary_text)
+    if not summary_text:
+        summary_text = context_window.fallback_summary(previous["text"], folded_messages, labels)
+    with session_locks.for_key(session_id):
+        session_data = sessions.get(session_id)
+        # A reset or topic change in the meantime starts a new summary
+        if session_data is None or session_data.get('summary') is not previous:
+            return
+        session_data['summary'] = {"text": summary_text, "covered": fold_to}
+        persist_session(session_id, session_data)
+
+def summary_steps(session_id):
+    """Steps that fold older turns into the session's summary once the prompt would outgrow its token budget."""
+    summary_request = build_summary_request(session_id)
+    if summary_request is None:
+        return
+    base_url, data, fold = summary_request
+    result = yield "summarize", session_id, base_url, data
+    if result is None:
+        return
+    summary_text = result.get('response', "")
+    if result:
+        note_generation_done(base_url, data['model'], result)
+        residency_manager.note_loaded(base_url, data['model'], data['keep_alive'])
+    apply_summary(session_id, fold, summary_text)
+
+def summary_failed(session_id, base_url, e):
+    if ollama_client.is_connection_error(e):
+        backend_registry.mark_unhealthy(base_url)
+    print(f"Summarizing debate {session_id} failed: {e}")
+    return {}
+
+def request_summary(session_id, base_url, data):
+    """Generates a rolling summary on this thread.
+
+    Returns Ollama's result, {} if the request failed, or None if the debate was stopped while queued.
+    """
+    if not scheduler.acquire(base_url, session_id, lambda: is_session_live(session_id)):
+        return None
+    started_at = time.monotonic()
+    try:
+        response = ollama_client.post(base_url, "/api/generate", data)
+        response.raise_for_status()
+        return response.json()
     except Exception as e:
-        error_msg = f"Error during evaluation: {str(e)}"
-        with session_lock:
-            if session_id in sessions:
-                socketio.emit('stream_message', {
-                    "speaker": speaker,
-                    "message": error_msg,
-                    "message_id": message_id,
-                    "done": True
-                }, room=session_id)
-        return error_msg
-    
-    with session_lock:
-        if session_id in sessions: # Check if session still exists
-            socketio.emit('typing_indicator', {"speaker": speaker, "typing": False}, room=session_id)
+        return summary_failed(session_id, base_url, e)
+    finally:
+        scheduler.release(base_url, time.monotonic() - started_at)
+
+def clear_conversation(session_id, session_data):
+    """Empties a session's conversation and starts a new epoch (call with its lock held)."""
+    session_data['conversation'] = []
+    session_data['evaluation_transcript'] = []
+    session_data['conversation_epoch'] += 1
+    session_data['summary'] = new_summary()
+    session_backend.clear_messages(session_id)
+
+def reserve_seq(session_id):
+    """Takes the session's next sequence number for a message that is about to be streamed.
+
+    The streamed message's id is derived from it, so ids are unique across sessions and
+    restarts. Returns None if the session is gone.
+    """
+    with session_locks.for_key(session_id):
+        session_data = sessions.get(session_id)
+        if session_data is None:
+            return None
+        seq = session_data['next_seq']
+        session_data['next_seq'] += 1
+        return seq
+
+def append_message(session_id, session_data, role, text, seq=None, clean=None, stats=None):
+    """Appends a message to the conversation, persists it and returns it serialized for clients.
+
+    Call with the session's lock held. Sequence numbers keep increasing across resets, so the
+    conversation is always in seq order and clients can sync from a cursor. A reserved seq is
+    used unless a later message was appended in the meantime (then the message gets a new one).
+    clean is the text without <think> blocks as filtered while streaming (None: no thoughts),
+    stats the reply's generation stats.
+    """
+    conversation = session_data['conversation']
+    if seq is None or (conversation and conversation[-1].seq > seq):
+        seq = session_data['next_seq']
+        session_data['next_seq'] += 1
+    message = Message(seq, role, text, time.time(), clean, stats)
+    conversation.append(message)
+    line = evaluation_line(message)
+    if line:
+        session_data['evaluation_transcript'].append(line)
+    labels = session_labels(session_data)
+    session_backend.append_message(session_id, message.to_record(labels))
+    return message.to_dict(labels, thoughts=session_data.get('thought_mode') == "show")
+
+def record_message(session_id, role, text, require_active=True, seq=None, clean=None, stats=None):
+    """Appends a message to a session's conversation and returns it serialized.
+
+    Returns None if the session is gone, or if require_active is set and the debate was stopped.
+    """
+    with session_locks.for_key(session_id):
+        session_data = sessions.get(session_id)
+        if session_data is None or (require_active and not session_data['active']):
+            return None
+        return append_message(session_id, session_data, role, text, seq, clean, stats)
+
+def messages_since(session_data, since):
+    """The session's messages with a sequence number above since, serialized (call with its lock held)."""
+    conversation = session_data['conversation']
+    if since is not None:
+        # The conversation is in seq order
+        conversation = conversation[bisect.bisect_right(conversation, since, key=lambda msg: msg.seq):]
+    labels = session_labels(session_data)
+    thoughts = session_data.get('thought_mode') == "show"
+    return [msg.to_dict(labels, thoughts) for msg in conversation]
+
+def last_message_seq(session_data):
+    """Seq of the last stored message, 0 if there is none (call with the session's lock held).
+
+    next_seq can run ahead of it: a seq is reserved when a reply starts streaming and only
+    stored once the reply is complete, so cursors and ETags must not be derived from next_seq.
+    """
+    conversation = session_data['conversation']
+    return conversation[-1].seq if conversation else 0
+
+def cut_off_note(speaker, clean, stats):
+    """System note stored in place of a reply that a hard cap cut off before it had any text, or None."""
+    if not stats or not stats.get("truncated") or clean.strip():
+        return None
+    return f"{speaker} gave no reply before the {stats['truncated']} limit cut it off."
+
+def message_saved_payload(session_id, reserved_seq, entry):
+    """'message_saved' event for a streamed message: its stream id, final seq and generation stats."""
+    return {"message_id": stream_message_id(session_id, reserved_seq), "seq": entry['seq'], "stats": entry.get('stats')}
+
+def parse_sync_cursor(since, epoch):
+    """Parses the (since, epoch) cursor a client sends; (None, None) means a full sync."""
+    try:
+        return int(since), int(epoch)
+    except (TypeError, ValueError):
+        return None, None
+
+# Debaters appear under neutral names in the evaluator's transcript
+EVALUATION_LABELS = ("For Debator", "Against Debator")
+
+def evaluation_line(message):
+    """The message as a line of the evaluator's transcript, or None if it is left out.
+
+    Computed once when the message is appended, so the evaluation prompt is ready as soon as
+    the last turn ends.
+    """
+    if message.role == Role.SYSTEM: # Exclude system messages from evaluation content
+        return None
+    # Without <think>...</think> content (filtered while streaming) and with speakers renamed
+    text = message.clean
+    if not text:
+        return None
+    return f"{speaker_label(message.role, EVALUATION_LABELS)}: {text}"
+
+def build_evaluation_prompt(transcript_lines):
+    """Builds the evaluator prompt from the session's evaluation transcript, or returns None if there is nothing to evaluate."""
+    debate_text_for_evaluator = "\n\n".join(transcript_lines)
     
-    return full_response_text
+    if not debate_text_for_evaluator.strip():
+        return None
 
-def evaluate_debate(session_id):
-    with session_lock:
+    return f"Here is the debate transcript:\n\n{debate_text_for_evaluator}\n\nBased on this transcript, who won the debate and why?"
+
+def get_evaluation_snapshot(session_id):
+    """Returns (transcript, epoch) of an inactive debate for its evaluation, or None if it cannot be evaluated."""
+    with session_locks.for_key(session_id):
         if session_id not in sessions:
-            return
+            return None
         session_data = sessions[session_id]
-        conversation_history = session_data['conversation']
-        for_label_dynamic = session_data['for_position_label']
-        against_label_dynamic = session_data['against_position_label']
         # Ensure no active debate during evaluation to prevent race conditions
         if session_data['active']: 
             print(f"Warning: evaluate_debate called for session {session_id} while still active.")
-            return
+            return None
+        return list(session_data['evaluation_transcript']), session_data['conversation_epoch']
 
-    # Announce evaluation phase
-    system_message_text = "The debate has concluded. An impartial evaluator will now determine the winner and provide an analysis."
-    system_message = {
-        "speaker": "System",
-        "message": system_message_text,
-        "timestamp": time.time()
-    }
-    with session_lock:
-        if session_id in sessions:
-            sessions[session_id]['conversation'].append(system_message)
-    socketio.emit('new_message', system_message, room=session_id)
-    time.sleep(0.5) # Small delay for the message to appear
-
-    # Prepare conversation text for the evaluator
-    # Exclude the "System" announcement message itself from the text sent for evaluation
-    # Filter out <think> tags and rename speakers
-    
-    processed_messages_for_eval = []
-    for msg in conversation_history:
-        if msg['speaker'] == "System": # Exclude system messages from evaluation content
-            continue
-
-        # Filter out <think>...</think> content
-        message_content = msg['message']
-        if isinstance(message_content, str): # Ensure it's a string before regex
-            message_content_no_thoughts = re.sub(r"<think>.*?</think>", "", message_content, flags=re.DOTALL).strip()
-        else:
-            message_content_no_thoughts = "" # Or handle as an error/empty if not string
-
-        # Determine speaker name for the transcript
-        speaker_for_transcript = msg['speaker']
-        if msg['speaker'] == for_label_dynamic:
-            speaker_for_transcript = "For Debator"
-        elif msg['speaker'] == against_label_dynamic:
-            speaker_for_transcript = "Against Debator"
-        
-        if message_content_no_thoughts: # Only add if there's content after stripping thoughts
-            processed_messages_for_eval.append(f"{speaker_for_transcript}: {message_content_no_thoughts}")
+def finish_evaluation(session_id, epoch, evaluator_response, seq=None, clean=None, stats=None, role=Role.EVALUATOR):
+    """Stores the evaluator verdict (or the system note standing in for it) and returns its entry.
 
-    debate_text_for_evaluator = "\n\n".join(processed_messages_for_eval)
-    
-    if not debate_text_for_evaluator.strip():
+    Returns None if the session is gone or its conversation was cleared (a reset or topic
+    change) since the snapshot of epoch was taken; the verdict, possibly cut short, is dropped.
+    """
+    with session_locks.for_key(session_id):
+        if session_id not in sessions:
+            return None
+        if sessions[session_id]['conversation_epoch'] != epoch:
+            sessions[session_id]['evaluating'] = False
+            return None
+        entry = append_message(session_id, sessions[session_id], role, evaluator_response, seq, clean, stats)
+        # Ensure debate remains inactive after evaluation
+        sessions[session_id]['active'] = False 
+        sessions[session_id]['evaluating'] = False
+        return entry
+
+def cancel_evaluation(session_id):
+    """Unpins a session whose evaluation ended without a verdict."""
+    with session_locks.for_key(session_id):
+        session_data = sessions.get(session_id)
+        if session_data is not None:
+            session_data['evaluating'] = False
+
+def finish_debate(session_id, reached_max_turns):
+    """Marks a debate inactive once its loop ends.
+
+    Returns None if the session is gone, otherwise whether the debate ran its course and should be evaluated.
+    """
+    with session_locks.for_key(session_id):
+        if session_id not in sessions:
+            print(f"Session {session_id} not found after conversation loop. No evaluation.")
+            return None
+        # Mark debate as inactive before evaluation
+        sessions[session_id]['active'] = False
+        # Keeps the session pinned in the store until the evaluation has finished
+        sessions[session_id]['evaluating'] = reached_max_turns
+    # Check if the loop ended due to max_turns, not external stop
+    # This ensures evaluation only happens if the debate ran its course
+    if not reached_max_turns:
+        print(f"Debate for session {session_id} ended before max turns. No evaluation.")
+    return reached_max_turns
+
+def get_debate_settings(session_id):
+    """Reads the settings a debate runs with, or returns None if the session is gone."""
+    with session_locks.for_key(session_id):
+        if session_id not in sessions:
+            return None
+        session_data = sessions[session_id]
+        return {
+            'conversation_empty': not session_data['conversation'],
+            'topic': session_data['topic'],
+            'selected_for_model': session_data.get('selected_for_model', DEFAULT_MODEL_NAME),
+            'selected_against_model': session_data.get('selected_against_model', DEFAULT_MODEL_NAME),
+            'max_turns': session_data.get('max_turns', DEFAULT_MAX_TURNS), # Use session's max_turns
+            # Speaking order follows the seed too, so a seeded debate repeats exactly
+            'order_random': random.Random(session_data['seed']) if session_data.get('seed') is not None else random,
+        }
+
+# The debate and its evaluation are written once, as generators of steps shared by both
+# runtimes. A step yields the I/O it needs as a tuple and receives its result:
+#   ("emit", event, payload, room)   sends a Socket.IO event
+#   ("sleep", seconds)               pauses the debate
+#   ("stream", *stream_generation arguments) -> (text, clean_text, stats)
+#   ("summarize", session_id, base_url, payload) -> Ollama's result (see request_summary)
+# run_steps performs them on the current thread; async_app.run_steps awaits them instead.
+
+def evaluation_steps(session_id):
+    snapshot = get_evaluation_snapshot(session_id)
+    if snapshot is None:
+        cancel_evaluation(session_id)
+        return
+    transcript, epoch = snapshot
+    evaluation_prompt = build_evaluation_prompt(transcript)
+    if evaluation_prompt is None:
         print(f"No debate content to evaluate for session {session_id}.")
+        cancel_evaluation(session_id)
         return
 
-    evaluation_prompt = f"Here is the debate transcript:\n\n{debate_text_for_evaluator}\n\nBased on this transcript, who won the debate and why?"
+    # Announce evaluation phase
+    system_message_text = "The debate has concluded. An impartial evaluator will now determine the winner and provide an analysis."
+    system_message = record_message(session_id, Role.SYSTEM, system_message_text, require_active=False)
+    if system_message is not None:
+        yield "emit", 'new_message', system_message, session_id
     
-    evaluator_response = generate_evaluation_response(evaluation_prompt, session_id)
+    evaluation = yield from evaluation_response_steps(evaluation_prompt, session_id)
+    if evaluation is None:
+        return
+    evaluator_response, clean_response, stats, reserved_seq = evaluation
 
-    with session_lock:
-        if session_id in sessions:
-            sessions[session_id]['conversation'].append({
-                "speaker": "Evaluator",
-                "message": evaluator_response,
-                "timestamp": time.time()
-            })
-            # Ensure debate remains inactive after evaluation
-            sessions[session_id]['active'] = False 
-            socketio.emit('conversation_status', {
-                "active": False,
-                "is_long_ollama_operation_active": is_long_ollama_operation_active 
-            }, room=session_id)
+    note = cut_off_note("The evaluator", clean_response, stats)
+    if note is not None:
+        entry = finish_evaluation(session_id, epoch, note, reserved_seq, stats=stats, role=Role.SYSTEM)
+    else:
+        entry = finish_evaluation(session_id, epoch, evaluator_response, reserved_seq, clean_response, stats)
+    if entry is not None:
+        if note is not None:
+            yield "emit", 'new_message', entry, session_id
+        else:
+            yield "emit", 'message_saved', message_saved_payload(session_id, reserved_seq, entry), session_id
+        yield "emit", 'conversation_status', {
+            "active": False,
+            "is_long_ollama_operation_active": is_long_ollama_operation_active 
+        }, session_id
 
-def conversation_loop(session_id):
-    """Function to run the conversation between the two LLMs for a specific session"""
-    with session_lock:
-        if session_id not in sessions:
-            return
-        session_data = sessions[session_id]
-        conversation = session_data['conversation']
-        topic = session_data['topic']
-        for_position_label = session_data['for_position_label']
-        against_position_label = session_data['against_position_label']
-        selected_for_model = session_data.get('selected_for_model', DEFAULT_MODEL_NAME)
-        selected_against_model = session_data.get('selected_against_model', DEFAULT_MODEL_NAME)
-        max_turns = session_data.get('max_turns', DEFAULT_MAX_TURNS) # Use session's max_turns
+def debate_steps(session_id):
+    """Steps that run the conversation between the two LLMs for a specific session"""
+    settings = get_debate_settings(session_id)
+    if settings is None:
+        return
+    topic = settings['topic']
+    max_turns = settings['max_turns']
 
-    if not conversation:
+    if settings['conversation_empty']:
         prompt = f"Hello! Let's discuss {topic} today."
-        with session_lock:
-            if session_id in sessions:
-                sessions[session_id]['conversation'].append({
-                    "speaker": "Human", 
-                    "message": prompt,
-                    "timestamp": time.time()
-                })
-                socketio.emit('new_message', {"speaker": "Human", "message": prompt}, room=session_id)
+        entry = record_message(session_id, Role.HUMAN, prompt, require_active=False)
+        if entry is not None:
+            yield "emit", 'new_message', entry, session_id
     
     turns = 0
     
-    while True:
-        with session_lock:
-            if session_id not in sessions or not sessions[session_id]['active']:
-                break
-            
-            conversation = sessions[session_id]['conversation']
-            topic = sessions[session_id]['topic']
-        
-        if turns >= max_turns:
-            break
-        
-        # Randomize who goes first in this exchange
-        for_goes_first_this_exchange = random.choice([True, False])
-
-        if for_goes_first_this_exchange:
-            # "For" LLM's turn (Instance 1)
-            last_messages_for = " ".join([msg["message"] for msg in conversation[-3:] if msg])
-            prompt_for = f"Continue this conversation about {topic}: {last_messages_for}"
-            response_for = generate_response(prompt_for, session_id, selected_for_model, selected_against_model, is_for_position=True)
-            
-            with session_lock:
-                if session_id not in sessions or not sessions[session_id]['active']:
-                    break
-                message_for = { "speaker": for_position_label, "message": response_for, "timestamp": time.time() }
-                sessions[session_id]['conversation'].append(message_for)
-                # Update conversation variable for the next speaker
-                conversation = sessions[session_id]['conversation'] 
-            
-            time.sleep(0.2) # Shorter delay between speakers in an exchange
+    while turns < max_turns:
+        if turns == max_turns - 1:
+            prewarm_evaluator() # Judge model loads while the final exchange runs
 
-            # "Against" LLM's turn (Instance 2)
-            with session_lock: # Re-check session status before Against's turn
-                if session_id not in sessions or not sessions[session_id]['active']:
-                    break
-            last_messages_against = " ".join([msg["message"] for msg in conversation[-3:] if msg])
-            prompt_against = f"Continue this conversation about {topic}: {last_messages_against}"
-            response_against = generate_response(prompt_against, session_id, selected_for_model, selected_against_model, is_for_position=False)
-            
-            with session_lock:
-                if session_id not in sessions or not sessions[session_id]['active']:
-                    break
-                message_against = { "speaker": against_position_label, "message": response_against, "timestamp": time.time() }
-                sessions[session_id]['conversation'].append(message_against)
+        # Randomize who goes first in this exchange
+        speaking_order = settings['order_random'].choice([(True, False), (False, True)])
+        exchange_completed = True
 
-        else: # Against goes first this exchange
-            # "Against" LLM's turn (Instance 2)
-            last_messages_against = " ".join([msg["message"] for msg in conversation[-3:] if msg])
-            prompt_against = f"Continue this conversation about {topic}: {last_messages_against}"
-            response_against = generate_response(prompt_against, session_id, selected_for_model, selected_against_model, is_for_position=False)
+        for position_index, is_for_position in enumerate(speaking_order):
+            if position_index > 0:
+                yield "sleep", 0.2 # Shorter delay between speakers in an exchange
 
-            with session_lock:
-                if session_id not in sessions or not sessions[session_id]['active']:
-                    break
-                message_against = { "speaker": against_position_label, "message": response_against, "timestamp": time.time() }
-                sessions[session_id]['conversation'].append(message_against)
-                # Update conversation variable for the next speaker
-                conversation = sessions[session_id]['conversation']
+            turn = yield from response_steps(session_id, settings['selected_for_model'], settings['selected_against_model'], is_for_position=is_for_position)
+            if turn is None:
+                exchange_completed = False
+                break
+            response, clean_response, stats, reserved_seq = turn
 
-            time.sleep(0.2) # Shorter delay between speakers in an exchange
+            note = cut_off_note("The For side" if is_for_position else "The Against side", clean_response, stats)
+            if note is not None:
+                # No empty turn: the note takes the reply's place and stays out of the debaters' prompts
+                entry = record_message(session_id, Role.SYSTEM, note, seq=reserved_seq, stats=stats)
+            else:
+                entry = record_message(session_id, Role.FOR if is_for_position else Role.AGAINST, response, seq=reserved_seq, clean=clean_response, stats=stats)
+            if entry is None:
+                exchange_completed = False
+                break
+            if note is not None:
+                yield "emit", 'new_message', entry, session_id
+            else:
+                # Tells the client the sequence number (and stats) of the message it just streamed
+                yield "emit", 'message_saved', message_saved_payload(session_id, reserved_seq, entry), session_id
 
-            # "For" LLM's turn (Instance 1)
-            with session_lock: # Re-check session status before For's turn
-                if session_id not in sessions or not sessions[session_id]['active']:
-                    break
-            last_messages_for = " ".join([msg["message"] for msg in conversation[-3:] if msg])
-            prompt_for = f"Continue this conversation about {topic}: {last_messages_for}"
-            response_for = generate_response(prompt_for, session_id, selected_for_model, selected_against_model, is_for_position=True)
-            
-            with session_lock:
-                if session_id not in sessions or not sessions[session_id]['active']:
-                    break
-                message_for = { "speaker": for_position_label, "message": response_for, "timestamp": time.time() }
-                sessions[session_id]['conversation'].append(message_for)
+        if not exchange_completed:
+            break
 
         turns += 1
-        time.sleep(1) # Delay after a full exchange
+        if turns < max_turns:
+            yield from summary_steps(session_id)
+            yield "sleep", 1 # Delay after a full exchange
     
     # After the loop finishes
-    with session_lock:
-        if session_id in sessions:
-            # Mark debate as inactive before evaluation
-            sessions[session_id]['active'] = False
-            socketio.emit('conversation_status', {
-                "active": False,
-                "is_long_ollama_operation_active": is_long_ollama_operation_active # Pass current global op status
-                }, room=session_id)
-            
-            # Check if the loop ended due to max_turns, not external stop
-            # This ensures evaluation only happens if the debate ran its course
-            if turns >= max_turns:
-                # Call evaluation in a new thread to avoid blocking
-                eval_thread = threading.Thread(target=evaluate_debate, args=(session_id,))
-                eval_thread.daemon = True
-                eval_thread.start()
-            else:
-                print(f"Debate for session {session_id} ended before max turns. No evaluation.")
-        else:
-            print(f"Session {session_id} not found after conversation loop. No evaluation.")
+    should_evaluate = finish_debate(session_id, turns >= max_turns)
+    if should_evaluate is None:
+        return
+    yield "emit", 'conversation_status', {
+        "active": False,
+        "is_long_ollama_operation_active": is_long_ollama_operation_active # Pass current global op status
+        }, session_id
+    if should_evaluate:
+        # Run evaluation separately to avoid blocking
+        runtime.start_evaluation(session_id)
+
+def run_steps(steps):
+    """Runs debate or evaluation steps to completion on the current thread."""
+    result = None
+    while True:
+        try:
+            operation, *args = steps.send(result)
+        except StopIteration:
+            return
+        result = None
+        if operation == "emit":
+            event, payload, room = args
+            emit(event, payload, room=room)
+        elif operation == "sleep":
+            time.sleep(*args)
+        elif operation == "stream":
+            result = stream_generation(*args)
+        elif operation == "summarize":
+            result = request_summary(*args)
+
+def evaluate_debate(session_id):
+    run_steps(evaluation_steps(session_id))
+
+def conversation_loop(session_id):
+    """Function to run the conversation between the two LLMs for a specific session"""
+    run_steps(debate_steps(session_id))
 
 @app.route('/')
 def index():
@@ -426,13 +1234,14 @@ def index():
     
     flask_session_id = session['session_id']
     
-    socketio_session_id = None
     with session_lock:
-        if flask_session_id in flask_to_socketio_map:
-            socketio_session_id = flask_to_socketio_map[flask_session_id]
-            if socketio_session_id not in sessions:
+        socketio_session_id = flask_to_socketio_map.get(flask_session_id)
+    # Loading may query the store, so it runs outside the map lock
+    if socketio_session_id is not None and sessions.load(socketio_session_id) is None:
+        with session_lock:
+            if flask_to_socketio_map.get(flask_session_id) == socketio_session_id:
                 del flask_to_socketio_map[flask_session_id]
-                socketio_session_id = None
+        socketio_session_id = None
     
     return render_template('index.html', 
                           session_id=flask_session_id,
@@ -440,15 +1249,11 @@ def index():
 
 @app.route('/api/models/<instance_name>', methods=['GET'])
 def get_available_models(instance_name):
-    container_name = ""
-    if instance_name == "ollama1": # For LLM
-        container_name = OLLAMA_FOR_CONTAINER_NAME
-    elif instance_name == "ollama2": # Against LLM
-        container_name = OLLAMA_AGAINST_CONTAINER_NAME
-    else:
+    backend = resolve_backend(instance_name)
+    if backend is None:
         return jsonify({"error": "Invalid instance name"}), 400
     
-    models = list_models_in_container(container_name)
+    models = model_inventory.get(backend)
     return jsonify({"models": models, "pullable_models": PULLABLE_MODELS_LIST})
 
 @app.route('/api/pull_model', methods=['POST'])
@@ -462,9 +1267,13 @@ def pull_model_api():
     if not instance_name or not model_to_pull:
         return jsonify({"status": "error", "message": "Instance name and model name are required"}), 400
 
+    backend = resolve_backend(instance_name)
+    if backend is None:
+        return jsonify({"status": "error", "message": "Invalid instance name"}), 400
+
     # Check if debate is active for this session
     if session_id_req and session_id_req in sessions:
-        with session_lock:
+        with session_locks.for_key(session_id_req):
             if sessions[session_id_req].get('active', False):
                 return jsonify({"status": "error", "message": "Cannot pull models while a debate is active in your session."}), 400
     
@@ -473,23 +1282,15 @@ def pull_model_api():
             return jsonify({"status": "error", "message": "Another model operation is already in progress. Please wait."}), 400
         is_long_ollama_operation_active = True
     
-    socketio.emit('long_ollama_operation_status', {"is_active": True}) # Notify all clients
-
-    container_name = ""
-    if instance_name == "ollama1": # For LLM
-        container_name = OLLAMA_FOR_CONTAINER_NAME
-    elif instance_name == "ollama2": # Against LLM
-        container_name = OLLAMA_AGAINST_CONTAINER_NAME
-    else:
-        return jsonify({"status": "error", "message": "Invalid instance name"}), 400
+    emit('long_ollama_operation_status', {"is_active": True}) # Notify all clients
 
     try:
-        success = pull_docker_model(container_name, model_to_pull)
+        success = pull_docker_model(backend.container_name, model_to_pull)
         if success:
-            updated_models = list_models_in_container(container_name)
+            updated_models = model_inventory.refresh(backend)
             # Emit to specific session if session_id_req is available, otherwise broadcast (or handle more granularly)
             target_room = session_id_req if session_id_req else None 
-            socketio.emit('models_updated', {
+            emit('models_updated', {
                 "instance_name": instance_name, 
                 "models": updated_models
             }, room=target_room)
@@ -501,7 +1302,7 @@ def pull_model_api():
     finally:
         with long_op_lock:
             is_long_ollama_operation_active = False
-        socketio.emit('long_ollama_operation_status', {"is_active": False}) # Notify all clients
+        emit('long_ollama_operation_status', {"is_active": False}) # Notify all clients
 
 @app.route('/api/delete_model', methods=['POST'])
 def delete_model_api():
@@ -517,8 +1318,12 @@ def delete_model_api():
     if model_to_delete == DEFAULT_MODEL_NAME:
         return jsonify({"status": "error", "message": f"Cannot delete the default model '{DEFAULT_MODEL_NAME}'. Please select a different model to delete."}), 400
 
+    backend = resolve_backend(instance_name)
+    if backend is None:
+        return jsonify({"status": "error", "message": "Invalid instance name"}), 400
+
     if session_id_req and session_id_req in sessions:
-        with session_lock:
+        with session_locks.for_key(session_id_req):
             if sessions[session_id_req].get('active', False):
                 return jsonify({"status": "error", "message": "Cannot delete models while a debate is active in your session."}), 400
     
@@ -527,34 +1332,19 @@ def delete_model_api():
             return jsonify({"status": "error", "message": "Another model operation is already in progress. Please wait."}), 400
         is_long_ollama_operation_active = True
     
-    socketio.emit('long_ollama_operation_status', {"is_active": True})
-
-    ollama_base_url_to_call = ""
-    container_name_for_listing = "" 
-
-    if instance_name == "ollama1": 
-        ollama_base_url_to_call = OLLAMA_FOR_BASE_URL
-        container_name_for_listing = OLLAMA_FOR_CONTAINER_NAME
-    elif instance_name == "ollama2": 
-        ollama_base_url_to_call = OLLAMA_AGAINST_BASE_URL
-        container_name_for_listing = OLLAMA_AGAINST_CONTAINER_NAME
-    else:
-        with long_op_lock: 
-            is_long_ollama_operation_active = False
-        socketio.emit('long_ollama_operation_status', {"is_active": False})
-        return jsonify({"status": "error", "message": "Invalid instance name"}), 400
+    emit('long_ollama_operation_status', {"is_active": True})
 
     try:
-        success = delete_model_from_container(ollama_base_url_to_call, model_to_delete)
-        updated_models = list_models_in_container(container_name_for_listing)
+        success = delete_model_from_container(backend.base_url, model_to_delete)
+        updated_models = model_inventory.refresh(backend)
         target_room = session_id_req if session_id_req else None
-        socketio.emit('models_updated', {
+        emit('models_updated', {
             "instance_name": instance_name, 
             "models": updated_models
         }, room=target_room)
 
         if success:
-            with session_lock:
+            with session_locks.for_key(session_id_req):
                 if session_id_req and session_id_req in sessions:
                     session_data = sessions[session_id_req]
                     made_selection_change = False
@@ -569,7 +1359,7 @@ def delete_model_api():
                                 return None, True 
                         return current_selection, False
 
-                    if instance_name == "ollama1":
+                    if backend.name == OLLAMA_FOR_CONTAINER_NAME:
                         new_selection, changed = get_fallback_model(
                             session_data.get('selected_for_model'),
                             model_to_delete,
@@ -578,7 +1368,7 @@ def delete_model_api():
                         if changed:
                             session_data['selected_for_model'] = new_selection
                             made_selection_change = True
-                    elif instance_name == "ollama2":
+                    if backend.name == OLLAMA_AGAINST_CONTAINER_NAME:
                         new_selection, changed = get_fallback_model(
                             session_data.get('selected_against_model'),
                             model_to_delete,
@@ -589,7 +1379,7 @@ def delete_model_api():
                             made_selection_change = True
                     
                     if made_selection_change:
-                        socketio.emit('model_selection_updated', {
+                        emit('model_selection_updated', {
                             "selected_for_model": session_data.get('selected_for_model'),
                             "selected_against_model": session_data.get('selected_against_model')
                         }, room=session_id_req)
@@ -602,18 +1392,79 @@ def delete_model_api():
     finally:
         with long_op_lock:
             is_long_ollama_operation_active = False
-        socketio.emit('long_ollama_operation_status', {"is_active": False})
+        emit('long_ollama_operation_status', {"is_active": False})
+
+@app.route('/api/backends', methods=['GET'])
+def get_backends():
+    backends = []
+    for backend in backend_registry.all():
+        info = backend.describe()
+        info["in_flight"] = scheduler.in_flight(backend.base_url)
+        info["load"] = scheduler.load(backend.base_url)
+        backends.append(info)
+    return jsonify({"backends": backends, "initializing": backend_init_running})
+
+@app.route('/api/sessions/stats', methods=['GET'])
+def get_session_stats():
+    return jsonify(sessions.stats())
+
+@app.route('/api/locks/stats', methods=['GET'])
+def get_lock_stats():
+    return jsonify({"session_locks": session_locks.stats(), "session_map_lock": session_lock.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(generation_cache.stats())
 
 @app.route('/api/conversation', methods=['GET'])
 def get_conversation():
+    """Returns a session's messages.
+
+    With since and epoch (the cursor of the client's last sync) only the messages after seq
+    since are sent, as {"messages", "epoch", "last_seq", "full"}; full is set when the
+    conversation was cleared since then and the client must replace what it shows. The ETag
+    changes with every new message, so a poll with If-None-Match gets a 304 when nothing did.
+    """
     session_id = request.args.get('session_id')
-    if not session_id or session_id not in sessions:
-        return jsonify([])
-    
-    with session_lock:
-        conversation = sessions[session_id]['conversation'] if session_id in sessions else []
+    since, epoch = parse_sync_cursor(request.args.get('since'), request.args.get('epoch'))
+    unknown = [] if since is None else {"messages": [], "epoch": None, "last_seq": 0, "full": True}
+    if not session_id:
+        return jsonify(unknown)
     
-    return jsonify(conversation)
+    with session_locks.for_key(session_id):
+        session_data = sessions.get(session_id)
+        if session_data is not None:
+            current_epoch = session_data['conversation_epoch']
+            last_seq = last_message_seq(session_data)
+            full = since is None or epoch != current_epoch
+            messages = messages_since(session_data, None if full else since)
+
+    if session_data is None:
+        # Not in memory: answer from the store's indexed message log instead of loading the
+        # whole transcript back into memory for a poll
+        session_data = stored_session_view(session_id)
+        if session_data is None:
+            return jsonify(unknown)
+        current_epoch = session_data['conversation_epoch']
+        last_seq = session_backend.last_seq(session_id)
+        full = since is None or epoch != current_epoch
+        messages = None  # Read after the ETag check
+
+    etag = f'"{current_epoch}-{last_seq}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        return '', 304, {'ETag': etag}
+    if messages is None:
+        messages = stored_messages_since(session_id, session_data, None if full else since)
+    if since is None:
+        response = jsonify(messages)
+    else:
+        response = jsonify({"messages": messages, "epoch": current_epoch, "last_seq": last_seq, "full": full})
+    response.headers['ETag'] = etag
+    return response
 
 @app.route('/api/start', methods=['POST'])
 def start_conversation():
@@ -626,55 +1477,83 @@ def start_conversation():
 
     try:
         max_turns = int(max_turns)
-        if not (1 <= max_turns <= 5): # Validate range
+        if not (1 <= max_turns <= MAX_DEBATE_TURNS): # Validate range
             max_turns = DEFAULT_MAX_TURNS
     except (ValueError, TypeError):
         max_turns = DEFAULT_MAX_TURNS
 
+    # Context mode per side; 'context_mode' sets both
+    default_context_mode = data.get('context_mode', DEBATE_CONTEXT_MODE)
+    context_modes = {
+        "for": data.get('for_context_mode', default_context_mode),
+        "against": data.get('against_context_mode', default_context_mode),
+    }
+    for side, mode in context_modes.items():
+        if mode not in CONTEXT_MODES:
+            context_modes[side] = DEBATE_CONTEXT_MODE
+
+    thought_mode = data.get('thought_mode', THOUGHT_MODE)
+    if thought_mode not in THOUGHT_MODES:
+        thought_mode = THOUGHT_MODE
+
+    # A fixed seed makes the debate reproducible (and, with GENERATION_CACHE, replayable)
+    seed = parse_seed(data['seed']) if 'seed' in data else parse_seed(DEBATE_SEED)
+    # Per-role Ollama options (num_predict, num_ctx, temperature, stop, seed); invalid values are dropped
+    generation_overrides = parse_request_options(data)
+
     with long_op_lock:
         if is_long_ollama_operation_active:
             return jsonify({"status": "error", "message": "Cannot start debate: a model operation is in progress. Please wait."}), 400
     
-    if not session_id or session_id not in sessions:
+    if not session_id or sessions.load(session_id) is None:
         return jsonify({"status": "error", "message": "Invalid session"})
+
+    if backend_init_running and not all(backend_registry.has_available(model) for model in (for_model, against_model)):
+        return jsonify({"status": "error", "message": "The Ollama instances are still starting up. Please try again in a moment."}), 503
+
+    # Admission control: refuse new debates while too many turns are already waiting for a model
+    if scheduler.is_saturated():
+        return jsonify({"status": "error", "message": "The server is busy. Too many debates are waiting for a model, please try again shortly."}), 503
     
-    with session_lock:
-        if not sessions[session_id]['active']:
-            sessions[session_id]['active'] = True
-            sessions[session_id]['selected_for_model'] = for_model
-            sessions[session_id]['selected_against_model'] = against_model
-            sessions[session_id]['max_turns'] = max_turns # Store max_turns in session
-            
-            socketio.emit('conversation_status', {
-                "active": True, 
-                "is_long_ollama_operation_active": is_long_ollama_operation_active
-                }, room=session_id)
-            
-            conversation_thread = threading.Thread(
-                target=conversation_loop, 
-                args=(session_id,)
-            )
-            conversation_thread.daemon = True
-            conversation_thread.start()
-            
-            return jsonify({"status": "started"})
+    with session_locks.for_key(session_id):
+        if sessions[session_id]['active']:
+            return jsonify({"status": "already_running"})
+        sessions[session_id]['active'] = True
+        sessions[session_id]['selected_for_model'] = for_model
+        sessions[session_id]['selected_against_model'] = against_model
+        sessions[session_id]['max_turns'] = max_turns # Store max_turns in session
+        sessions[session_id]['context_modes'] = context_modes
+        sessions[session_id]['thought_mode'] = thought_mode
+        sessions[session_id]['seed'] = seed
+        sessions[session_id]['generation_options'] = generation_overrides
+        persist_session(session_id, sessions[session_id])
         
-        return jsonify({"status": "already_running"})
+        emit('conversation_status', {
+            "active": True, 
+            "is_long_ollama_operation_active": is_long_ollama_operation_active
+            }, room=session_id)
+
+    # Load both debaters' models (and the evaluator's, where it fits) while the first turn starts
+    preload_debate_models(session_id, for_model, against_model)
+    runtime.start_debate(session_id)
+    
+    return jsonify({"status": "started"})
 
 @app.route('/api/stop', methods=['POST'])
 def stop_conversation():
     session_id = request.json.get('session_id')
     
-    if not session_id or session_id not in sessions:
+    if not session_id or sessions.load(session_id) is None:
         return jsonify({"status": "error", "message": "Invalid session"})
     
-    with session_lock:
+    with session_locks.for_key(session_id):
         if session_id in sessions:
             sessions[session_id]['active'] = False
-            socketio.emit('conversation_status', {
+            emit('conversation_status', {
                 "active": False,
                 "is_long_ollama_operation_active": is_long_ollama_operation_active
                 }, room=session_id)
+    cancel_generation(session_id, "stop", scopes=("debate",))
     
     return jsonify({"status": "stopped"})
 
@@ -682,18 +1561,21 @@ def stop_conversation():
 def reset_conversation():
     session_id = request.json.get('session_id')
     
-    if not session_id or session_id not in sessions:
+    if not session_id or sessions.load(session_id) is None:
         return jsonify({"status": "error", "message": "Invalid session"})
     
-    with session_lock:
+    with session_locks.for_key(session_id):
         if session_id in sessions:
-            sessions[session_id]['conversation'] = []
+            clear_conversation(session_id, sessions[session_id])
             sessions[session_id]['active'] = False
             sessions[session_id]['max_turns'] = DEFAULT_MAX_TURNS # Reset max_turns
-            socketio.emit('conversation_status', {
+            persist_session(session_id, sessions[session_id])
+            emit('conversation_status', {
                 "active": False,
                 "is_long_ollama_operation_active": is_long_ollama_operation_active
                 }, room=session_id)
+    # The conversation is gone, so a running evaluation is cancelled too
+    cancel_generation(session_id, "reset")
     
     return jsonify({"status": "reset"})
 
@@ -702,13 +1584,13 @@ def set_topic():
     session_id = request.json.get('session_id')
     topic = request.json.get("topic", "").strip()
     
-    if not session_id or session_id not in sessions:
+    if not session_id or sessions.load(session_id) is None:
         return jsonify({"status": "error", "message": "Invalid session"})
     
     if not topic:
         return jsonify({"status": "error", "message": "Topic cannot be empty"})
     
-    with session_lock:
+    with session_locks.for_key(session_id):
         session_data = sessions[session_id]
         
         if session_data['active']:
@@ -717,13 +1599,15 @@ def set_topic():
         session_data['topic'] = topic
         session_data['for_position_label'] = f"For {topic}"
         session_data['against_position_label'] = f"Against {topic}"
-        session_data['conversation'] = []
+        clear_conversation(session_id, session_data)
+        persist_session(session_id, session_data)
         
-        socketio.emit('topic_updated', {
+        emit('topic_updated', {
             "topic": topic, 
             "for_label": session_data['for_position_label'],
             "against_label": session_data['against_position_label']
         }, room=session_id)
+    cancel_generation(session_id, "topic")
     
     return jsonify({
         "status": "success", 
@@ -732,6 +1616,125 @@ def set_topic():
         "against_label": f"Against {topic}"
     })
 
+def resolve_socket_session(sid, flask_session_id):
+    """Returns the debate session for a connecting socket, reusing the browser's previous one or creating a new one."""
+    socketio_session_id = None
+    if flask_session_id:
+        with session_lock:
+            socketio_session_id = flask_to_socketio_map.get(flask_session_id)
+        if socketio_session_id is None:
+            # Not in memory (evicted, or the server restarted): look the browser's session up in the store
+            socketio_session_id = session_backend.find_session(flask_session_id)
+    
+    if socketio_session_id and sessions.load(socketio_session_id) is not None:
+        with session_lock:
+            if flask_session_id:
+                flask_to_socketio_map[flask_session_id] = socketio_session_id
+            socket_sessions[sid] = socketio_session_id
+        return socketio_session_id
+
+    session_id = sid
+    
+    with session_lock:
+        if flask_session_id:
+            flask_to_socketio_map[flask_session_id] = session_id
+        socket_sessions[sid] = session_id
+    
+    with session_locks.for_key(session_id):
+        if session_id not in sessions:
+            sessions[session_id] = new_session_data(flask_session_id)
+            persist_session(session_id, sessions[session_id])
+    return session_id
+
+def session_init_events(session_id, since=None, epoch=None):
+    """Returns the (event, data) pairs that bring a freshly connected client up to date.
+
+    A reconnecting client passes the cursor of its last sync (the last seq it has and the
+    conversation epoch), and only the messages it missed are sent.
+    """
+    events = []
+    if session_id not in sessions:  # Verify session still exists
+        return events
+    with session_locks.for_key(session_id):
+        session_data = sessions.get(session_id)
+        if session_data is None:
+            return events
+        active = session_data['active']
+        topic_info = {
+            "topic": session_data['topic'],
+            "for_label": session_data['for_position_label'],
+            "against_label": session_data['against_position_label']
+        }
+        selected_for_model = session_data.get('selected_for_model', DEFAULT_MODEL_NAME)
+        selected_against_model = session_data.get('selected_against_model', DEFAULT_MODEL_NAME)
+        max_turns = session_data.get('max_turns', DEFAULT_MAX_TURNS)
+        thought_mode = session_data.get('thought_mode', THOUGHT_MODE)
+        num_predict = role_options("for", session_data.get('generation_options'))["num_predict"]
+        current_epoch = session_data['conversation_epoch']
+        last_seq = last_message_seq(session_data)
+        full_sync = since is None or epoch != current_epoch
+        missed_messages = messages_since(session_data, None if full_sync else since)
+
+    events.append(('session_init', {
+        "session_id": session_id,
+        "max_turns": max_turns, # Send current max_turns
+        "max_debate_turns": MAX_DEBATE_TURNS, # Server-side limit of max_turns
+        "thought_mode": thought_mode,
+        "num_predict": num_predict, # Debater reply length limit
+        "max_num_predict": NUMERIC_OPTIONS["num_predict"][2]
+    }))
+    
+    events.append(('conversation_status', {
+        "active": active,
+        "is_long_ollama_operation_active": is_long_ollama_operation_active
+    }))
+    
+    events.append(('topic_info', topic_info))
+
+    # Emit model information (may wait on an HTTP refresh, so no lock is held)
+    ollama1_models = model_inventory.get(resolve_backend("ollama1")) # For LLM
+    ollama2_models = model_inventory.get(resolve_backend("ollama2")) # Against LLM
+    events.append(('models_info', {
+        "ollama1_models": ollama1_models, # For LLM
+        "ollama2_models": ollama2_models, # Against LLM
+        "pullable_models": PULLABLE_MODELS_LIST,
+        "selected_for_model": selected_for_model,
+        "selected_against_model": selected_against_model,
+        "default_model": DEFAULT_MODEL_NAME,
+        "max_turns": max_turns # Send current max_turns
+    }))
+    
+    if backend_init_running:
+        events.append(('backend_status', backend_status_payload()))
+
+    if missed_messages or since is not None:
+        # Messages are kept in seq order, so no sorting is needed
+        events.append(('conversation_history', {
+            "messages": missed_messages,
+            "epoch": current_epoch,
+            "last_seq": last_seq,
+            "full": full_sync
+        }))
+    return events
+
+def mark_disconnected(sid):
+    """Detaches a disconnected socket from its session and returns the session id, or None.
+
+    Once no socket is attached to the session any more, its debate is stopped; a running
+    evaluation finishes for the next visit. After a reconnect the socket's id differs from the
+    session's, so the session is looked up in socket_sessions.
+    """
+    with session_lock:
+        session_id = socket_sessions.pop(sid, None)
+        attached = session_id in socket_sessions.values()
+    if session_id is None or attached:
+        return session_id
+    with session_locks.for_key(session_id):
+        if session_id in sessions:
+            sessions[session_id]['active'] = False
+    cancel_generation(session_id, "disconnect", scopes=("debate",))
+    return session_id
+
 @socketio.on('connect')
 def handle_connect():
     flask_session_id = request.args.get('flask_session_id')
@@ -741,94 +1744,36 @@ def handle_connect():
         except:
             flask_session_id = None
     
-    socketio_session_id = None
-    if flask_session_id:
-        with session_lock:
-            socketio_session_id = flask_to_socketio_map.get(flask_session_id)
-    
-    if socketio_session_id and socketio_session_id in sessions:
-        session_id = socketio_session_id
-    else:
-        session_id = request.sid
-        
-        if flask_session_id:
-            with session_lock:
-                flask_to_socketio_map[flask_session_id] = session_id
-        
-        with session_lock:
-            if session_id not in sessions:
-                default_topic = "God's existence"
-                sessions[session_id] = {
-                    'conversation': [],
-                    'active': False,
-                    'topic': default_topic,
-                    'for_position_label': f"For {default_topic}",
-                    'against_position_label': f"Against {default_topic}",
-                    'flask_session_id': flask_session_id,
-                    'selected_for_model': DEFAULT_MODEL_NAME,
-                    'selected_against_model': DEFAULT_MODEL_NAME,
-                    'max_turns': DEFAULT_MAX_TURNS # Add default max_turns
-                }
+    session_id = resolve_socket_session(request.sid, flask_session_id)
+    since, epoch = parse_sync_cursor(request.args.get('since'), request.args.get('epoch'))
     
     join_room(session_id)
     
-    with session_lock:
-        if session_id in sessions:  # Verify session still exists
-            session_data = sessions[session_id]
-            
-            socketio.emit('session_init', {
-                "session_id": session_id,
-                "max_turns": session_data.get('max_turns', DEFAULT_MAX_TURNS) # Send current max_turns
-            }, room=session_id)
-            
-            socketio.emit('conversation_status', {
-                "active": session_data['active'],
-                "is_long_ollama_operation_active": is_long_ollama_operation_active
-            }, room=session_id)
-            
-            socketio.emit('topic_info', {
-                "topic": session_data['topic'],
-                "for_label": session_data['for_position_label'],
-                "against_label": session_data['against_position_label']
-            }, room=session_id)
-
-            # Emit model information
-            ollama1_models = list_models_in_container(OLLAMA_FOR_CONTAINER_NAME) # For LLM
-            ollama2_models = list_models_in_container(OLLAMA_AGAINST_CONTAINER_NAME) # Against LLM
-            socketio.emit('models_info', {
-                "ollama1_models": ollama1_models, # For LLM
-                "ollama2_models": ollama2_models, # Against LLM
-                "pullable_models": PULLABLE_MODELS_LIST,
-                "selected_for_model": session_data.get('selected_for_model', DEFAULT_MODEL_NAME),
-                "selected_against_model": session_data.get('selected_against_model', DEFAULT_MODEL_NAME),
-                "default_model": DEFAULT_MODEL_NAME,
-                "max_turns": session_data.get('max_turns', DEFAULT_MAX_TURNS) # Send current max_turns
-            }, room=session_id)
-            
-            if session_data['conversation']:
-                ordered_messages = sorted(
-                    session_data['conversation'],
-                    key=lambda msg: msg.get('timestamp', 0) if isinstance(msg, dict) else 0
-                )
-                socketio.emit('conversation_history', {
-                    "messages": ordered_messages
-                }, room=session_id)
+    for event, data in session_init_events(session_id, since, epoch):
+        emit(event, data, room=session_id)
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    session_id = request.sid
-    with session_lock:
-        if session_id in sessions:
-            sessions[session_id]['active'] = False
-    leave_room(session_id)
+    session_id = mark_disconnected(request.sid)
+    if session_id is not None:
+        leave_room(session_id)
 
 if __name__ == '__main__':
+    if OLLAMA_BACKGROUND_INIT:
+        print("Starting LLM Debate Application; Ollama services initialize in the background...")
+        start_background_initialization()
+        print("Server running on http://localhost:5000")
+        socketio.run(app, debug=True, use_reloader=False, host='0.0.0.0', port=5000, allow_unsafe_werkzeug=True)
+        sys.exit(0)
+
     print("Attempting to initialize Docker services for Ollama...")
     if not initialize_ollama_services():
         print("Failed to initialize Docker services. Please check Docker is running and configured correctly.")
         print("Exiting application.")
         sys.exit(1)
     
+    model_inventory.refresh_all()
+    residency_manager.refresh_all()
     print("Docker services initialized. Starting LLM Debate Application...")
     print("Server running on http://localhost:5000")
     socketio.run(app, debug=True, host='0.0.0.0', port=5000, allow_unsafe_werkzeug=True)
@@ -0,0 +1,211 @@
+import asyncio
+import sys
+import time
+from contextlib import nullcontext
+from urllib.parse import parse_qs
+
+import socketio
+import uvicorn
+from a2wsgi import WSGIMiddleware
+
+# Asyncio execution mode: debates run as coroutines on one event loop and stream from
+# Ollama with aiohttp, so an idle-waiting debate costs a coroutine instead of an OS thread.
+# The Flask routes in app.py are reused unchanged (served from a small thread pool), and so
+# are the debate flow (app.debate_steps) and the per-chunk streaming logic
+# (app.GenerationStream); only the Socket.IO server and the drivers that perform their I/O
+# are async here.
+# Run with `python async_app.py`; `python app.py` remains the threading fallback.
+import app as debate_app
+import ollama_client
+from initialize_docker import initialize_ollama_services
+from generation_cache import cache_key, areplay
+
+HTTP_WORKER_THREADS = 16  # Threads serving the (synchronous) Flask routes
+
+sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
+asgi_app = socketio.ASGIApp(sio, other_asgi_app=WSGIMiddleware(debate_app.app, workers=HTTP_WORKER_THREADS))
+
+class AsyncioRuntime:
+    """Execution mode that schedules debates as coroutines on the server's event loop."""
+
+    def __init__(self, loop):
+        self.loop = loop
+
+    def emit(self, event, data, room=None):
+        # Called from the Flask route threads; hand the emit over to the event loop
+        coro = sio.emit(event, data, room=room)
+        if _running_loop() is self.loop:
+            self.loop.create_task(coro)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def start_debate(self, session_id):
+        asyncio.run_coroutine_threadsafe(conversation_loop(session_id), self.loop)
+
+    def start_evaluation(self, session_id):
+        asyncio.run_coroutine_threadsafe(evaluate_debate(session_id), self.loop)
+
+async def emit(event, data, room=None):
+    """Emits a Socket.IO event from the event loop, counted like app.emit."""
+    debate_app.emits_total.inc(event=event)
+    await sio.emit(event, data, room=room)
+
+async def emit_events(session_id, events):
+    for event, payload in events:
+        await emit(event, payload, room=session_id)
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+async def stream_generation(session_id, speaker, base_url, path, data, message_id, error_prefix="Error", require_active=True):
+    """Async counterpart of app.stream_generation."""
+    generation_cache = debate_app.generation_cache
+    token = debate_app.open_cancel_token(session_id, "debate" if require_active else "evaluation")
+    try:
+        if token.cancelled:
+            return "", "", None
+        key = cache_key(path, data) if generation_cache.enabled else None
+        # The disk tier is read off the event loop
+        cached = await asyncio.to_thread(generation_cache.get, key) if key else None
+        if cached is not None:
+            return await _stream_generation(session_id, speaker, base_url, path, data, message_id, error_prefix, token, cached=cached)
+        scheduler = debate_app.scheduler
+        if not await scheduler.acquire_async(base_url, session_id, lambda: not token.cancelled and debate_app.is_session_live(session_id, require_active)):
+            return "", "", None
+        started_at = time.monotonic()
+        try:
+            return await _stream_generation(session_id, speaker, base_url, path, data, message_id, error_prefix, token, key=key)
+        finally:
+            scheduler.release(base_url, time.monotonic() - started_at)
+            if token.cancelled:
+                debate_app.note_cancelled(token)
+    finally:
+        debate_app.close_cancel_token(session_id, token)
+
+async def _stream_generation(session_id, speaker, base_url, path, data, message_id, error_prefix, token, key=None, cached=None):
+    """Asyncio driver of app.GenerationStream; see app._stream_generation."""
+    stream = debate_app.GenerationStream(session_id, speaker, base_url, data, message_id, error_prefix, token, cached)
+    await emit_events(session_id, stream.begin())
+    deadline_timer = None
+    try:
+        async with (ollama_client.astream_post(base_url, path, data) if cached is None else nullcontext()) as response:
+            if cached is not None:
+                chunks = areplay(cached)
+            elif response.status != 200:
+                await emit_events(session_id, stream.fail(f"{response.status} - {await response.text()}"))
+                return stream.result()
+            else:
+                # Cancels come from route threads; the response is closed on the event loop
+                loop = asyncio.get_running_loop()
+                seconds_left = stream.connected(lambda: loop.call_soon_threadsafe(response.close))
+                if seconds_left is not None:
+                    deadline_timer = loop.call_later(seconds_left, stream.budget.expire, response.close)
+                chunks = ollama_client.aiter_stream_chunks(response)
+            async for chunk in chunks:
+                await emit_events(session_id, stream.feed(chunk))
+                if stream.ended:
+                    break
+            if stream.truncated:
+                response.close()
+            await emit_events(session_id, stream.end_of_stream())
+    except Exception as e:
+        await emit_events(session_id, stream.broken(e))
+    finally:
+        if deadline_timer is not None:
+            deadline_timer.cancel()
+
+    await emit_events(session_id, stream.finish())
+    if stream.completed and key:
+        await asyncio.to_thread(debate_app.generation_cache.put, key, stream.text())
+    return stream.result()
+
+async def request_summary(session_id, base_url, data):
+    """Coroutine version of app.request_summary."""
+    scheduler = debate_app.scheduler
+    if not await scheduler.acquire_async(base_url, session_id, lambda: debate_app.is_session_live(session_id)):
+        return None
+    started_at = time.monotonic()
+    try:
+        async with await ollama_client.arequest("POST", base_url, "/api/generate", data) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+    except Exception as e:
+        return debate_app.summary_failed(session_id, base_url, e)
+    finally:
+        scheduler.release(base_url, time.monotonic() - started_at)
+
+async def run_steps(steps):
+    """Coroutine version of app.run_steps: awaits each step's I/O on the event loop."""
+    result = None
+    while True:
+        try:
+            operation, *args = steps.send(result)
+        except StopIteration:
+            return
+        result = None
+        if operation == "emit":
+            event, payload, room = args
+            await emit(event, payload, room=room)
+        elif operation == "sleep":
+            await asyncio.sleep(*args)
+        elif operation == "stream":
+            result = await stream_generation(*args)
+        elif operation == "summarize":
+            result = await request_summary(*args)
+
+async def evaluate_debate(session_id):
+    await run_steps(debate_app.evaluation_steps(session_id))
+
+async def conversation_loop(session_id):
+    await run_steps(debate_app.debate_steps(session_id))
+
+@sio.event
+async def connect(sid, environ):
+    query = parse_qs(environ.get('QUERY_STRING', ''))
+    flask_session_id = query.get('flask_session_id', [None])[0]
+    since, epoch = debate_app.parse_sync_cursor(query.get('since', [None])[0], query.get('epoch', [None])[0])
+
+    # May load the session from the durable store, so keep it off the event loop
+    session_id = await asyncio.to_thread(debate_app.resolve_socket_session, sid, flask_session_id)
+    sio.enter_room(sid, session_id)
+
+    # Model listing may wait on an HTTP refresh, so keep it off the event loop
+    events = await asyncio.to_thread(debate_app.session_init_events, session_id, since, epoch)
+    for event, data in events:
+        await emit(event, data, room=session_id)
+
+@sio.event
+async def disconnect(sid):
+    await asyncio.to_thread(debate_app.mark_disconnected, sid)
+
+async def serve(host='0.0.0.0', port=5000, background_init=False):
+    debate_app.runtime = AsyncioRuntime(asyncio.get_running_loop())
+    if background_init:
+        debate_app.start_background_initialization()
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host=host, port=port))
+    try:
+        await server.serve()
+    finally:
+        await ollama_client.aclose_all()
+
+if __name__ == '__main__':
+    if debate_app.OLLAMA_BACKGROUND_INIT:
+        print("Starting LLM Debate Application (asyncio mode); Ollama services initialize in the background...")
+        print("Server running on http://localhost:5000")
+        asyncio.run(serve(background_init=True))
+        sys.exit(0)
+
+    print("Attempting to initialize Docker services for Ollama...")
+    if not initialize_ollama_services():
+        print("Failed to initialize Docker services. Please check Docker is running and configured correctly.")
+        print("Exiting application.")
+        sys.exit(1)
+
+    debate_app.model_inventory.refresh_all()
+    debate_app.residency_manager.refresh_all()
+    print("Docker services initialized. Starting LLM Debate Application (asyncio mode)...")
+    print("Server running on http://localhost:5000")
+    asyncio.run(serve())
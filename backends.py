@@ -0,0 +1,170 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# Registry of the configured Ollama instances and the routing policy for generations.
+# Every turn goes to the healthy instance with the requested model where it is expected to
+# finish soonest: the wait behind the scheduler's running + queued generations at the
+# instance's recently observed tokens/s, plus a model load if the model is not in memory
+# (see residency.py) and the reload of any model that load would evict. The caller's
+# preferred instance (a side's previous one, which holds its chat prefix in the KV cache)
+# is kept unless it is expected to be more than ROUTING_AFFINITY_SECONDS slower.
+
+DEFAULT_TOKENS_PER_SECOND = 20.0  # Throughput assumed while no instance has served a turn yet
+UNHEALTHY_RETRY_SECONDS = 30.0  # An instance that failed to connect is skipped for this long
+TURN_TOKENS = 350  # Typical reply length, to turn queued generations into seconds of waiting
+MODEL_LOAD_SECONDS = float(os.environ.get("MODEL_LOAD_SECONDS", "15"))  # Assumed time to load a model into an instance's memory
+ROUTING_AFFINITY_SECONDS = float(os.environ.get("ROUTING_AFFINITY_SECONDS", "5"))  # Extra expected time a preferred instance may cost before a turn moves
+
+class Backend:
+    __slots__ = ("name", "base_url", "container_name", "models", "loaded_models", "max_loaded_models", "preloading", "ready", "healthy", "unhealthy_since", "tokens_per_second")
+
+    def __init__(self, name, base_url, container_name=None, max_loaded_models=1):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.container_name = container_name or name
+        self.models = None  # Set of model names, None until the inventory is known
+        self.loaded_models = OrderedDict()  # Models held in memory -> expiry (monotonic, None = unknown), least recently used first
+        self.max_loaded_models = max_loaded_models  # Models assumed to fit in the instance's memory at once
+        self.preloading = set()  # Models with a preload in flight (see residency.py)
+        self.ready = True  # False while the instance is still being started (background initialization)
+        self.healthy = True
+        self.unhealthy_since = 0.0
+        self.tokens_per_second = None
+
+    def is_available(self, now):
+        return self.ready and (self.healthy or now - self.unhealthy_since >= UNHEALTHY_RETRY_SECONDS)
+
+    def is_warm(self, model_name, now):
+        """True if the model is believed to be loaded in memory."""
+        if model_name not in self.loaded_models:
+            return False
+        expires_at = self.loaded_models[model_name]
+        return expires_at is None or now < expires_at
+
+    def resident_models(self, now):
+        """Models in memory, least recently used first, plus those whose preload is still running."""
+        resident = [name for name, expires_at in list(self.loaded_models.items()) if expires_at is None or now < expires_at]
+        resident.extend(name for name in list(self.preloading) if name not in resident)
+        return resident
+
+    def evictions(self, model_name, now):
+        """Models that loading model_name would push out of memory; empty if it is resident or loading."""
+        resident = self.resident_models(now)
+        if model_name in resident:
+            return []
+        return resident[:max(0, len(resident) + 1 - self.max_loaded_models)]
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "ready": self.ready,
+            "healthy": self.healthy,
+            "models": sorted(self.models) if self.models is not None else None,
+            "loaded_models": list(self.loaded_models),
+            "tokens_per_second": round(self.tokens_per_second, 1) if self.tokens_per_second else None,
+        }
+
+class BackendRegistry:
+    """Tracks Ollama instances and picks one for each generation."""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self._backends = {}  # name -> Backend, in configuration order
+        self._by_url = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, base_url, container_name=None, max_in_flight=None, max_loaded_models=1):
+        backend = Backend(name, base_url, container_name, max(1, int(max_loaded_models)))
+        with self._lock:
+            self._backends[name] = backend
+            self._by_url[backend.base_url] = backend
+        if max_in_flight:
+            self.scheduler.set_limit(backend.base_url, int(max_in_flight))
+        return backend
+
+    def get(self, name):
+        return self._backends.get(name)
+
+    def by_url(self, base_url):
+        return self._by_url.get(base_url.rstrip("/"))
+
+    def all(self):
+        return list(self._backends.values())
+
+    def set_models(self, name, models):
+        backend = self._backends.get(name)
+        if backend is not None:
+            backend.models = set(models)
+
+    def has_available(self, model_name):
+        """True if some ready, healthy instance is known to have the model."""
+        now = time.monotonic()
+        return any(backend.is_available(now) and backend.models and model_name in backend.models for backend in self.all())
+
+    def mark_unhealthy(self, base_url):
+        backend = self.by_url(base_url)
+        if backend is not None:
+            if backend.healthy:
+                print(f"Ollama instance '{backend.name}' at {backend.base_url} is unreachable; routing around it.")
+            backend.healthy = False
+            backend.unhealthy_since = time.monotonic()
+
+    def mark_healthy(self, base_url):
+        backend = self.by_url(base_url)
+        if backend is not None:
+            backend.healthy = True
+
+    def record_throughput(self, base_url, eval_count, eval_duration_ns):
+        """Folds the tokens/s of a finished generation (from Ollama's final chunk) into the instance's average."""
+        backend = self.by_url(base_url)
+        if backend is None or not eval_count or not eval_duration_ns:
+            return
+        tokens_per_second = eval_count / (eval_duration_ns / 1e9)
+        if backend.tokens_per_second is None:
+            backend.tokens_per_second = tokens_per_second
+        else:
+            backend.tokens_per_second = 0.7 * backend.tokens_per_second + 0.3 * tokens_per_second
+
+    def expected_seconds(self, backend, model_name, tokens_per_second, now):
+        """Rough time until a new generation with model_name would finish on backend."""
+        capacity = max(1, self.scheduler.limit(backend.base_url))
+        expected_load = (self.scheduler.load(backend.base_url) + 1) / capacity
+        seconds = expected_load * TURN_TOKENS / (backend.tokens_per_second or tokens_per_second)
+        resident = backend.resident_models(now)
+        if model_name not in resident:
+            # Load the model, and whoever uses an evicted model next has to load it again
+            seconds += MODEL_LOAD_SECONDS * (1 + len(backend.evictions(model_name, now)))
+        return seconds
+
+    def pick(self, model_name, preferred_url=None):
+        """Returns the base URL of the best instance for a generation with model_name.
+
+        Falls back to preferred_url when no healthy instance is known to have the model.
+        """
+        now = time.monotonic()
+        preferred_url = preferred_url.rstrip("/") if preferred_url else None
+        # Instances that have not served a turn yet are assumed to be as fast as the pool average,
+        # so an idle new instance is tried instead of queueing behind a measured one
+        measured = [backend.tokens_per_second for backend in self.all() if backend.tokens_per_second]
+        assumed_tokens_per_second = sum(measured) / len(measured) if measured else DEFAULT_TOKENS_PER_SECOND
+        best_url = None
+        best_seconds = None
+        preferred_seconds = None
+        for backend in self.all():
+            if not backend.is_available(now):
+                continue
+            if backend.models is None or model_name not in backend.models:
+                continue
+            seconds = self.expected_seconds(backend, model_name, assumed_tokens_per_second, now)
+            if backend.base_url == preferred_url:
+                preferred_seconds = seconds
+            if best_seconds is None or seconds < best_seconds:
+                best_url, best_seconds = backend.base_url, seconds
+        if best_url is None:
+            return preferred_url or (self.all()[0].base_url if self._backends else None)
+        if preferred_seconds is not None and preferred_seconds <= best_seconds + ROUTING_AFFINITY_SECONDS:
+            return preferred_url
+        return best_url
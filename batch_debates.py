@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Headless batch runner for model-comparison sweeps. Runs every topic against every
+# (for_model, against_model) pair through the same debate loop and evaluator as the web app,
+# without a browser or Socket.IO clients, and appends one JSON line per finished debate.
+# Debates run concurrently; the generation scheduler still bounds in-flight generations per
+# Ollama instance, so enough debates are kept running to fill every slot.
+#
+#   python batch_debates.py sweep.json --out results.jsonl
+#
+# sweep.json: {"topics": [...], "pairs": [["for_model", "against_model"], ...],
+#              "max_turns": 3, "repeats": 1, "seed": 42,
+#              "options": {"num_predict": 256}, "evaluator_options": {"temperature": 0.2}}
+
+# Batch sessions are throwaway; keep them out of the web app's session database
+os.environ.setdefault("SESSION_STORE_BACKEND", "memory")
+
+import app as debate_app
+from initialize_docker import initialize_ollama_services
+from messages import Role, speaker_label
+from generation_options import parse_request_options
+
+class BatchRuntime:
+    """Execution mode without clients: records each session's events for its result line."""
+
+    def __init__(self):
+        self._recorders = {}
+        self._lock = threading.Lock()
+
+    def watch(self, session_id):
+        recorder = DebateRecorder()
+        with self._lock:
+            self._recorders[session_id] = recorder
+        return recorder
+
+    def unwatch(self, session_id):
+        with self._lock:
+            self._recorders.pop(session_id, None)
+
+    def emit(self, event, data, room=None):
+        with self._lock:
+            recorder = self._recorders.get(room)
+        if recorder is not None:
+            recorder.record(event, data)
+
+    def start_debate(self, session_id):
+        debate_app.conversation_loop(session_id)
+
+    def start_evaluation(self, session_id):
+        # Called at the end of the debate loop, so the evaluation runs on the debate's worker
+        debate_app.evaluate_debate(session_id)
+
+class DebateRecorder:
+    """Timing of one debate's streamed messages, from its emitted events."""
+
+    def __init__(self):
+        self._turn_started = {}  # speaker -> when its typing indicator came on
+        self._streams = {}  # message_id -> timing of the streamed message
+        self.by_seq = {}  # seq -> timing, once the message has been saved
+
+    def record(self, event, data):
+        now = time.monotonic()
+        if event == 'typing_indicator' and data.get('typing'):
+            self._turn_started[data['speaker']] = now
+        elif event == 'stream_message':
+            stream = self._streams.get(data['message_id'])
+            if stream is None:
+                started_at = self._turn_started.pop(data['speaker'], now)
+                stream = self._streams[data['message_id']] = {"started_at": started_at, "first_chunk_at": now, "finished_at": None}
+            if data.get('done'):
+                stream["finished_at"] = now
+        elif event == 'message_saved':
+            stream = self._streams.pop(data['message_id'], None)
+            if stream is not None:
+                self.by_seq[data['seq']] = stream
+
+def timing_stats(stream, text):
+    if stream is None:
+        return None
+    finished_at = stream["finished_at"] or stream["first_chunk_at"]
+    seconds = finished_at - stream["started_at"]
+    streaming_seconds = finished_at - stream["first_chunk_at"]
+    return {
+        "seconds": round(seconds, 3),
+        "first_chunk_seconds": round(stream["first_chunk_at"] - stream["started_at"], 3),  # Includes queueing for a slot
+        "chars": len(text),
+        "chars_per_second": round(len(text) / streaming_seconds, 1) if streaming_seconds > 0 else None,
+    }
+
+def load_jobs(path, max_turns=None, repeats=None, seed=None):
+    """Expands a sweep file into one job per topic, model pair and repeat."""
+    with open(path, encoding="utf-8") as f:
+        sweep = json.load(f)
+    max_turns = max_turns or int(sweep.get("max_turns", debate_app.DEFAULT_MAX_TURNS))
+    repeats = repeats or int(sweep.get("repeats", 1))
+    seed = seed if seed is not None else debate_app.parse_seed(sweep.get("seed"))
+    generation_overrides = parse_request_options(sweep)
+    jobs = []
+    for topic in sweep["topics"]:
+        for pair in sweep["pairs"]:
+            for_model, against_model = (pair["for_model"], pair["against_model"]) if isinstance(pair, dict) else pair
+            for repeat in range(repeats):
+                jobs.append({
+                    "topic": topic,
+                    "for_model": for_model,
+                    "against_model": against_model,
+                    "max_turns": max_turns,
+                    "repeat": repeat,
+                    # Repeats of a seeded sweep get distinct but reproducible seeds
+                    "seed": seed + repeat if seed is not None else None,
+                    "generation_options": generation_overrides,
+                })
+    return jobs
+
+def new_batch_session(job):
+    """Creates the in-memory session a batch debate runs in, set up as /api/topic and /api/start would."""
+    session_data = debate_app.new_session_data()
+    topic = job["topic"]
+    session_data.update({
+        'topic': topic,
+        'for_position_label': f"For {topic}",
+        'against_position_label': f"Against {topic}",
+        'active': True,
+        'selected_for_model': job["for_model"],
+        'selected_against_model': job["against_model"],
+        'max_turns': job["max_turns"],
+        'context_modes': {"for": debate_app.DEBATE_CONTEXT_MODE, "against": debate_app.DEBATE_CONTEXT_MODE},
+        'thought_mode': "drop",
+        'seed': job["seed"],
+        'generation_options': job["generation_options"],
+    })
+    session_id = f"batch-{uuid.uuid4().hex[:12]}"
+    debate_app.sessions[session_id] = session_data
+    return session_id
+
+def run_debate(runtime, job):
+    """Runs one debate and its evaluation to completion; returns its result line."""
+    session_id = new_batch_session(job)
+    recorder = runtime.watch(session_id)
+    started_at = time.time()
+    try:
+        debate_app.preload_debate_models(session_id, job["for_model"], job["against_model"])
+        runtime.start_debate(session_id)
+        with debate_app.session_locks.for_key(session_id):
+            session_data = debate_app.sessions.get(session_id)
+            conversation = list(session_data['conversation']) if session_data is not None else []
+            labels = debate_app.session_labels(session_data) if session_data is not None else (None, None)
+    finally:
+        runtime.unwatch(session_id)
+        with debate_app.session_locks.for_key(session_id):
+            if session_id in debate_app.sessions:
+                del debate_app.sessions[session_id]
+
+    turns = []
+    verdict = None
+    for msg in conversation:
+        if msg.role in (Role.FOR, Role.AGAINST):
+            turns.append({
+                "seq": msg.seq,
+                "side": "for" if msg.role == Role.FOR else "against",
+                "speaker": speaker_label(msg.role, labels),
+                "model": job["for_model"] if msg.role == Role.FOR else job["against_model"],
+                "text": msg.clean,
+                "stats": timing_stats(recorder.by_seq.get(msg.seq), msg.text),
+                "generation": msg.stats,  # Ollama's token counts and timings
+            })
+        elif msg.role == Role.EVALUATOR:
+            verdict = {"model": debate_app.EVALUATOR_MODEL, "text": msg.clean, "stats": timing_stats(recorder.by_seq.get(msg.seq), msg.text), "generation": msg.stats}
+
+    return {
+        **job,
+        "status": "completed" if verdict is not None else "incomplete",
+        "started_at": started_at,
+        "seconds": round(time.time() - started_at, 3),
+        "turns": turns,
+        "verdict": verdict,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a sweep of debates without the web UI and write the results as JSONL.")
+    parser.add_argument("sweep", help="JSON file with topics and (for_model, against_model) pairs")
+    parser.add_argument("--out", default="-", help="JSONL output file, appended to (default: stdout)")
+    parser.add_argument("--max-turns", type=int, help="Exchanges per debate (overrides the sweep file)")
+    parser.add_argument("--repeats", type=int, help="Debates per topic and pair (overrides the sweep file)")
+    parser.add_argument("--seed", type=int, help="Base sampling seed (overrides the sweep file)")
+    parser.add_argument("--per-backend", type=int, help="Concurrent generations per Ollama instance (default: OLLAMA_MAX_IN_FLIGHT or the container config)")
+    parser.add_argument("--concurrency", type=int, help="Debates run at once (default: twice the generation slots, so slots stay busy between turns)")
+    parser.add_argument("--skip-init", action="store_true", help="Use the Ollama instances as they are instead of starting the containers")
+    args = parser.parse_args(argv)
+
+    jobs = load_jobs(args.sweep, args.max_turns, args.repeats, args.seed)
+    if not jobs:
+        print("The sweep has no debates to run.", file=sys.stderr)
+        return 1
+
+    if not args.skip_init and not initialize_ollama_services():
+        print("Failed to initialize Docker services for Ollama.", file=sys.stderr)
+        return 1
+    debate_app.model_inventory.refresh_all()
+    debate_app.residency_manager.refresh_all()
+
+    backends = debate_app.backend_registry.all()
+    if args.per_backend:
+        for backend in backends:
+            debate_app.scheduler.set_limit(backend.base_url, args.per_backend)
+    slots = sum(debate_app.scheduler.limit(backend.base_url) for backend in backends)
+    concurrency = args.concurrency or max(1, 2 * slots)
+
+    runtime = BatchRuntime()
+    debate_app.runtime = runtime
+
+    out = sys.stdout if args.out == "-" else open(args.out, "a", encoding="utf-8")
+    print(f"Running {len(jobs)} debates, {concurrency} at a time on {len(backends)} Ollama instances ({slots} generation slots).", file=sys.stderr)
+    sweep_started_at = time.monotonic()
+    completed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(run_debate, runtime, job): job for job in jobs}
+            for finished, future in enumerate(as_completed(futures), 1):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {**job, "status": "error", "error": str(e)}
+                completed += result["status"] == "completed"
+                # Results are written as they finish, so a long sweep can be followed and resumed from
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                print(f"[{finished}/{len(jobs)}] {job['topic']}: {job['for_model']} vs {job['against_model']} {result['status']}"
+                      f"{' in %.1fs' % result['seconds'] if 'seconds' in result else ''}", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{completed}/{len(jobs)} debates completed in {time.monotonic() - sweep_started_at:.1f}s.", file=sys.stderr)
+    return 0 if completed == len(jobs) else 2
+
+if __name__ == '__main__':
+    sys.exit(main())
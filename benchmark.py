@@ -0,0 +1,285 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+
+import requests
+import socketio
+
+from mock_ollama import DEFAULT_MODELS
+
+# Offline benchmark of the app's own overhead. Starts mock Ollama instances (mock_ollama.py)
+# that stream timestamped tokens at a fixed rate, starts the app against them in either
+# execution mode, and drives simulated Socket.IO clients through topic -> start -> evaluation.
+# Reports the latency the app adds to each token, emits per second, connect time, and the
+# server's CPU time per debate and peak memory, so hot-path regressions show up without GPUs.
+#
+#   python benchmark.py --clients 20 --turns 2 --mode asyncio --json bench.json
+#
+# CPU and memory are read from /proc and are only reported on Linux.
+
+SERVER_READY_TIMEOUT_SECONDS = 30.0
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_until_ready(url, process, timeout=SERVER_READY_TIMEOUT_SECONDS):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            if requests.get(url, timeout=1).status_code < 500:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    return False
+
+def process_cpu_seconds(pid):
+    """User plus system CPU time of a process, or None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # The command name may contain spaces; fields after it are fixed
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def process_peak_rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+def percentiles(values, points=(50, 95, 99)):
+    if not values:
+        return {f"p{point}": None for point in points} | {"max": None}
+    ordered = sorted(values)
+    result = {f"p{point}": round(ordered[min(len(ordered) - 1, int(len(ordered) * point / 100))], 3) for point in points}
+    result["max"] = round(ordered[-1], 3)
+    return result
+
+class SimulatedClient:
+    """One browser: connects, sets a topic, starts a debate and waits for the verdict."""
+
+    def __init__(self, base_url, index, model, turns, timeout):
+        self.base_url = base_url
+        self.index = index
+        self.model = model
+        self.turns = turns
+        self.timeout = timeout
+        self.token_latencies = []  # Seconds from the mock sending a token to this client receiving it
+        self.stream_emits = 0
+        self.events = 0
+        self.connect_seconds = None
+        self.completed = False
+        self.error = None
+        self.transport = None
+        self._session_init = threading.Event()
+        self._finished = threading.Event()
+        self.session_id = None
+
+    def run(self):
+        sio = socketio.Client(reconnection=False)
+        sio.on('*', self._on_event)
+        try:
+            started_at = time.perf_counter()
+            sio.connect(f"{self.base_url}?flask_session_id=bench-{self.index}-{time.time_ns()}")
+            if not self._session_init.wait(self.timeout):
+                raise RuntimeError("no session_init")
+            self.connect_seconds = time.perf_counter() - started_at
+            self.transport = sio.transport()
+
+            response = requests.post(f"{self.base_url}/api/topic", json={"session_id": self.session_id, "topic": f"Benchmark topic {self.index}"}, timeout=10).json()
+            if response.get("status") != "success":
+                raise RuntimeError(f"/api/topic: {response}")
+            response = requests.post(f"{self.base_url}/api/start", json={
+                "session_id": self.session_id, "max_turns": self.turns,
+                "for_model": self.model, "against_model": self.model,
+            }, timeout=10).json()
+            if response.get("status") != "started":
+                raise RuntimeError(f"/api/start: {response}")
+            self.completed = self._finished.wait(self.timeout)
+            if not self.completed:
+                raise RuntimeError("timed out waiting for the verdict")
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            sio.disconnect()
+
+    def _on_event(self, event, data):
+        received_at = time.time()
+        self.events += 1
+        if event == 'session_init':
+            self.session_id = data['session_id']
+            self._session_init.set()
+        elif event == 'stream_message':
+            self.stream_emits += 1
+            for word in data.get('message', '').split():
+                if word.startswith('@'):
+                    try:
+                        self.token_latencies.append(received_at - float(word[1:]))
+                    except ValueError:
+                        pass
+            if data.get('speaker') == "Evaluator" and data.get('done'):
+                self._finished.set()
+
+def serve(mode, port):
+    """Runs the app in this process against the instances in OLLAMA_CONTAINERS_CONFIG (no Docker)."""
+    import app as debate_app
+    debate_app.model_inventory.refresh_all()
+    debate_app.residency_manager.refresh_all()
+    if mode == "asyncio":
+        import asyncio
+        import async_app
+        asyncio.run(async_app.serve(host='127.0.0.1', port=port))
+    else:
+        debate_app.socketio.run(debate_app.app, host='127.0.0.1', port=port, allow_unsafe_werkzeug=True, log_output=False)
+
+def run_benchmark(args):
+    work_dir = tempfile.mkdtemp(prefix="debate-bench-")
+    log_path = os.path.join(work_dir, "processes.log")
+    log = open(log_path, "w")
+    processes = []
+    try:
+        containers = []
+        for index in range(args.instances):
+            port = free_port()
+            processes.append(subprocess.Popen([
+                sys.executable, "mock_ollama.py", "--port", str(port), "--models", args.model,
+                "--tokens", str(args.tokens), "--tokens-per-second", str(args.tokens_per_second), "--ttft-ms", str(args.ttft_ms),
+            ], cwd=os.path.dirname(os.path.abspath(__file__)), stdout=log, stderr=log))
+            containers.append({
+                "name": f"mock{index + 1}", "host_port": str(port), "container_port": "11434", "volume": f"mock{index + 1}",
+                "base_url": f"http://127.0.0.1:{port}",
+                # Enough slots that debates never queue: the benchmark measures the app, not the scheduler
+                "max_in_flight": args.per_backend or args.clients,
+            })
+            if not wait_until_ready(containers[-1]["base_url"], processes[-1]):
+                raise RuntimeError(f"mock Ollama did not start, see {log_path}")
+
+        config_path = os.path.join(work_dir, "containers.json")
+        with open(config_path, "w") as f:
+            json.dump(containers, f)
+
+        app_port = free_port()
+        env = dict(os.environ, OLLAMA_CONTAINERS_CONFIG=config_path, SESSION_STORE_BACKEND="memory")
+        env.setdefault("EVALUATOR_MODEL", args.model)
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", args.mode, "--port", str(app_port)],
+                                  cwd=os.path.dirname(os.path.abspath(__file__)), env=env, stdout=log, stderr=log)
+        processes.append(server)
+        base_url = f"http://127.0.0.1:{app_port}"
+        if not wait_until_ready(f"{base_url}/api/sessions/stats", server):
+            raise RuntimeError(f"the app did not start, see {log_path}")
+
+        cpu_before = process_cpu_seconds(server.pid)
+        clients = [SimulatedClient(base_url, index, args.model, args.turns, args.timeout) for index in range(args.clients)]
+        threads = [threading.Thread(target=client.run, daemon=True) for client in clients]
+        started_at = time.perf_counter()
+        for thread in threads:
+            thread.start()
+            if args.ramp_ms:
+                time.sleep(args.ramp_ms / 1000.0)
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - started_at
+        cpu_after = process_cpu_seconds(server.pid)
+        peak_rss_mb = process_peak_rss_mb(server.pid)
+
+        lock_stats = requests.get(f"{base_url}/api/locks/stats", timeout=5).json()
+        completed = sum(client.completed for client in clients)
+        stream_emits = sum(client.stream_emits for client in clients)
+        server_cpu = cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None
+        report = {
+            "mode": args.mode,
+            "clients": args.clients,
+            "turns": args.turns,
+            "transport": next((client.transport for client in clients if client.transport), None),
+            "mock": {"instances": args.instances, "tokens": args.tokens, "tokens_per_second": args.tokens_per_second, "ttft_ms": args.ttft_ms},
+            "debates_completed": completed,
+            "errors": [client.error for client in clients if client.error],
+            "wall_seconds": round(wall_seconds, 3),
+            "connect_ms": percentiles([client.connect_seconds * 1000 for client in clients if client.connect_seconds is not None]),
+            "token_latency_ms": {"tokens": sum(len(client.token_latencies) for client in clients),
+                                 **percentiles([latency * 1000 for client in clients for latency in client.token_latencies])},
+            "stream_emits": stream_emits,
+            "emits_per_second": round(stream_emits / wall_seconds, 1) if wall_seconds > 0 else None,
+            "events_per_second": round(sum(client.events for client in clients) / wall_seconds, 1) if wall_seconds > 0 else None,
+            "server_cpu_seconds": round(server_cpu, 3) if server_cpu is not None else None,
+            "cpu_seconds_per_debate": round(server_cpu / completed, 4) if server_cpu is not None and completed else None,
+            "server_peak_rss_mb": round(peak_rss_mb, 1) if peak_rss_mb is not None else None,
+            "locks": {"contended": lock_stats["session_locks"]["contended"], "wait_seconds": lock_stats["session_locks"]["wait_seconds"],
+                      "map_lock_contended": lock_stats["session_map_lock"]["contended"]},
+        }
+        return report
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        log.close()
+
+def print_report(report):
+    latency = report["token_latency_ms"]
+    connect = report["connect_ms"]
+    print(f"{report['debates_completed']}/{report['clients']} debates ({report['mode']} mode, {report['turns']} exchanges, {report['transport']} transport) in {report['wall_seconds']}s")
+    print(f"  token latency added: p50 {latency['p50']}ms  p95 {latency['p95']}ms  p99 {latency['p99']}ms  max {latency['max']}ms  ({latency['tokens']} tokens)")
+    print(f"  connect to session_init: p50 {connect['p50']}ms  p95 {connect['p95']}ms  max {connect['max']}ms")
+    print(f"  stream emits: {report['stream_emits']} ({report['emits_per_second']}/s), all events {report['events_per_second']}/s")
+    print(f"  server CPU: {report['server_cpu_seconds']}s total, {report['cpu_seconds_per_debate']}s per debate; peak RSS {report['server_peak_rss_mb']} MB")
+    print(f"  session locks: {report['locks']['contended']} contended acquisitions, {report['locks']['wait_seconds']}s waiting")
+    for error in report["errors"][:5]:
+        print(f"  error: {error}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's streaming overhead against mock Ollama instances.")
+    parser.add_argument("--clients", type=int, default=10, help="Simulated browsers, one debate each")
+    parser.add_argument("--turns", type=int, default=1, help="Exchanges per debate")
+    parser.add_argument("--mode", choices=("threading", "asyncio"), default="threading", help="Execution mode of the app")
+    parser.add_argument("--instances", type=int, default=2, help="Mock Ollama instances")
+    parser.add_argument("--per-backend", type=int, help="Concurrent generations per instance (default: one per client)")
+    parser.add_argument("--model", default=DEFAULT_MODELS[0])
+    parser.add_argument("--tokens", type=int, default=120, help="Tokens per reply")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--ttft-ms", type=float, default=200.0)
+    parser.add_argument("--ramp-ms", type=float, default=20.0, help="Delay between client starts")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds a client waits for its verdict")
+    parser.add_argument("--json", help="Also write the report to this file")
+    parser.add_argument("--max-p95-ms", type=float, help="Exit with status 3 if the p95 added token latency exceeds this")
+    parser.add_argument("--serve", choices=("threading", "asyncio"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return 0
+
+    report = run_benchmark(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if report["debates_completed"] < args.clients:
+        return 2
+    p95 = report["token_latency_ms"]["p95"]
+    if args.max_p95_ms is not None and p95 is not None and p95 > args.max_p95_ms:
+        return 3
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
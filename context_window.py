@@ -0,0 +1,103 @@
+import os
+import re
+import json
+
+from messages import Role, speaker_label
+
+# Token-budgeted debate context. Every turn's prompt stays within a per-model token budget:
+# <think> blocks of reasoning models are stripped, the most recent turns are kept verbatim and
+# older turns are folded into a rolling summary that is updated after each exchange.
+# Token counts are estimated from the text length; no tokenizer is needed.
+
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "1536"))  # Prompt tokens per debater turn
+PROMPT_TOKEN_BUDGETS = json.loads(os.environ.get("PROMPT_TOKEN_BUDGETS", "{}"))  # Per-model overrides, e.g. {"qwen3:4b": 3072}
+RECENT_TOKEN_RATIO = 0.5  # After a fold, verbatim turns use at most this share of the room left by system prompt and summary
+MIN_RECENT_MESSAGES = 2  # The latest messages are never folded into the summary
+SUMMARY_MAX_TOKENS = 256  # Length limit of the generated summary
+CHARS_PER_TOKEN = 4  # Rough average for English text with the models this app ships
+
+_THINK_BLOCK = re.compile(r"<think>.*?(?:</think>|$)", re.DOTALL)  # An unclosed block runs to the end
+
+SUMMARY_SYSTEM_PROMPT = "You maintain a running summary of a debate. Merge the new messages into the existing summary. Keep each side's key arguments and rebuttals, drop repetition, and reply with the updated summary only."
+
+def strip_thoughts(text):
+    """Removes <think>...</think> blocks from a model reply."""
+    if not isinstance(text, str):
+        return ""
+    return _THINK_BLOCK.sub("", text).strip()
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def token_budget(model_name):
+    """Prompt token budget for a model."""
+    return int(PROMPT_TOKEN_BUDGETS.get(model_name, PROMPT_TOKEN_BUDGET))
+
+def debate_messages(conversation, start=0):
+    """Returns (index, role, text) for the debate turns in conversation[start:], thoughts stripped.
+
+    System announcements, evaluator verdicts and turns that were only thoughts are skipped.
+    """
+    messages = []
+    for index in range(start, len(conversation)):
+        msg = conversation[index]
+        if msg.role in (Role.SYSTEM, Role.EVALUATOR):
+            continue
+        text = msg.clean  # Thoughts were stripped when the message was recorded
+        if text:
+            messages.append((index, msg.role, text))
+    return messages
+
+def recent_messages(conversation, start, budget_tokens):
+    """The newest debate turns from conversation[start:] that fit in budget_tokens (always at least the latest one)."""
+    messages = debate_messages(conversation, start)
+    used = 0
+    first = len(messages)
+    while first > 0:
+        cost = estimate_tokens(messages[first - 1][2])
+        if used + cost > budget_tokens and first < len(messages):
+            break
+        used += cost
+        first -= 1
+    return messages[first:]
+
+def fold_point(conversation, covered, budget_tokens):
+    """Index up to which turns should be folded into the summary, or None while the verbatim turns fit.
+
+    covered is the index the summary already reaches. Folding leaves the verbatim turns at
+    RECENT_TOKEN_RATIO of the budget, so the summary (and the prompt prefix) changes only
+    every few exchanges.
+    """
+    messages = debate_messages(conversation, covered)
+    if sum(estimate_tokens(text) for _, _, text in messages) <= budget_tokens:
+        return None
+    target = budget_tokens * RECENT_TOKEN_RATIO
+    kept = 0
+    first_kept = len(messages)
+    while first_kept > 0:
+        cost = estimate_tokens(messages[first_kept - 1][2])
+        if kept + cost > target and len(messages) - first_kept >= MIN_RECENT_MESSAGES:
+            break
+        kept += cost
+        first_kept -= 1
+    if first_kept == 0:
+        return None
+    return messages[first_kept][0]
+
+def format_transcript(messages, labels):
+    """labels is the session's (for_label, against_label)."""
+    return "\n\n".join(f"{speaker_label(role, labels)}: {text}" for _, role, text in messages)
+
+def summary_prompt(previous_summary, folded_messages, topic, labels):
+    """Returns (system, prompt) asking a model to fold new turns into the running summary."""
+    prompt = f"Debate topic: {topic}\n\n"
+    if previous_summary:
+        prompt += f"Summary so far:\n{previous_summary}\n\n"
+    prompt += f"New messages:\n{format_transcript(folded_messages, labels)}\n\nUpdated summary:"
+    return SUMMARY_SYSTEM_PROMPT, prompt
+
+def fallback_summary(previous_summary, folded_messages, labels):
+    """Summary used when the summarization call fails: the opening of each folded turn, trimmed to the summary limit."""
+    lines = [previous_summary] if previous_summary else []
+    lines.extend(f"{speaker_label(role, labels)}: {text[:200]}" for _, role, text in folded_messages)
+    return "\n".join(lines)[-SUMMARY_MAX_TOKENS * CHARS_PER_TOKEN:]
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Optional content-addressed cache of generations. A reply is keyed by everything that shapes
+# it: the endpoint, model, system prompt, built prompt or chat messages, options and seed.
+# Popular topics debated again with the same models (and, with a per-session seed, demos and
+# regression runs) are then replayed through the normal streaming path instead of using a
+# GPU. Recent entries are kept in an in-memory LRU, all of them as files on disk.
+
+GENERATION_CACHE = os.environ.get("GENERATION_CACHE", "0").lower() in ("1", "true", "yes")
+GENERATION_CACHE_MAX_ENTRIES = int(os.environ.get("GENERATION_CACHE_MAX_ENTRIES", "256"))  # In-memory tier
+GENERATION_CACHE_DIR = os.environ.get("GENERATION_CACHE_DIR", "generation_cache")  # On-disk tier; empty disables it
+GENERATION_CACHE_REPLAY_CPS = float(os.environ.get("GENERATION_CACHE_REPLAY_CPS", "400"))  # Replay pace in characters per second; 0 replays at once
+REPLAY_CHUNK_CHARS = 16
+
+# Request fields that do not change the reply
+_TRANSPORT_FIELDS = ("stream", "keep_alive")
+
+def cache_key(path, payload):
+    """Content address of a generation request."""
+    request = {field: value for field, value in payload.items() if field not in _TRANSPORT_FIELDS}
+    canonical = json.dumps({"path": path, "request": request}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def replay_chunks(text):
+    """Splits a cached reply into stream chunks shaped like Ollama's."""
+    for start in range(0, len(text), REPLAY_CHUNK_CHARS):
+        yield {"response": text[start:start + REPLAY_CHUNK_CHARS], "done": False}
+    yield {"response": "", "done": True}
+
+def replay(text, pace=None):
+    """Yields the chunks of a cached reply at the replay pace."""
+    pace = GENERATION_CACHE_REPLAY_CPS if pace is None else pace
+    for chunk in replay_chunks(text):
+        if pace > 0 and chunk["response"]:
+            time.sleep(len(chunk["response"]) / pace)
+        yield chunk
+
+async def areplay(text, pace=None):
+    """Async counterpart of replay."""
+    pace = GENERATION_CACHE_REPLAY_CPS if pace is None else pace
+    for chunk in replay_chunks(text):
+        if pace > 0 and chunk["response"]:
+            await asyncio.sleep(len(chunk["response"]) / pace)
+        yield chunk
+
+class GenerationCache:
+    """Two-tier (memory LRU, then disk) cache of generated replies."""
+
+    def __init__(self, enabled=GENERATION_CACHE, max_entries=GENERATION_CACHE_MAX_ENTRIES, directory=GENERATION_CACHE_DIR):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()  # key -> reply text, least recently used first
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "disk_errors": 0}
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Returns the cached reply for a key, or None (always None while the cache is disabled)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                self.counters["memory_hits"] += 1
+                return text
+        text = self._read(key)
+        with self._lock:
+            if text is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["hits"] += 1
+            self.counters["disk_hits"] += 1
+            self._remember(key, text)
+        return text
+
+    def put(self, key, text):
+        """Stores a completed reply in both tiers."""
+        if not self.enabled or not text:
+            return
+        with self._lock:
+            self._remember(key, text)
+            self.counters["stores"] += 1
+        self._write(key, text)
+
+    def _remember(self, key, text):
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)["text"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Reading cached generation {key} failed: {e}")
+            with self._lock:
+                self.counters["disk_errors"] += 1
+            return None
+
+    def _write(self, key, text):
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so readers never see a partial file
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"text": text, "stored_at": time.time()}, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Writing cached generation {key} failed: {e}")
+            with self._lock:
+                self.counters["disk_errors"] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "memory_entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "directory": self.directory or None,
+                "hit_ratio": round(self.counters["hits"] / lookups, 3) if lookups else None,
+                **self.counters,
+            }
@@ -0,0 +1,112 @@
+import os
+import json
+import time
+
+# Length and sampling settings of the debaters' and the evaluator's replies, plus hard caps
+# enforced while streaming. Ollama reads these from a request's "options" (num_predict, num_ctx,
+# temperature, stop, seed) and ignores top-level fields such as max_tokens. Each role has
+# defaults that a debate can override in /api/start. Whatever num_predict says, the streaming
+# loop stops reading a reply once it runs past GENERATION_MAX_SECONDS or GENERATION_MAX_TOKENS,
+# and it closes the connection so Ollama stops generating. The time cap is enforced by a timer
+# armed at the deadline, so it also ends a reply whose next chunk never comes.
+
+ROLES = ("for", "against", "evaluator")
+
+DEBATER_NUM_PREDICT = int(os.environ.get("DEBATER_NUM_PREDICT", "350"))  # Reply length limit of a debater turn, in tokens
+EVALUATOR_NUM_PREDICT = int(os.environ.get("EVALUATOR_NUM_PREDICT", "400"))  # Reply length limit of the verdict
+OLLAMA_NUM_CTX = int(os.environ.get("OLLAMA_NUM_CTX", "0"))  # Context window of debater and evaluator requests; 0 keeps the model's default
+# Per-role overrides; "debater" applies to both sides, e.g. {"debater": {"temperature": 0.9}, "evaluator": {"temperature": 0.2}}
+GENERATION_OPTIONS = json.loads(os.environ.get("GENERATION_OPTIONS", "{}"))
+GENERATION_MAX_SECONDS = float(os.environ.get("GENERATION_MAX_SECONDS", "180"))  # Wall-clock cap of one reply, from the request; 0 disables
+GENERATION_MAX_TOKENS = int(os.environ.get("GENERATION_MAX_TOKENS", "1024"))  # Streamed-token cap of one reply; 0 disables
+
+MAX_STOP_SEQUENCES = 4
+# Accepted range of each numeric option; values outside it are clamped
+NUMERIC_OPTIONS = {
+    "num_predict": (int, 1, GENERATION_MAX_TOKENS or 8192),
+    "num_ctx": (int, 256, 131072),
+    "temperature": (float, 0.0, 2.0),
+    "seed": (int, -2**31, 2**31 - 1),
+}
+
+def parse_options(raw):
+    """Valid generation options from a request or config; unknown keys and malformed values are dropped."""
+    if not isinstance(raw, dict):
+        return {}
+    options = {}
+    for name, value in raw.items():
+        if name == "stop":
+            stops = [value] if isinstance(value, str) else value
+            if isinstance(stops, list) and stops and all(isinstance(stop, str) and stop for stop in stops):
+                options["stop"] = stops[:MAX_STOP_SEQUENCES]
+        elif name in NUMERIC_OPTIONS and not isinstance(value, bool):
+            kind, low, high = NUMERIC_OPTIONS[name]
+            try:
+                options[name] = min(max(kind(value), low), high)
+            except (ValueError, TypeError):
+                continue
+    return options
+
+def _role_defaults(role):
+    options = {"num_predict": EVALUATOR_NUM_PREDICT if role == "evaluator" else DEBATER_NUM_PREDICT}
+    if OLLAMA_NUM_CTX > 0:
+        options["num_ctx"] = OLLAMA_NUM_CTX
+    if role != "evaluator":
+        options.update(parse_options(GENERATION_OPTIONS.get("debater")))
+    options.update(parse_options(GENERATION_OPTIONS.get(role)))
+    return parse_options(options)
+
+DEFAULT_OPTIONS = {role: _role_defaults(role) for role in ROLES}
+
+def parse_request_options(data):
+    """Per-role overrides of a debate from /api/start: 'options' for both debaters, then
+    'for_options', 'against_options' and 'evaluator_options'."""
+    shared = parse_options(data.get('options'))
+    overrides = {
+        "for": {**shared, **parse_options(data.get('for_options'))},
+        "against": {**shared, **parse_options(data.get('against_options'))},
+        "evaluator": parse_options(data.get('evaluator_options')),
+    }
+    return {role: options for role, options in overrides.items() if options}
+
+def role_options(role, overrides=None, seed=None):
+    """Ollama options of a generation by role: the role's defaults, the debate's seed, then its overrides."""
+    options = dict(DEFAULT_OPTIONS[role])
+    if seed is not None:
+        options["seed"] = seed
+    options.update((overrides or {}).get(role, {}))
+    return options
+
+class GenerationBudget:
+    """Hard wall-clock and token cap of one streamed reply.
+
+    note_chunk() is called for every streamed chunk (Ollama sends one token per chunk) and
+    returns the cap that was exceeded ("time" or "tokens"), or None. The streaming loop arms a
+    timer for seconds_left() that calls expire(), which records the time cap as hit and aborts
+    the response even while no chunk arrives.
+    """
+
+    __slots__ = ("max_tokens", "deadline", "tokens", "expired")
+
+    def __init__(self, max_seconds=None, max_tokens=None):
+        max_seconds = GENERATION_MAX_SECONDS if max_seconds is None else max_seconds
+        self.max_tokens = GENERATION_MAX_TOKENS if max_tokens is None else max_tokens
+        self.deadline = time.monotonic() + max_seconds if max_seconds > 0 else None
+        self.tokens = 0
+        self.expired = None
+
+    def seconds_left(self):
+        """Seconds until the time cap, or None if there is none."""
+        return None if self.deadline is None else max(self.deadline - time.monotonic(), 0.0)
+
+    def expire(self, abort):
+        self.expired = "time"
+        abort()
+
+    def note_chunk(self):
+        self.tokens += 1
+        if self.max_tokens > 0 and self.tokens > self.max_tokens:
+            return "tokens"
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "time"
+        return None
@@ -1,9 +1,13 @@
+import os
 import subprocess
 import time
 import sys
 import re  # For parsing ollama list output
 import json  # Added for constructing JSON payload
 import requests  # Import requests library
+from concurrent.futures import ThreadPoolExecutor
+import ollama_client  # Pooled HTTP client for Ollama API calls
+import metrics
 
 OLLAMA_IMAGE = "ollama/ollama"
 DEFAULT_MODEL_NAME = "gemma3:4b"  # Renamed from MODEL_NAME to be more specific
@@ -26,19 +30,50 @@ CONTAINERS_CONFIG = [
     },
 ]
 
+# Any number of instances can be configured by pointing OLLAMA_CONTAINERS_CONFIG at a JSON
+# file holding a list in the same format as above. Optional per-entry keys:
+#   "base_url"      - where the app reaches the instance (default http://localhost:<host_port>)
+#   "max_in_flight" - concurrent generations allowed on this instance
+#   "max_loaded_models" - models that fit in the instance's memory at once
+CONTAINERS_CONFIG_FILE = os.environ.get("OLLAMA_CONTAINERS_CONFIG")
+if CONTAINERS_CONFIG_FILE:
+    with open(CONTAINERS_CONFIG_FILE) as config_file:
+        CONTAINERS_CONFIG = json.load(config_file)
+
+def container_base_url(config):
+    """Returns the Ollama API base URL for a container config entry."""
+    return config.get("base_url") or f"http://localhost:{config['host_port']}"
+
+READINESS_TIMEOUT_SECONDS = float(os.environ.get("OLLAMA_READINESS_TIMEOUT", "120"))  # Max wait for an instance's API
+READINESS_INITIAL_DELAY = 0.1  # First poll interval; doubles up to READINESS_MAX_DELAY
+READINESS_MAX_DELAY = 2.0
+
+def command_label(command):
+    """Short metrics label of a command, e.g. "exec" for ["docker", "exec", ...]."""
+    parts = command if isinstance(command, list) else command.split()
+    return parts[1] if len(parts) > 1 and parts[0] == "docker" else parts[0] if parts else ""
+
 def run_command(command, check=True, shell=False):
     """Helper function to run a shell command."""
+    label = command_label(command)
+    started_at = time.monotonic()
+    outcome = "error"
     try:
         process = subprocess.run(command, check=check, capture_output=True, text=True, shell=shell)
+        outcome = "ok" if process.returncode == 0 else "failed"
         return process
     except subprocess.CalledProcessError as e:
         print(f"Error executing command: {' '.join(command) if isinstance(command, list) else command}")
         print(f"Stdout: {e.stdout}")
         print(f"Stderr: {e.stderr}")
+        outcome = "failed"
         raise
     except FileNotFoundError:
         print(f"Error: Command '{command[0]}' not found. Is Docker installed and in PATH?")
         raise
+    finally:
+        metrics.docker_commands.inc(command=label, outcome=outcome)
+        metrics.docker_command_seconds.observe(time.monotonic() - started_at, command=label)
 
 def is_docker_daemon_running():
     """Checks if the Docker daemon is responsive."""
@@ -73,8 +108,6 @@ def start_ollama_container(name, host_port, container_port, volume_name):
             OLLAMA_IMAGE
         ])
         print(f"Container '{name}' started successfully.")
-        # Wait a bit for the container to initialize
-        time.sleep(5)
         return True
     except Exception as e:
         print(f"Failed to start container '{name}': {e}")
@@ -108,12 +141,13 @@ def list_models_in_container(container_name):
         print(f"Failed to list models in container '{container_name}': {e}")
         return []
 
-def pull_model_in_container(container_name, model_name_to_pull):
+def pull_model_in_container(container_name, model_name_to_pull, existing_models=None):
     """Pulls the specified model into the container if it doesn't exist."""
     print(f"Ensuring model '{model_name_to_pull}' is available in container '{container_name}'...")
     try:
         # Check if model exists
-        existing_models = list_models_in_container(container_name)
+        if existing_models is None:
+            existing_models = list_models_in_container(container_name)
         if model_name_to_pull in existing_models:
             print(f"Model '{model_name_to_pull}' already exists in '{container_name}'.")
             return True
@@ -129,13 +163,14 @@ def pull_model_in_container(container_name, model_name_to_pull):
 
 def delete_model_from_container(ollama_instance_base_url, model_name_to_delete):
     """Deletes the specified model from the given Ollama instance API."""
-    delete_url = f"{ollama_instance_base_url}/api/delete"
+    delete_path = "/api/delete"
+    delete_url = f"{ollama_instance_base_url}{delete_path}"
     payload = {"model": model_name_to_delete}
     
     print(f"Attempting to delete model '{model_name_to_delete}' from Ollama instance at {ollama_instance_base_url} via API call to {delete_url}...")
     
     try:
-        response = requests.delete(delete_url, json=payload)
+        response = ollama_client.delete(ollama_instance_base_url, delete_path, payload)
         
         if response.status_code == 200:
             print(f"Model '{model_name_to_delete}' deleted successfully from {ollama_instance_base_url}.")
@@ -159,30 +194,74 @@ def delete_model_from_container(ollama_instance_base_url, model_name_to_delete):
         print(f"An unexpected error occurred while trying to delete model '{model_name_to_delete}' from '{ollama_instance_base_url}': {e}")
         return False
 
-def initialize_ollama_services():
-    """Initializes Ollama Docker containers and ensures the default model is present."""
-    print("Initializing Ollama services...")
-    if not is_docker_daemon_running():
+def wait_for_ollama_ready(base_url, timeout=READINESS_TIMEOUT_SECONDS):
+    """Polls the Ollama HTTP endpoint with exponential backoff until it answers or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    delay = READINESS_INITIAL_DELAY
+    while True:
+        if ollama_client.probe(base_url):
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, READINESS_MAX_DELAY)
+
+def initialize_container(config, on_status=None):
+    """Starts one Ollama container if needed, waits for its API and ensures the default model is present."""
+    container_name = config["name"]
+    base_url = container_base_url(config)
+
+    def report(status):
+        if on_status is not None:
+            on_status(container_name, status)
+
+    print(f"\nProcessing container: {container_name}")
+    report("starting")
+    if not is_container_running(container_name):
+        print(f"Container '{container_name}' is not running.")
+        if not start_ollama_container(container_name, config["host_port"], config["container_port"], config["volume"]):
+            report("failed")
+            return False  # Skip model pull if container start failed
+    else:
+        print(f"Container '{container_name}' is already running.")
+
+    # Ensure the API is up before pulling the model
+    report("waiting_for_api")
+    started_waiting = time.monotonic()
+    if not wait_for_ollama_ready(base_url):
+        print(f"Ollama API of '{container_name}' at {base_url} did not become ready within {READINESS_TIMEOUT_SECONDS:.0f}s.")
+        report("failed")
+        return False
+    print(f"Ollama API of '{container_name}' ready after {time.monotonic() - started_waiting:.1f}s.")
+
+    report("pulling_model")
+    try:
+        existing_models = ollama_client.list_models(base_url)
+    except Exception:
+        existing_models = None  # Fall back to `ollama list` inside the container
+    if not pull_model_in_container(container_name, DEFAULT_MODEL_NAME, existing_models):
+        report("failed")
         return False
 
-    all_successful = True
-    for config in CONTAINERS_CONFIG:
-        container_name = config["name"]
-        print(f"\nProcessing container: {container_name}")
+    report("ready")
+    return True
 
-        if not is_container_running(container_name):
-            print(f"Container '{container_name}' is not running.")
-            if not start_ollama_container(container_name, config["host_port"], config["container_port"], config["volume"]):
-                all_successful = False
-                continue  # Skip model pull if container start failed
-        else:
-            print(f"Container '{container_name}' is already running.")
+def initialize_ollama_services(on_status=None):
+    """Initializes Ollama Docker containers and ensures the default model is present.
 
-        # Ensure container is fully up before pulling model
-        time.sleep(2)  # Brief pause after check/start
+    Containers are brought up concurrently; on_status(container_name, status) is called as each one progresses.
+    """
+    print("Initializing Ollama services...")
+    if not is_docker_daemon_running():
+        if on_status is not None:
+            for config in CONTAINERS_CONFIG:
+                on_status(config["name"], "failed")
+        return False
 
-        if not pull_model_in_container(container_name, DEFAULT_MODEL_NAME):
-            all_successful = False
+    with ThreadPoolExecutor(max_workers=max(1, len(CONTAINERS_CONFIG))) as executor:
+        results = list(executor.map(lambda config: initialize_container(config, on_status), CONTAINERS_CONFIG))
+    all_successful = all(results)
             
     if all_successful:
         print("\nOllama services initialized successfully.")
@@ -0,0 +1,78 @@
+import os
+import time
+import threading
+import zlib
+
+# Lock striping for per-session state, with wait-time instrumentation. Each session maps to
+# one of SESSION_LOCK_STRIPES locks, so unrelated sessions rarely contend and a slow
+# operation on one session only stalls the few sessions sharing its stripe. Every lock counts
+# its acquisitions, how many had to wait and for how long, so /api/locks/stats shows whether
+# contention grows with the number of active users.
+
+SESSION_LOCK_STRIPES = int(os.environ.get("SESSION_LOCK_STRIPES", "64"))
+
+class InstrumentedLock:
+    """threading.Lock that records how often and how long acquirers waited."""
+
+    __slots__ = ("_lock", "acquisitions", "contended", "wait_seconds", "max_wait_seconds")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def acquire(self):
+        if self._lock.acquire(blocking=False):
+            self.acquisitions += 1
+            return True
+        started_at = time.perf_counter()
+        self._lock.acquire()
+        waited = time.perf_counter() - started_at
+        # Counters are updated while holding the lock, so they need no extra synchronization
+        self.acquisitions += 1
+        self.contended += 1
+        self.wait_seconds += waited
+        if waited > self.max_wait_seconds:
+            self.max_wait_seconds = waited
+        return True
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def stats(self):
+        return {
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "wait_seconds": round(self.wait_seconds, 6),
+            "max_wait_seconds": round(self.max_wait_seconds, 6),
+        }
+
+class LockStripes:
+    """Fixed set of instrumented locks selected by key."""
+
+    def __init__(self, stripes=SESSION_LOCK_STRIPES):
+        self._locks = [InstrumentedLock() for _ in range(max(1, stripes))]
+
+    def for_key(self, key):
+        # crc32 rather than hash() so a key maps to the same stripe in every process
+        return self._locks[zlib.crc32(str(key).encode()) % len(self._locks)]
+
+    def stats(self):
+        totals = {"stripes": len(self._locks), "acquisitions": 0, "contended": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+        for lock in self._locks:
+            totals["acquisitions"] += lock.acquisitions
+            totals["contended"] += lock.contended
+            totals["wait_seconds"] += lock.wait_seconds
+            totals["max_wait_seconds"] = max(totals["max_wait_seconds"], lock.max_wait_seconds)
+        totals["wait_seconds"] = round(totals["wait_seconds"], 6)
+        totals["max_wait_seconds"] = round(totals["max_wait_seconds"], 6)
+        return totals
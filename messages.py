@@ -0,0 +1,75 @@
+import enum
+
+# Compact conversation records. A debate can hold thousands of sessions with long transcripts,
+# so a message is a slotted object that stores who spoke as a small Role instead of repeating
+# the "For {topic}"/"Against {topic}" label in every entry. Labels are resolved only when a
+# message is serialized for clients, prompts or storage.
+
+class Role(enum.IntEnum):
+    HUMAN = 0
+    FOR = 1
+    AGAINST = 2
+    SYSTEM = 3
+    EVALUATOR = 4
+
+FIXED_SPEAKERS = {Role.HUMAN: "Human", Role.SYSTEM: "System", Role.EVALUATOR: "Evaluator"}
+
+def speaker_label(role, labels):
+    """Display name of a role; labels is the session's (for_label, against_label)."""
+    if role == Role.FOR:
+        return labels[0]
+    if role == Role.AGAINST:
+        return labels[1]
+    return FIXED_SPEAKERS[role]
+
+def role_for_speaker(speaker, labels):
+    """Role of a stored speaker name (the inverse of speaker_label)."""
+    for role, name in FIXED_SPEAKERS.items():
+        if speaker == name:
+            return role
+    if speaker == labels[0]:
+        return Role.FOR
+    if speaker == labels[1]:
+        return Role.AGAINST
+    # Labels of an older topic; they follow the "For ..."/"Against ..." pattern
+    return Role.FOR if speaker.startswith("For ") else Role.AGAINST
+
+class Message:
+    """One conversation entry: its sequence number, who spoke, the text and when it was recorded.
+
+    text is the raw reply and clean the reply without <think> blocks; for messages without
+    thoughts they are the same string object, even though the clean text handed in was trimmed. stats holds the generation stats of a model's
+    reply (see app.generation_stats), None for other messages.
+    """
+
+    __slots__ = ("seq", "role", "text", "clean", "timestamp", "stats")
+
+    def __init__(self, seq, role, text, timestamp, clean=None, stats=None):
+        self.seq = seq
+        self.role = role
+        self.text = text
+        # Only a removed <think> block is worth a second copy; surrounding whitespace is not
+        self.clean = text if clean is None or clean == text or (clean and clean == text.strip()) else clean
+        self.timestamp = timestamp
+        self.stats = stats
+
+    def to_dict(self, labels, thoughts=True):
+        """Serialized for clients; with thoughts=False the message is sent without its <think> blocks."""
+        entry = {"seq": self.seq, "speaker": speaker_label(self.role, labels), "message": self.text if thoughts else self.clean, "timestamp": self.timestamp}
+        if self.stats is not None:
+            entry["stats"] = self.stats
+        return entry
+
+    def to_record(self, labels):
+        """Serialized for storage: the raw text, plus the clean text when it differs."""
+        record = self.to_dict(labels)
+        record["clean"] = self.clean if self.clean is not self.text else None
+        return record
+
+    @classmethod
+    def from_dict(cls, entry, labels):
+        return cls(entry['seq'], role_for_speaker(entry['speaker'], labels), entry['message'], entry['timestamp'], entry.get('clean'), entry.get('stats'))
+
+def stream_message_id(session_id, seq):
+    """Client-side id of a streamed message, unique across sessions because it includes both."""
+    return f"{session_id}-{seq}"
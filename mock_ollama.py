@@ -0,0 +1,178 @@
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Local stand-in for an Ollama instance, for benchmarks and development without a GPU.
+# Serves /api/tags, /api/ps, /api/generate and /api/chat (plus the pull and delete calls the
+# UI makes) and streams NDJSON at a fixed token rate after a fixed time to first token.
+# Every streamed token is the wall-clock time it was sent ("@<unix time> "), so a client on
+# the same machine can tell how much latency the app added to each token (see benchmark.py).
+
+DEFAULT_MODELS = ["gemma3:4b"]
+
+class MockOllama(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, models=DEFAULT_MODELS, tokens=120, tokens_per_second=50.0, ttft_ms=200.0):
+        super().__init__(address, MockOllamaHandler)
+        self.models = list(models)
+        self.tokens = tokens  # Tokens per reply, unless the request's num_predict asks for fewer
+        self.tokens_per_second = tokens_per_second
+        self.ttft = ttft_ms / 1000.0
+        self.loaded = {}  # model -> unix time its keep_alive expires
+        self.lock = threading.Lock()
+
+def token(sent_at):
+    return f"@{sent_at:.6f} "
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, as the app's pooled client expects
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, obj, status=200):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def do_GET(self):
+        if self.path == "/":
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/api/tags":
+            self._json({"models": [{"name": name, "model": name} for name in self.server.models]})
+        elif self.path == "/api/ps":
+            now = time.time()
+            with self.server.lock:
+                loaded = [name for name, expires_at in self.server.loaded.items() if expires_at > now]
+            self._json({"models": [{"name": name, "model": name} for name in loaded]})
+        else:
+            self._json({"error": "not found"}, 404)
+
+    def do_DELETE(self):
+        body = self._read_body()
+        with self.server.lock:
+            if body.get("model") in self.server.models:
+                self.server.models.remove(body["model"])
+        self._json({})
+
+    def do_POST(self):
+        body = self._read_body()
+        if self.path == "/api/pull":
+            with self.server.lock:
+                if body.get("model") and body["model"] not in self.server.models:
+                    self.server.models.append(body["model"])
+            self._json({"status": "success"})
+            return
+        if self.path not in ("/api/generate", "/api/chat"):
+            self._json({"error": "not found"}, 404)
+            return
+        model = body.get("model")
+        if model not in self.server.models:
+            self._json({"error": f"model '{model}' not found"}, 404)
+            return
+        self._note_loaded(model, body.get("keep_alive"))
+
+        # A request without a prompt only loads the model
+        if not body.get("prompt") and not body.get("messages"):
+            self._json({"model": model, "response": "", "done": True, "done_reason": "load"})
+            return
+
+        num_predict = body.get("options", {}).get("num_predict")
+        tokens = min(self.server.tokens, num_predict) if num_predict and num_predict > 0 else self.server.tokens
+        interval = 1.0 / self.server.tokens_per_second if self.server.tokens_per_second > 0 else 0.0
+        is_chat = self.path == "/api/chat"
+
+        started_at = time.time()
+        if not body.get("stream", True):
+            time.sleep(self.server.ttft + tokens * interval)
+            text = "".join(token(time.time()) for _ in range(tokens))
+            self._json({**self._final_chunk(model, tokens, started_at, is_chat), **({"message": {"role": "assistant", "content": text}} if is_chat else {"response": text})})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            time.sleep(self.server.ttft)
+            next_at = time.monotonic()
+            for _ in range(tokens):
+                delay = next_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                next_at += interval
+                text = token(time.time())
+                self._chunk({"model": model, "message": {"role": "assistant", "content": text}, "done": False} if is_chat else {"model": model, "response": text, "done": False})
+            final = self._final_chunk(model, tokens, started_at, is_chat)
+            final.update({"message": {"role": "assistant", "content": ""}} if is_chat else {"response": ""})
+            self._chunk(final)
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # The client stopped reading, as a cancelled generation does
+
+    def _chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _final_chunk(self, model, tokens, started_at, is_chat):
+        total_ns = int((time.time() - started_at) * 1e9)
+        eval_ns = int(tokens / self.server.tokens_per_second * 1e9) if self.server.tokens_per_second > 0 else 0
+        return {
+            "model": model,
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": total_ns,
+            "load_duration": 0,
+            "prompt_eval_count": 32,
+            "prompt_eval_duration": int(self.server.ttft * 1e9),
+            "eval_count": tokens,
+            "eval_duration": eval_ns,
+            **({} if is_chat else {"context": [1, 2, 3]}),
+        }
+
+    def _note_loaded(self, model, keep_alive):
+        seconds = 300.0
+        if isinstance(keep_alive, (int, float)):
+            seconds = float(keep_alive)
+        elif isinstance(keep_alive, str) and keep_alive[:-1].replace(".", "", 1).isdigit():
+            seconds = float(keep_alive[:-1]) * {"s": 1, "m": 60, "h": 3600}.get(keep_alive[-1], 1)
+        with self.server.lock:
+            self.server.loaded[model] = time.time() + seconds if seconds >= 0 else float("inf")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a mock Ollama API that streams timestamped tokens.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS), help="Comma-separated installed models")
+    parser.add_argument("--tokens", type=int, default=120, help="Tokens per reply")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Streaming rate; 0 streams as fast as possible")
+    parser.add_argument("--ttft-ms", type=float, default=200.0, help="Time to first token")
+    args = parser.parse_args(argv)
+
+    server = MockOllama((args.host, args.port), args.models.split(","), args.tokens, args.tokens_per_second, args.ttft_ms)
+    print(f"Mock Ollama on http://{args.host}:{args.port} ({args.tokens} tokens at {args.tokens_per_second}/s, TTFT {args.ttft_ms:.0f}ms)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import os
+import time
+import threading
+
+import ollama_client
+
+# Cached model lists per Ollama instance, read over HTTP (/api/tags) instead of forking
+# `docker exec ... ollama list`. Entries expire after MODEL_INVENTORY_TTL_SECONDS; an expired
+# entry is still served while one background refresh replaces it, and concurrent callers
+# share a single in-flight refresh. Pull/delete call refresh() to bypass the cache.
+
+MODEL_INVENTORY_TTL_SECONDS = float(os.environ.get("MODEL_INVENTORY_TTL_SECONDS", "30"))
+FAILED_REFRESH_RETRY_SECONDS = 5.0  # After a failed refresh, serve what we have for this long before retrying
+FIRST_FETCH_WAIT_SECONDS = 15.0  # Max time a caller waits for another caller's first fetch
+
+class _Entry:
+    __slots__ = ("models", "expires_at", "refreshing")
+
+    def __init__(self):
+        self.models = None
+        self.expires_at = 0.0
+        self.refreshing = None  # threading.Event while a refresh is in flight
+
+class ModelInventory:
+    """TTL cache of installed models per backend, feeding the routing registry."""
+
+    def __init__(self, registry, ttl=MODEL_INVENTORY_TTL_SECONDS):
+        self.registry = registry
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, backend):
+        """Returns the backend's model list, refreshing it if it has expired."""
+        with self._lock:
+            entry = self._entries.get(backend.name)
+            if entry is None:
+                entry = self._entries[backend.name] = _Entry()
+            if entry.models is not None and time.monotonic() < entry.expires_at:
+                return list(entry.models)
+            starts_refresh = entry.refreshing is None
+            if starts_refresh:
+                entry.refreshing = threading.Event()
+            refreshing = entry.refreshing
+            stale_models = entry.models
+
+        if stale_models is not None:
+            # Serve the expired list now; one background refresh replaces it
+            if starts_refresh:
+                threading.Thread(target=self._refresh, args=(backend, entry, refreshing), daemon=True).start()
+            return list(stale_models)
+
+        if starts_refresh:
+            self._refresh(backend, entry, refreshing)
+        else:
+            refreshing.wait(FIRST_FETCH_WAIT_SECONDS)
+        with self._lock:
+            return list(entry.models or [])
+
+    def refresh(self, backend):
+        """Fetches the model list now, bypassing the cache (used after pull/delete)."""
+        self.invalidate(backend)
+        with self._lock:
+            entry = self._entries.get(backend.name)
+            if entry is None:
+                entry = self._entries[backend.name] = _Entry()
+        self._refresh(backend, entry, None)
+        with self._lock:
+            return list(entry.models or [])
+
+    def invalidate(self, backend):
+        with self._lock:
+            entry = self._entries.get(backend.name)
+            if entry is not None:
+                entry.expires_at = 0.0
+
+    def refresh_all(self):
+        for backend in self.registry.all():
+            self.refresh(backend)
+
+    def _refresh(self, backend, entry, refreshing):
+        try:
+            models = ollama_client.list_models(backend.base_url)
+        except Exception as e:
+            print(f"Failed to list models on '{backend.name}' ({backend.base_url}): {e}")
+            models = None
+        with self._lock:
+            if models is not None:
+                entry.models = models
+                entry.expires_at = time.monotonic() + self.ttl
+            else:
+                if entry.models is None:
+                    entry.models = []
+                entry.expires_at = time.monotonic() + FAILED_REFRESH_RETRY_SECONDS
+            if refreshing is not None and entry.refreshing is refreshing:
+                entry.refreshing = None
+        if refreshing is not None:
+            refreshing.set()
+        if models is not None:
+            self.registry.set_models(backend.name, models)
@@ -0,0 +1,202 @@
+import os
+import json
+import socket
+import asyncio
+import contextlib
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import aiohttp  # Only needed by the asyncio execution mode (async_app.py)
+except ImportError:
+    aiohttp = None
+
+# Shared HTTP layer for every call made to an Ollama instance.
+# One requests.Session (and therefore one keep-alive connection pool) is kept per
+# base URL, so debate turns reuse TCP connections instead of reconnecting each time.
+
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", "5"))  # Seconds to establish a connection
+OLLAMA_READ_TIMEOUT = float(os.environ.get("OLLAMA_READ_TIMEOUT", "120"))  # Max seconds between bytes (covers model load + slow tokens)
+OLLAMA_CONNECT_RETRIES = int(os.environ.get("OLLAMA_CONNECT_RETRIES", "3"))  # Retries on connection errors only
+OLLAMA_RETRY_BACKOFF = float(os.environ.get("OLLAMA_RETRY_BACKOFF", "0.5"))  # Backoff factor between connect retries
+OLLAMA_POOL_MAXSIZE = int(os.environ.get("OLLAMA_POOL_MAXSIZE", "32"))  # Max pooled connections per instance
+
+DEFAULT_TIMEOUT = (OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def _build_session():
+    """Creates a requests.Session with a bounded pool and connect-only retries."""
+    # Only connection failures are retried: a request that reached Ollama may already
+    # be generating, so replaying it on a read error would duplicate GPU work.
+    retry = Retry(
+        total=OLLAMA_CONNECT_RETRIES,
+        connect=OLLAMA_CONNECT_RETRIES,
+        read=0,
+        redirect=0,
+        status=0,
+        backoff_factor=OLLAMA_RETRY_BACKOFF,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=OLLAMA_POOL_MAXSIZE, max_retries=retry)
+    http = requests.Session()
+    http.mount("http://", adapter)
+    http.mount("https://", adapter)
+    http.headers.update({"Content-Type": "application/json"})
+    return http
+
+def get_session(base_url):
+    """Returns the pooled session for an Ollama instance, creating it on first use."""
+    base_url = base_url.rstrip("/")
+    http = _sessions.get(base_url)
+    if http is None:
+        with _sessions_lock:
+            http = _sessions.get(base_url)
+            if http is None:
+                http = _build_session()
+                _sessions[base_url] = http
+    return http
+
+def post(base_url, path, payload, stream=False, timeout=DEFAULT_TIMEOUT):
+    """POSTs a JSON payload to an Ollama instance through its pooled session."""
+    return get_session(base_url).post(f"{base_url.rstrip('/')}{path}", json=payload, stream=stream, timeout=timeout)
+
+def get(base_url, path, timeout=DEFAULT_TIMEOUT):
+    """GETs an Ollama API path through the instance's pooled session."""
+    return get_session(base_url).get(f"{base_url.rstrip('/')}{path}", timeout=timeout)
+
+def delete(base_url, path, payload, timeout=DEFAULT_TIMEOUT):
+    """Sends a DELETE with a JSON body to an Ollama instance through its pooled session."""
+    return get_session(base_url).delete(f"{base_url.rstrip('/')}{path}", json=payload, timeout=timeout)
+
+_probe_session = requests.Session()  # No retries: readiness polling does its own backoff
+
+def probe(base_url, timeout=(1, 2)):
+    """True if the Ollama API at base_url answers (GET /)."""
+    try:
+        return _probe_session.get(f"{base_url.rstrip('/')}/", timeout=timeout).status_code == 200
+    except requests.exceptions.RequestException:
+        return False
+
+def list_models(base_url, timeout=(OLLAMA_CONNECT_TIMEOUT, 10)):
+    """Returns the names of the models installed on an Ollama instance (GET /api/tags)."""
+    response = get(base_url, "/api/tags", timeout=timeout)
+    response.raise_for_status()
+    return [model["name"] for model in response.json().get("models", [])]
+
+def list_running(base_url, timeout=(OLLAMA_CONNECT_TIMEOUT, 10)):
+    """Returns the names of the models currently loaded in an Ollama instance's memory (GET /api/ps)."""
+    response = get(base_url, "/api/ps", timeout=timeout)
+    response.raise_for_status()
+    return [model["name"] for model in response.json().get("models", [])]
+
+def stream_post(base_url, path, payload, timeout=DEFAULT_TIMEOUT):
+    """Starts a streaming /api/generate or /api/chat request. Use as a context manager so the connection returns to the pool."""
+    return post(base_url, path, payload, stream=True, timeout=timeout)
+
+def chunk_text(chunk):
+    """Returns the text carried by one stream chunk of /api/generate ("response") or /api/chat ("message"), or None."""
+    if 'response' in chunk:
+        return chunk['response']
+    message = chunk.get('message')
+    if isinstance(message, dict):
+        return message.get('content')
+    return None
+
+def abort_stream(response):
+    """Drops a streaming response's connection so Ollama stops generating; safe to call from any thread.
+
+    The socket is shut down rather than closed, which also wakes a thread blocked reading from
+    it. That thread's stream then ends with an error, and it closes the response itself.
+    """
+    connection = getattr(response.raw, "_connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass  # Already closed
+
+def close_all():
+    """Closes every pooled session (used on shutdown)."""
+    with _sessions_lock:
+        for http in _sessions.values():
+            http.close()
+        _sessions.clear()
+
+def is_connection_error(exc):
+    """True if an exception means the Ollama instance could not be reached at all."""
+    if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout)):
+        return True
+    return aiohttp is not None and isinstance(exc, (aiohttp.ClientConnectorError, aiohttp.ServerDisconnectedError))
+
+def iter_stream_chunks(response):
+    """Yields the decoded JSON objects of an Ollama NDJSON stream, skipping blank and malformed lines."""
+    for line in response.iter_lines():
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+# --- asyncio execution mode ---
+# Same policy as above (pool per instance, timeouts, connect-only retries) on aiohttp,
+# for use from coroutines running on the server's single event loop.
+
+_async_sessions = {}
+
+def get_async_session(base_url):
+    """Returns the aiohttp session for an Ollama instance, creating it on the running event loop."""
+    base_url = base_url.rstrip("/")
+    http = _async_sessions.get(base_url)
+    if http is None or http.closed:
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=OLLAMA_CONNECT_TIMEOUT, sock_read=OLLAMA_READ_TIMEOUT)
+        connector = aiohttp.TCPConnector(limit_per_host=OLLAMA_POOL_MAXSIZE)
+        http = aiohttp.ClientSession(connector=connector, timeout=timeout, headers={"Content-Type": "application/json"})
+        _async_sessions[base_url] = http
+    return http
+
+async def arequest(method, base_url, path, payload=None):
+    """Sends a request to an Ollama instance, retrying only if the connection cannot be established."""
+    url = f"{base_url.rstrip('/')}{path}"
+    attempt = 0
+    while True:
+        try:
+            return await get_async_session(base_url).request(method, url, json=payload)
+        except aiohttp.ClientConnectorError:
+            if attempt >= OLLAMA_CONNECT_RETRIES:
+                raise
+            attempt += 1
+            await asyncio.sleep(OLLAMA_RETRY_BACKOFF * (2 ** (attempt - 1)))
+
+@contextlib.asynccontextmanager
+async def astream_post(base_url, path, payload):
+    """Async counterpart of stream_post; releases the connection when the block exits."""
+    response = await arequest("POST", base_url, path, payload)
+    try:
+        yield response
+    finally:
+        response.release()
+
+async def aiter_stream_chunks(response):
+    """Async counterpart of iter_stream_chunks."""
+    async for line in response.content:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+async def aclose_all():
+    """Closes every aiohttp session (used on shutdown)."""
+    sessions_to_close = list(_async_sessions.values())
+    _async_sessions.clear()
+    for http in sessions_to_close:
+        await http.close()
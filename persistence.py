@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import queue
+import collections
+import sqlite3
+import threading
+
+from context_window import strip_thoughts
+
+# Durable storage for debate sessions behind the in-memory SessionStore. Messages are
+# appended once as rows; session settings are upserted when they change. Writes go through
+# a queue and are committed in batches by one writer thread, so recording a message never
+# waits on the disk. Sessions evicted from memory (or lost in a restart) are loaded back
+# from here when their browser reconnects.
+#
+# SESSION_STORE_BACKEND selects the backend: "sqlite" (default) or "memory" (no persistence).
+
+SESSION_STORE_BACKEND = os.environ.get("SESSION_STORE_BACKEND", "sqlite")
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", "debates.sqlite3")
+SESSION_DB_FLUSH_INTERVAL_SECONDS = float(os.environ.get("SESSION_DB_FLUSH_INTERVAL_MS", "200")) / 1000.0
+SESSION_DB_BATCH_SIZE = 256  # Max queued writes committed in one transaction
+
+# Session fields that are persisted; runtime state (active, evaluating, turn routing) is not
+PERSISTED_FIELDS = (
+    'topic', 'for_position_label', 'against_position_label', 'flask_session_id',
+    'selected_for_model', 'selected_against_model', 'max_turns', 'context_modes', 'summary',
+    'next_seq', 'conversation_epoch', 'thought_mode', 'seed',
+    'generation_options',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    flask_session_id TEXT,
+    settings TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_flask_session ON sessions (flask_session_id, updated_at);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    seq INTEGER,
+    speaker TEXT NOT NULL,
+    message TEXT NOT NULL,
+    clean TEXT,
+    stats TEXT,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_by_session ON messages (session_id, id);
+"""
+
+# Applied after SCHEMA; the seq index needs the column, which older databases gain in _migrate
+SEQ_INDEX = "CREATE INDEX IF NOT EXISTS messages_by_session_seq ON messages (session_id, seq)"
+
+
+def session_settings(session_data):
+    """The persisted part of a session, as stored by save_session."""
+    return {field: session_data[field] for field in PERSISTED_FIELDS if field in session_data}
+
+class MemoryBackend:
+    """No persistence: sessions exist only while they are in memory."""
+
+    def save_session(self, session_id, settings):
+        pass
+
+    def append_message(self, session_id, entry):
+        pass
+
+    def clear_messages(self, session_id):
+        pass
+
+    def load_session(self, session_id):
+        return None
+
+    def load_settings(self, session_id):
+        return None
+
+    def last_seq(self, session_id):
+        return 0
+
+    def find_session(self, flask_session_id):
+        return None
+
+    def get_messages(self, session_id, since=None):
+        """Returns the stored transcript, or None if this backend does not store one."""
+        return None
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+class SQLiteBackend:
+    """SQLite (WAL mode) session store with batched writes from a single writer thread."""
+
+    def __init__(self, path=SESSION_DB_PATH, flush_interval=SESSION_DB_FLUSH_INTERVAL_SECONDS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._local = threading.local()  # Read connection per thread; WAL lets readers run alongside the writer
+        self._queue = queue.Queue()
+        # Uncommitted writes per session id and per browser (flask session id), so that a read
+        # waits for the writer only when the rows it asks for are still queued
+        self._pending = collections.Counter()
+        self._pending_lock = threading.Lock()
+        writer_connection = self._connect()
+        writer_connection.executescript(SCHEMA)
+        self._migrate(writer_connection)
+        self._writer = threading.Thread(target=self._write_forever, args=(writer_connection,), daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")  # Durable across crashes of the app; WAL fsyncs on checkpoint
+        return connection
+
+    def _migrate(self, connection):
+        """Upgrades databases created before messages had seq, clean and stats columns."""
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(messages)")]
+        with connection:
+            if "seq" not in columns:
+                connection.execute("ALTER TABLE messages ADD COLUMN seq INTEGER")
+                # Within a session, rowids are in insertion order
+                connection.execute(
+                    "UPDATE messages SET seq = (SELECT COUNT(*) FROM messages AS earlier "
+                    "WHERE earlier.session_id = messages.session_id AND earlier.id <= messages.id)")
+            if "clean" not in columns:
+                connection.execute("ALTER TABLE messages ADD COLUMN clean TEXT")
+                rows = connection.execute("SELECT id, message FROM messages WHERE message LIKE '%<think>%'").fetchall()
+                connection.executemany("UPDATE messages SET clean = ? WHERE id = ?", [(strip_thoughts(message), row_id) for row_id, message in rows])
+            if "stats" not in columns:
+                connection.execute("ALTER TABLE messages ADD COLUMN stats TEXT")
+            connection.execute(SEQ_INDEX)
+
+    def _reader(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    # Writes are queued and applied in order by the writer thread
+
+    def _put(self, operation, args, keys):
+        with self._pending_lock:
+            self._pending.update(keys)
+        self._queue.put((operation, args, keys))
+
+    def save_session(self, session_id, settings):
+        flask_session_id = settings.get('flask_session_id')
+        keys = (session_id, ("browser", flask_session_id)) if flask_session_id else (session_id,)
+        self._put("save", (session_id, flask_session_id, json.dumps(settings), time.time()), keys)
+
+    def append_message(self, session_id, entry):
+        stats = entry.get('stats')
+        self._put("append", (session_id, entry['seq'], entry['speaker'], entry['message'], entry.get('clean'),
+                             json.dumps(stats) if stats is not None else None, entry['timestamp']), (session_id,))
+
+    def clear_messages(self, session_id):
+        self._put("clear", (session_id,), (session_id,))
+
+    def flush(self):
+        """Blocks until every write queued so far is committed."""
+        done = threading.Event()
+        self._queue.put(("flush", done, ()))
+        done.wait()
+
+    def _flush_pending(self, key):
+        """Flushes only if writes touching key are still queued."""
+        with self._pending_lock:
+            pending = self._pending[key] > 0
+        if pending:
+            self.flush()
+
+    def close(self):
+        self.flush()
+
+    def _write_forever(self, connection):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # Gather more writes for one transaction, but commit at once if someone is waiting
+            while len(batch) < SESSION_DB_BATCH_SIZE and batch[-1][0] != "flush":
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            waiting = []
+            try:
+                with connection:
+                    for operation, args, _ in batch:
+                        if operation == "save":
+                            connection.execute(
+                                "INSERT INTO sessions (session_id, flask_session_id, settings, updated_at) VALUES (?, ?, ?, ?) "
+                                "ON CONFLICT(session_id) DO UPDATE SET flask_session_id = excluded.flask_session_id, "
+                                "settings = excluded.settings, updated_at = excluded.updated_at",
+                                args)
+                        elif operation == "append":
+                            connection.execute("INSERT INTO messages (session_id, seq, speaker, message, clean, stats, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)", args)
+                        elif operation == "clear":
+                            connection.execute("DELETE FROM messages WHERE session_id = ?", args)
+                        elif operation == "flush":
+                            waiting.append(args)
+            except sqlite3.Error as e:
+                print(f"Writing {len(batch)} session updates to {self.path} failed: {e}")
+            with self._pending_lock:
+                for _, _, keys in batch:
+                    self._pending.subtract(keys)
+                self._pending += collections.Counter()  # Drops keys with nothing left pending
+            for done in waiting:
+                done.set()
+
+    # Reads
+
+    def load_session(self, session_id):
+        """Returns (settings, messages) of a stored session, or None."""
+        self._flush_pending(session_id)
+        row = self._reader().execute("SELECT settings FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), self.get_messages(session_id, flush=False)
+
+    def load_settings(self, session_id):
+        """Returns the settings of a stored session without its messages, or None."""
+        self._flush_pending(session_id)
+        row = self._reader().execute("SELECT settings FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def last_seq(self, session_id):
+        """Seq of a session's last stored message, 0 if it has none."""
+        self._flush_pending(session_id)
+        row = self._reader().execute("SELECT MAX(seq) FROM messages WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] or 0
+
+    def find_session(self, flask_session_id):
+        """Returns the most recently updated session of a browser, or None."""
+        self._flush_pending(("browser", flask_session_id))
+        row = self._reader().execute(
+            "SELECT session_id FROM sessions WHERE flask_session_id = ? ORDER BY updated_at DESC LIMIT 1",
+            (flask_session_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_messages(self, session_id, since=None, flush=True):
+        """Returns a session's messages in seq order, only those after seq since if given.
+
+        clean is the message without <think> blocks, or None when it has none; stats are the
+        generation stats of a model's reply, or None.
+        """
+        if flush:
+            self._flush_pending(session_id)
+        rows = self._reader().execute(
+            "SELECT seq, speaker, message, clean, stats, timestamp FROM messages WHERE session_id = ? AND seq > ? ORDER BY seq",
+            (session_id, since if since is not None else -1)).fetchall()
+        return [{"seq": seq, "speaker": speaker, "message": message, "clean": clean, "stats": json.loads(stats) if stats else None, "timestamp": timestamp}
+                for seq, speaker, message, clean, stats, timestamp in rows]
+
+def create_backend():
+    """Creates the session backend selected by SESSION_STORE_BACKEND."""
+    if SESSION_STORE_BACKEND == "memory":
+        return MemoryBackend()
+    if SESSION_STORE_BACKEND != "sqlite":
+        print(f"Unknown SESSION_STORE_BACKEND '{SESSION_STORE_BACKEND}'; using sqlite.")
+    return SQLiteBackend()
@@ -0,0 +1,165 @@
+import os
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+
+import ollama_client
+
+# Model residency: which models each Ollama instance holds in memory, and keeping the ones
+# debates need warm. Loaded models are read from /api/ps in the background and updated as
+# generations run. Starting a debate preloads both debaters' models where their first turns
+# will run, every request carries a keep_alive, and the evaluator is placed on an instance
+# where loading it does not evict a model an active debate still needs.
+
+DEBATER_KEEP_ALIVE = os.environ.get("DEBATER_KEEP_ALIVE", "30m")  # How long Ollama keeps a debater's model loaded after a turn
+EVALUATOR_KEEP_ALIVE = os.environ.get("EVALUATOR_KEEP_ALIVE", "10m")
+KEEP_ALIVE_OVERRIDES = json.loads(os.environ.get("OLLAMA_KEEP_ALIVE_OVERRIDES", "{}"))  # Per-model keep_alive, e.g. {"qwen3:4b": "1h"}
+OLLAMA_MAX_LOADED_MODELS = int(os.environ.get("OLLAMA_MAX_LOADED_MODELS", "1"))  # Models assumed to fit in one instance's memory
+RESIDENCY_REFRESH_SECONDS = float(os.environ.get("RESIDENCY_REFRESH_SECONDS", "15"))  # Max age of an instance's /api/ps snapshot
+PRELOAD_TIMEOUT = (ollama_client.OLLAMA_CONNECT_TIMEOUT, 600)  # Loading a large model from disk can take minutes
+
+_DURATION = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*([smh]?)\s*$")
+_DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600}
+
+def keep_alive_for(model_name, role="debater"):
+    """keep_alive sent with a request for model_name; role is "debater" or "evaluator"."""
+    if model_name in KEEP_ALIVE_OVERRIDES:
+        return KEEP_ALIVE_OVERRIDES[model_name]
+    return EVALUATOR_KEEP_ALIVE if role == "evaluator" else DEBATER_KEEP_ALIVE
+
+def keep_alive_seconds(keep_alive):
+    """Seconds a keep_alive value keeps a model loaded; None for forever (negative) or unparseable values."""
+    match = _DURATION.match(str(keep_alive))
+    if match is None:
+        return None
+    seconds = float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+    return None if seconds < 0 else seconds
+
+class ResidencyManager:
+    """Tracks loaded models per instance, preloads models and places the evaluator."""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._refreshed_at = {}  # backend name -> monotonic time of the last /api/ps read
+        self._refreshing = set()
+
+    def refresh(self, backend):
+        """Reads the instance's loaded models from /api/ps now."""
+        try:
+            running = ollama_client.list_running(backend.base_url)
+        except Exception as e:
+            print(f"Failed to read loaded models on '{backend.name}' ({backend.base_url}): {e}")
+            running = None
+        with self._lock:
+            self._refreshed_at[backend.name] = time.monotonic()
+            self._refreshing.discard(backend.name)
+            if running is not None:
+                # Keep our expiry estimates for models that are still loaded
+                backend.loaded_models = OrderedDict((name, backend.loaded_models.get(name)) for name in running)
+
+    def refresh_all(self):
+        for backend in self.registry.all():
+            self.refresh(backend)
+
+    def refresh_stale(self):
+        """Starts a background /api/ps read for every instance whose snapshot is older than RESIDENCY_REFRESH_SECONDS."""
+        now = time.monotonic()
+        for backend in self.registry.all():
+            with self._lock:
+                if backend.name in self._refreshing or now - self._refreshed_at.get(backend.name, 0.0) < RESIDENCY_REFRESH_SECONDS:
+                    continue
+                self._refreshing.add(backend.name)
+            threading.Thread(target=self.refresh, args=(backend,), daemon=True).start()
+
+    def note_loaded(self, base_url, model_name, keep_alive=None):
+        """Records that a request just ran model_name on an instance (it is now loaded and most recently used)."""
+        backend = self.registry.by_url(base_url)
+        if backend is None:
+            return
+        seconds = keep_alive_seconds(keep_alive) if keep_alive is not None else None
+        with self._lock:
+            backend.loaded_models[model_name] = time.monotonic() + seconds if seconds is not None else None
+            backend.loaded_models.move_to_end(model_name)
+            # Assume Ollama evicted the least recently used models to make room
+            while len(backend.loaded_models) > backend.max_loaded_models:
+                backend.loaded_models.popitem(last=False)
+
+    def eviction_cost(self, backend, model_name, pinned_models, now):
+        """0 if the model is warm, 1 if loading it evicts nothing pinned, 2 if it evicts a pinned model."""
+        if backend.is_warm(model_name, now):
+            return 0
+        with self._lock:
+            # Models still being preloaded will be resident by the time this one loads
+            if model_name in backend.resident_models(now):
+                return 0
+            victims = backend.evictions(model_name, now)
+        return 2 if any(name in pinned_models for name in victims) else 1
+
+    def place(self, model_name, pinned_models, preferred_url=None):
+        """Returns the base URL to run model_name on without evicting pinned models where possible.
+
+        Prefers instances holding the model, then ones with room for it, then the least loaded.
+        """
+        self.refresh_stale()
+        now = time.monotonic()
+        preferred_url = preferred_url.rstrip("/") if preferred_url else None
+        best_url = None
+        best_score = None
+        for backend in self.registry.all():
+            if not backend.is_available(now) or backend.models is None or model_name not in backend.models:
+                continue
+            score = (
+                self.eviction_cost(backend, model_name, pinned_models, now),
+                self.registry.scheduler.load(backend.base_url) / max(1, self.registry.scheduler.limit(backend.base_url)),
+                backend.base_url != preferred_url,
+            )
+            if best_score is None or score < best_score:
+                best_url, best_score = backend.base_url, score
+        if best_url is None:
+            return self.registry.pick(model_name, preferred_url)
+        return best_url
+
+    def prewarm(self, model_name, pinned_models, keep_alive, preferred_url=None):
+        """Preloads a model where it will be placed, unless loading it there would evict a pinned model.
+
+        Returns the base URL it was placed on.
+        """
+        base_url = self.place(model_name, pinned_models, preferred_url)
+        backend = self.registry.by_url(base_url)
+        if backend is not None and self.eviction_cost(backend, model_name, pinned_models, time.monotonic()) == 1:
+            self.preload(base_url, model_name, keep_alive)
+        return base_url
+
+    def preload(self, base_url, model_name, keep_alive):
+        """Loads a model into an instance's memory in the background unless it is already warm.
+
+        Returns True if a preload was started.
+        """
+        backend = self.registry.by_url(base_url)
+        if backend is None or backend.is_warm(model_name, time.monotonic()):
+            return False
+        with self._lock:
+            if model_name in backend.preloading:
+                return False
+            backend.preloading.add(model_name)
+        threading.Thread(target=self._preload, args=(backend, model_name, keep_alive), daemon=True).start()
+        return True
+
+    def _preload(self, backend, model_name, keep_alive):
+        started_at = time.monotonic()
+        try:
+            # A generate request without a prompt only loads the model
+            response = ollama_client.post(backend.base_url, "/api/generate", {"model": model_name, "keep_alive": keep_alive, "stream": False}, timeout=PRELOAD_TIMEOUT)
+            if response.status_code == 200:
+                self.note_loaded(backend.base_url, model_name, keep_alive)
+                print(f"Preloaded '{model_name}' on '{backend.name}' in {time.monotonic() - started_at:.1f}s.")
+            else:
+                print(f"Preloading '{model_name}' on '{backend.name}' failed: {response.status_code} - {response.text}")
+        except Exception as e:
+            print(f"Preloading '{model_name}' on '{backend.name}' failed: {e}")
+        finally:
+            with self._lock:
+                backend.preloading.discard(model_name)
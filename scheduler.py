@@ -0,0 +1,194 @@
+import os
+import math
+import asyncio
+import threading
+from collections import deque
+
+# Admission control for Ollama generations. Each backend (Ollama base URL) runs at most
+# OLLAMA_MAX_IN_FLIGHT generations at once; further turns wait in a FIFO queue per backend
+# and their sessions are told their queue position and estimated wait.
+# The same scheduler serves both execution modes: threads block on an Event,
+# coroutines await a Future resolved through their event loop.
+
+OLLAMA_MAX_IN_FLIGHT = int(os.environ.get("OLLAMA_MAX_IN_FLIGHT", "2"))  # Concurrent generations per Ollama instance
+SCHEDULER_MAX_QUEUED_TURNS = int(os.environ.get("SCHEDULER_MAX_QUEUED_TURNS", "32"))  # New debates are refused past this
+INITIAL_TURN_SECONDS = 20.0  # Wait estimate used until a backend has completed a turn
+QUEUE_POLL_SECONDS = 0.5  # How often a queued turn checks whether its debate was stopped
+
+class _Waiter:
+    __slots__ = ("session_id", "granted", "_event", "_loop", "_future")
+
+    def __init__(self, session_id, loop=None):
+        self.session_id = session_id
+        self.granted = False
+        self._loop = loop
+        self._event = None if loop else threading.Event()
+        self._future = loop.create_future() if loop else None
+
+    def wake(self):
+        if self._loop is None:
+            self._event.set()
+        else:
+            self._loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self._future.done():
+            self._future.set_result(True)
+
+class _Backend:
+    __slots__ = ("max_in_flight", "in_flight", "queue", "avg_turn_seconds")
+
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.queue = deque()
+        self.avg_turn_seconds = None
+
+class GenerationScheduler:
+    """FIFO scheduler bounding in-flight generations per Ollama backend."""
+
+    def __init__(self, max_in_flight=OLLAMA_MAX_IN_FLIGHT, max_queued_turns=SCHEDULER_MAX_QUEUED_TURNS, on_queue_update=None):
+        self.default_max_in_flight = max_in_flight
+        self.max_queued_turns = max_queued_turns
+        self.on_queue_update = on_queue_update  # Called as on_queue_update(session_id, payload)
+        self._backends = {}
+        self._lock = threading.Lock()
+
+    def set_limit(self, backend, max_in_flight):
+        """Overrides the in-flight limit of one backend."""
+        with self._lock:
+            self._backend(backend).max_in_flight = max_in_flight
+            granted = self._grant_waiting(backend)
+        self._after_queue_change(backend, granted)
+
+    def queue_length(self):
+        with self._lock:
+            return sum(len(state.queue) for state in self._backends.values())
+
+    def is_saturated(self):
+        """True once the pending-turn queue has reached the admission threshold."""
+        return self.queue_length() >= self.max_queued_turns
+
+    def in_flight(self, backend):
+        with self._lock:
+            state = self._backends.get(backend)
+            return state.in_flight if state else 0
+
+    def load(self, backend):
+        """Generations running or waiting on a backend."""
+        with self._lock:
+            state = self._backends.get(backend)
+            return state.in_flight + len(state.queue) if state else 0
+
+    def limit(self, backend):
+        with self._lock:
+            state = self._backends.get(backend)
+            return state.max_in_flight if state else self.default_max_in_flight
+
+    def acquire(self, backend, session_id, is_alive=None):
+        """Blocks until a generation slot on the backend is free.
+
+        Returns False (holding no slot) if is_alive() turns false while queued.
+        """
+        waiter = self._enqueue(backend, session_id, None)
+        if waiter is None:
+            return True
+        while not waiter._event.wait(QUEUE_POLL_SECONDS):
+            if is_alive is not None and not is_alive():
+                self._abandon(backend, waiter)
+                return False
+        return True
+
+    async def acquire_async(self, backend, session_id, is_alive=None):
+        """Coroutine version of acquire() for the asyncio execution mode."""
+        waiter = self._enqueue(backend, session_id, asyncio.get_running_loop())
+        if waiter is None:
+            return True
+        while True:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter._future), QUEUE_POLL_SECONDS)
+                return True
+            except asyncio.TimeoutError:
+                if is_alive is not None and not is_alive():
+                    self._abandon(backend, waiter)
+                    return False
+
+    def release(self, backend, turn_seconds=None):
+        """Frees a slot, records how long the turn held it and admits the next queued turn."""
+        with self._lock:
+            state = self._backend(backend)
+            state.in_flight = max(0, state.in_flight - 1)
+            if turn_seconds is not None:
+                if state.avg_turn_seconds is None:
+                    state.avg_turn_seconds = turn_seconds
+                else:
+                    state.avg_turn_seconds = 0.8 * state.avg_turn_seconds + 0.2 * turn_seconds
+            granted = self._grant_waiting(backend)
+        self._after_queue_change(backend, granted)
+
+    def _backend(self, backend):
+        state = self._backends.get(backend)
+        if state is None:
+            state = _Backend(self.default_max_in_flight)
+            self._backends[backend] = state
+        return state
+
+    def _enqueue(self, backend, session_id, loop):
+        with self._lock:
+            state = self._backend(backend)
+            if state.in_flight < state.max_in_flight and not state.queue:
+                state.in_flight += 1
+                return None
+            waiter = _Waiter(session_id, loop)
+            state.queue.append(waiter)
+        # Only the newcomer's position changed
+        self._after_queue_change(backend, [], only=waiter)
+        return waiter
+
+    def _abandon(self, backend, waiter):
+        with self._lock:
+            state = self._backend(backend)
+            if waiter.granted:
+                # Slot was handed over while we gave up; pass it on
+                state.in_flight = max(0, state.in_flight - 1)
+            else:
+                try:
+                    state.queue.remove(waiter)
+                except ValueError:
+                    pass
+            granted = self._grant_waiting(backend)
+        self._after_queue_change(backend, granted)
+
+    def _grant_waiting(self, backend):
+        """Hands free slots to queued turns in FIFO order. Must be called with the lock held."""
+        state = self._backend(backend)
+        granted = []
+        while state.queue and state.in_flight < state.max_in_flight:
+            waiter = state.queue.popleft()
+            waiter.granted = True
+            state.in_flight += 1
+            granted.append(waiter)
+        return granted
+
+    def _after_queue_change(self, backend, granted, only=None):
+        for waiter in granted:
+            waiter.wake()
+        if self.on_queue_update is None:
+            return
+        with self._lock:
+            state = self._backend(backend)
+            avg_turn_seconds = state.avg_turn_seconds or INITIAL_TURN_SECONDS
+            max_in_flight = max(1, state.max_in_flight)
+            updates = [
+                (waiter.session_id, {
+                    "queued": True,
+                    "position": position,
+                    "estimated_wait_seconds": round(math.ceil(position / max_in_flight) * avg_turn_seconds, 1),
+                })
+                for position, waiter in enumerate(state.queue, start=1)
+                if only is None or waiter is only
+            ]
+        for waiter in granted:
+            self.on_queue_update(waiter.session_id, {"queued": False, "position": 0, "estimated_wait_seconds": 0})
+        for session_id, payload in updates:
+            self.on_queue_update(session_id, payload)
@@ -0,0 +1,187 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# Bounded in-memory store for debate sessions. Sessions that have been idle for
+# SESSION_IDLE_TTL_SECONDS are dropped, and once there are more than SESSION_MAX_COUNT
+# sessions or their transcripts exceed SESSION_MAX_BYTES, the least recently used ones are
+# evicted. Pinned sessions (a debate or evaluation still running) are never evicted.
+# The store is a dict-like drop-in for the former module-level `sessions` dict; `in`, get()
+# and [] only look at memory. With a loader (see persistence.py) it only holds hot sessions:
+# load() brings an evicted session back from durable storage, and is called where a client
+# names a session (connecting, routes taking a session_id), never on hot paths.
+
+SESSION_IDLE_TTL_SECONDS = float(os.environ.get("SESSION_IDLE_TTL_SECONDS", "7200"))
+SESSION_MAX_COUNT = int(os.environ.get("SESSION_MAX_COUNT", "1000"))
+SESSION_MAX_BYTES = int(os.environ.get("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))  # Approximate, see estimate_session_bytes
+SESSION_SWEEP_INTERVAL_SECONDS = 60.0
+SESSION_OVERHEAD_BYTES = 512  # Rough fixed cost of a session's settings
+MESSAGE_OVERHEAD_BYTES = 80  # Rough cost of a slotted Message besides its text
+MESSAGE_STATS_BYTES = 640  # Rough cost of a message's generation stats dict
+
+def estimate_session_bytes(session_data):
+    """Approximate memory held by a session, dominated by its transcript."""
+    size = SESSION_OVERHEAD_BYTES
+    for msg in session_data.get('conversation', ()):
+        size += MESSAGE_OVERHEAD_BYTES + len(msg.text) + (MESSAGE_STATS_BYTES if msg.stats is not None else 0)
+    size += sum(len(line) for line in session_data.get('evaluation_transcript', ()))
+    summary = session_data.get('summary')
+    if summary:
+        size += len(summary['text'])
+    return size
+
+class SessionStore:
+    """Dict-like session store with idle expiry and LRU eviction of unpinned sessions."""
+
+    def __init__(self, lock_for, is_pinned, on_evict=None, loader=None, idle_ttl=SESSION_IDLE_TTL_SECONDS,
+                 max_sessions=SESSION_MAX_COUNT, max_bytes=SESSION_MAX_BYTES):
+        self.lock_for = lock_for  # lock_for(session_id) -> the app's lock for that session, held while evicting it
+        self.is_pinned = is_pinned  # is_pinned(session_data) -> True while the session must be kept
+        self.on_evict = on_evict  # Called as on_evict(session_id, session_data, reason) with the session's lock held
+        self.loader = loader  # loader(session_id) -> session_data or None, for sessions not in memory
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()  # session_id -> data, least recently used first
+        self._last_access = {}
+        self._items_lock = threading.Lock()
+        self._sweeper = None
+        self.evictions = {"idle": 0, "max_sessions": 0, "max_bytes": 0}
+        self.loads = 0  # Sessions brought back into memory by the loader
+        self.last_bytes = 0  # Estimated size of all sessions at the last sweep
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __getitem__(self, session_id):
+        session_data = self.get(session_id)
+        if session_data is None:
+            raise KeyError(session_id)
+        return session_data
+
+    def get(self, session_id, default=None):
+        with self._items_lock:
+            session_data = self._sessions.get(session_id)
+            if session_data is not None:
+                self._touch(session_id)
+                return session_data
+        return default
+
+    def load(self, session_id):
+        """Returns the session, loading it with the loader if it is not in memory; None if it is unknown."""
+        session_data = self.get(session_id)
+        return session_data if session_data is not None else self._load(session_id)
+
+    def _load(self, session_id):
+        if self.loader is None or session_id is None:
+            return None
+        session_data = self.loader(session_id)
+        if session_data is None:
+            return None
+        with self._items_lock:
+            existing = self._sessions.get(session_id)
+            if existing is not None:
+                return existing
+            self._sessions[session_id] = session_data
+            self._touch(session_id)
+            self.loads += 1
+        self._ensure_sweeper()
+        return session_data
+
+    def __setitem__(self, session_id, session_data):
+        with self._items_lock:
+            self._sessions[session_id] = session_data
+            self._touch(session_id)
+        self._ensure_sweeper()
+
+    def __delitem__(self, session_id):
+        with self._items_lock:
+            del self._sessions[session_id]
+            self._last_access.pop(session_id, None)
+
+    def keys(self):
+        with self._items_lock:
+            return list(self._sessions.keys())
+
+    def values(self):
+        with self._items_lock:
+            return list(self._sessions.values())
+
+    def items(self):
+        with self._items_lock:
+            return list(self._sessions.items())
+
+    def _touch(self, session_id):
+        self._sessions.move_to_end(session_id)
+        self._last_access[session_id] = time.monotonic()
+
+    def sweep(self):
+        """Evicts idle sessions, then least recently used ones until the count and size caps hold."""
+        now = time.monotonic()
+        for session_id, session_data in self.items():
+            if now - self._last_access.get(session_id, now) > self.idle_ttl:
+                self._evict(session_id, session_data, "idle")
+
+        entries = self.items()  # Least recently used first
+        sizes = {session_id: estimate_session_bytes(session_data) for session_id, session_data in entries}
+        total_bytes = sum(sizes.values())
+        count = len(entries)
+        for session_id, session_data in entries:
+            if count <= self.max_sessions and total_bytes <= self.max_bytes:
+                break
+            if self._evict(session_id, session_data, "max_sessions" if count > self.max_sessions else "max_bytes"):
+                count -= 1
+                total_bytes -= sizes[session_id]
+        self.last_bytes = total_bytes
+
+    def _evict(self, session_id, session_data, reason):
+        """Evicts a session unless it is pinned; returns True if it was evicted."""
+        # Under the session's lock, so no debate can start on it while it is being evicted
+        with self.lock_for(session_id):
+            if self.is_pinned(session_data):
+                return False
+            with self._items_lock:
+                if self._sessions.get(session_id) is not session_data:
+                    return False
+                del self._sessions[session_id]
+                self._last_access.pop(session_id, None)
+                self.evictions[reason] += 1
+            if self.on_evict is not None:
+                self.on_evict(session_id, session_data, reason)
+        return True
+
+    def stats(self):
+        with self._items_lock:
+            sessions_count = len(self._sessions)
+            pinned_count = sum(1 for session_data in self._sessions.values() if self.is_pinned(session_data))
+        return {
+            "sessions": sessions_count,
+            "pinned_sessions": pinned_count,
+            "estimated_bytes": self.last_bytes,
+            "evictions": dict(self.evictions),
+            "loads": self.loads,
+            "limits": {"idle_ttl_seconds": self.idle_ttl, "max_sessions": self.max_sessions, "max_bytes": self.max_bytes},
+        }
+
+    def _ensure_sweeper(self):
+        """Starts the periodic sweep with the first session; a cap overshoot also triggers an immediate sweep."""
+        if self._sweeper is None:
+            with self._items_lock:
+                if self._sweeper is None:
+                    self._sweeper = threading.Thread(target=self._sweep_forever, daemon=True)
+                    self._sweeper.start()
+        if len(self._sessions) > self.max_sessions:
+            # Caller may hold a session lock, so sweep from another thread
+            threading.Thread(target=self.sweep, daemon=True).start()
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(SESSION_SWEEP_INTERVAL_SECONDS)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Session sweep failed: {e}")
@@ -33,6 +33,18 @@ document.addEventListener('DOMContentLoaded', function() {
     const forPosition = document.getElementById('for-position');
     const againstPosition = document.getElementById('against-position');
     const maxTurnsInput = document.getElementById('max-turns-input'); // Get the new input
+    const thoughtModeSelect = document.getElementById('thought-mode-select');
+    const numPredictInput = document.getElementById('num-predict-input');
+    const showStatsCheckbox = document.getElementById('show-stats-checkbox');
+    const MODEL_LOAD_BADGE_MS = 500; // Load times above this mean the turn waited for a cold model
+
+    // Generation stats badges are a display preference of this browser
+    showStatsCheckbox.checked = localStorage.getItem('llm_debate_show_stats') !== 'false';
+    conversation.classList.toggle('hide-generation-stats', !showStatsCheckbox.checked);
+    showStatsCheckbox.addEventListener('change', function() {
+        localStorage.setItem('llm_debate_show_stats', showStatsCheckbox.checked);
+        conversation.classList.toggle('hide-generation-stats', !showStatsCheckbox.checked);
+    });
     
     // Typing indicators
     const forTyping = document.getElementById('for-typing');
@@ -91,6 +103,67 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Store active streaming messages
     let activeStreamingMessages = {};
+
+    // Sync cursor: the highest message seq shown and the conversation epoch it belongs to.
+    // Reconnects and history fetches send it so the server only returns missed messages.
+    let lastSeq = 0;
+    let conversationEpoch = null;
+    let conversationEtag = null;
+
+    function updateSyncCursor() {
+        if (conversationEpoch === null) {
+            delete queryParams.since;
+            delete queryParams.epoch;
+        } else {
+            queryParams.since = lastSeq;
+            queryParams.epoch = conversationEpoch;
+        }
+        socket.io.opts.query = queryParams; // Used by the next (re)connection
+    }
+
+    function noteMessageSeq(seq) {
+        if (seq !== undefined && seq > lastSeq) {
+            lastSeq = seq;
+            updateSyncCursor();
+        }
+    }
+
+    function clearConversation() {
+        conversation.innerHTML = '';
+        lastSeq = 0;
+        conversationEpoch = null;
+        conversationEtag = null;
+        updateSyncCursor();
+    }
+
+    // Shows a batch of synced messages; a full batch replaces the conversation
+    function applyConversationSync(data) {
+        const messages = data.messages || [];
+        if (data.full) {
+            conversation.innerHTML = '';
+            activeStreamingMessages = {};
+            lastSeq = 0;
+        }
+        conversationEpoch = data.epoch;
+        updateSyncCursor();
+
+        const missedMessages = messages.filter(msg => msg.seq === undefined || msg.seq > lastSeq);
+        if (missedMessages.length === 0) return;
+        console.log(data.full ? 'Restoring conversation history, messages:' : 'Syncing missed messages:', missedMessages.length);
+        missedMessages.forEach(msg => noteMessageSeq(msg.seq));
+
+        // Faster animation for restored messages
+        missedMessages.forEach((msg, index) => {
+            setTimeout(() => {
+                addMessageToDisplay(msg);
+                // Scroll to bottom after all messages are added
+                if (index === missedMessages.length - 1) {
+                    isNearBottom = true;
+                    smartScroll();
+                }
+            }, index * 50);
+        });
+    }
     
     // Track if user is scrolled to bottom
     let isNearBottom = true;
@@ -130,73 +203,98 @@ document.addEventListener('DOMContentLoaded', function() {
         // Store session ID in localStorage for persistence
         localStorage.setItem('llm_debate_socketio_id', sessionId);
         
+        if (data.max_debate_turns) {
+            maxTurnsInput.max = data.max_debate_turns;
+            document.getElementById('max-turns-limit').textContent = data.max_debate_turns;
+        }
         if (data.max_turns !== undefined) {
             maxTurnsInput.value = data.max_turns;
         }
+        if (data.thought_mode) {
+            thoughtModeSelect.value = data.thought_mode;
+        }
+        if (data.max_num_predict) {
+            numPredictInput.max = data.max_num_predict;
+        }
+        if (data.num_predict) {
+            numPredictInput.value = data.num_predict;
+        }
         // Don't automatically load history since we'll get it from the server
         isInitialLoad = false;
     });
     
-    // Handle receiving conversation history (for refreshed sessions)
+    // Handle receiving conversation history (for refreshed sessions and reconnects)
     socket.on('conversation_history', function(data) {
-        if (data.messages && data.messages.length > 0) {
-            // Clear existing conversation first to prevent duplicates
-            conversation.innerHTML = '';
-            
-            console.log('Restoring conversation history, messages:', data.messages.length);
-            
-            // Ensure proper message ordering by creating an array of delayed functions
-            const messageFunctions = [];
-            
-            // Create a function for each message with its own delay
-            data.messages.forEach((msg, index) => {
-                const delay = index * 50;  // Faster animation for restored messages
-                messageFunctions.push({
-                    func: () => addMessageToDisplay(msg),
-                    delay: delay,
-                    index: index
-                });
-            });
-            
-            // Execute all message functions in order
-            messageFunctions.forEach((item) => {
-                setTimeout(() => {
-                    item.func();
-                    // Scroll to bottom after all messages are added
-                    if (item.index === data.messages.length - 1) {
-                        isNearBottom = true;
-                        smartScroll();
-                    }
-                }, item.delay);
-            });
+        applyConversationSync(data);
+    });
+
+    // Messages recorded without streaming (the opening prompt, system notices)
+    socket.on('new_message', function(data) {
+        if (data.seq !== undefined && data.seq <= lastSeq) return;
+        noteMessageSeq(data.seq);
+        addMessageToDisplay(data);
+    });
+
+    // A streamed message was stored; its seq advances the cursor and its stats get a badge
+    socket.on('message_saved', function(data) {
+        noteMessageSeq(data.seq);
+        if (data.stats) {
+            const messageDiv = conversation.querySelector(`[data-message-id="${CSS.escape(data.message_id)}"]`);
+            if (messageDiv) setMessageStats(messageDiv, data.stats);
         }
     });
+
+    function formatDuration(ms) {
+        return ms < 1000 ? `${ms} ms` : `${(ms / 1000).toFixed(1)} s`;
+    }
+
+    // Compact badge: decode speed and time to first token; a model load is called out
+    function setMessageStats(messageDiv, stats) {
+        let badge = messageDiv.querySelector('.generation-stats');
+        if (!badge) {
+            badge = document.createElement('span');
+            badge.className = 'generation-stats';
+            messageDiv.appendChild(badge);
+        }
+        const parts = [];
+        const details = [stats.model];
+        if (stats.cached) {
+            parts.push('cached');
+            details.push('replayed from the generation cache');
+        } else {
+            if (stats.tokens_per_second != null) parts.push(`${stats.tokens_per_second} tok/s`);
+            if (stats.ttft_ms != null) parts.push(`${formatDuration(stats.ttft_ms)} to first token`);
+            if (stats.load_ms != null && stats.load_ms >= MODEL_LOAD_BADGE_MS) parts.push(`model load ${formatDuration(stats.load_ms)}`);
+            if (stats.truncated) parts.push(`cut off at the ${stats.truncated} limit`);
+            if (stats.backend) details.push(`on ${stats.backend}`);
+            if (stats.prompt_tokens != null) details.push(`${stats.prompt_tokens} prompt tokens in ${formatDuration(stats.prompt_ms || 0)}`);
+            if (stats.tokens != null) details.push(`${stats.tokens} tokens in ${formatDuration(stats.eval_ms || 0)}`);
+            if (stats.total_ms != null) details.push(`${formatDuration(stats.total_ms)} total`);
+        }
+        badge.textContent = parts.join(' · ');
+        badge.title = details.join(', ');
+        badge.classList.toggle('model-load', !stats.cached && stats.load_ms != null && stats.load_ms >= MODEL_LOAD_BADGE_MS);
+    }
     
-    // Load conversation history from the server
+    // Fetch messages missed since the last sync (a 304 means nothing changed)
     function loadConversationHistory() {
         if (!sessionId) return;
         
-        fetch(`/api/conversation?session_id=${sessionId}`)
-            .then(response => response.json())
+        let url = `/api/conversation?session_id=${encodeURIComponent(sessionId)}`;
+        if (conversationEpoch !== null) {
+            url += `&since=${lastSeq}&epoch=${conversationEpoch}`;
+        } else {
+            url += '&since=0';
+        }
+        const headers = conversationEtag ? { 'If-None-Match': conversationEtag } : {};
+        fetch(url, { headers: headers })
+            .then(response => {
+                if (response.status === 304) return null;
+                conversationEtag = response.headers.get('ETag');
+                return response.json();
+            })
             .then(data => {
-                if (data.length > 0) {
-                    // Clear existing messages first to prevent duplicates
-                    conversation.innerHTML = '';
-                    
-                    // Set short delay between messages for animation
-                    let delay = 0;
-                    data.forEach((msg, index) => {
-                        delay += 100;
-                        setTimeout(() => {
-                            addMessageToDisplay(msg);
-                            // If this is the last message, ensure we're scrolled to the bottom
-                            if (index === data.length - 1) {
-                                isNearBottom = true; // Force scroll to bottom after loading history
-                                smartScroll();
-                            }
-                        }, delay);
-                    });
-                }
+                if (data) applyConversationSync(data);
             })
             .catch(error => console.error('Error loading conversation history:', error));
     }
@@ -236,11 +334,9 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
     
-    // Handle streaming message updates
-    socket.on('stream_message', function(data) {
-        const { speaker, message: chunk_text, message_id, done } = data;
+    // Returns the element state of a message being streamed, creating it on its first event
+    function getStreamingMessage(speaker, message_id) {
         let msgData = activeStreamingMessages[message_id];
-    
         if (!msgData) {
             isNearBottom = isScrolledNearBottom();
             const messageDiv = createMessageElement(speaker, "", message_id);
@@ -256,8 +352,33 @@ document.addEventListener('DOMContentLoaded', function() {
             activeStreamingMessages[message_id] = msgData;
             smartScroll();
         }
+        return msgData;
+    }
+
+    // In "status" thought mode the server strips <think> blocks and only reports when one starts or ends
+    socket.on('thinking', function(data) {
+        const msgData = getStreamingMessage(data.speaker, data.message_id);
+        msgData.isCurrentlyThinking = data.thinking;
+        msgData.thinkingSpan.style.display = data.thinking ? 'inline-flex' : 'none';
+        if (!data.thinking) {
+            msgData.contentSpan.style.display = 'inline';
+        }
+        smartScroll();
+    });
+
+    // Handle streaming message updates
+    socket.on('stream_message', function(data) {
+        const { speaker, message: chunk_text, message_id, done, thoughts } = data;
+        const msgData = getStreamingMessage(speaker, message_id);
     
+        // Only streams in the "show" thought mode carry <think> blocks (flagged by the server,
+        // since the select may have been changed after the stream started); otherwise the text is already clean
         let processText = chunk_text;
+        if (!thoughts && processText.length > 0) {
+            msgData.fullText += processText;
+            msgData.contentSpan.textContent = msgData.fullText;
+            processText = "";
+        }
     
         while (processText.length > 0) {
             if (msgData.isCurrentlyThinking) {
@@ -303,6 +424,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 msgData.contentSpan.style.display = 'inline';
             }
             msgData.contentSpan.textContent = msgData.fullText; 
+            // A reply cut off before any text is replaced by a system note
+            if (!msgData.fullText.trim()) msgData.element.remove();
             delete activeStreamingMessages[message_id];
         }
     });
@@ -364,6 +487,7 @@ document.addEventListener('DOMContentLoaded', function() {
     
     function addMessageToDisplay(data) {
         const messageDiv = createMessageElement(data.speaker, data.message);
+        if (data.stats) setMessageStats(messageDiv, data.stats);
         conversation.appendChild(messageDiv);
         
         // Smart scroll for new messages
@@ -403,6 +527,29 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    // Show queue position while this session's turn waits for a free model slot
+    socket.on('queue_status', function(data) {
+        if (!isDebateActive) return;
+        if (data.queued) {
+            const eta = data.estimated_wait_seconds ? ` ~${Math.ceil(data.estimated_wait_seconds)}s` : '';
+            statusText.textContent = `Queued (#${data.position}${eta})`;
+        } else {
+            statusText.textContent = 'Active';
+        }
+    });
+
+    // Report Ollama instance start-up progress while the server initializes them in the background
+    socket.on('backend_status', function(data) {
+        if (isDebateActive) return;
+        const statuses = Object.values(data.backends || {});
+        const readyCount = statuses.filter(status => status === 'ready').length;
+        if (data.initializing) {
+            statusText.textContent = `Starting models (${readyCount}/${statuses.length} ready)`;
+        } else {
+            statusText.textContent = 'Idle';
+        }
+    });
+
     // Handle global model operation status updates
     socket.on('long_ollama_operation_status', function(data) { // Renamed event
         isGloballyOperatingOllama = data.is_active; // Renamed property
@@ -437,7 +584,7 @@ document.addEventListener('DOMContentLoaded', function() {
         const settingsAreEditable = !isDebateActive && !isGloballyOperatingOllama;
         settingsToggleBtn.disabled = isDebateActive; // Disable settings toggle if debate active
 
-        [forModelSelect, againstModelSelect, maxTurnsInput].forEach(select => { // Add maxTurnsInput here
+        [forModelSelect, againstModelSelect, maxTurnsInput, thoughtModeSelect, numPredictInput].forEach(select => { // Add maxTurnsInput here
             select.disabled = !settingsAreEditable;
         });
 
@@ -684,8 +831,9 @@ document.addEventListener('DOMContentLoaded', function() {
             startBtn.innerHTML = originalText;
             return;
         }
-        if (isNaN(numExchanges) || numExchanges < 1 || numExchanges > 5) {
-            alert("Please enter a valid number of exchanges (1-5).");
+        const maxExchanges = parseInt(maxTurnsInput.max, 10);
+        if (isNaN(numExchanges) || numExchanges < 1 || numExchanges > maxExchanges) {
+            alert(`Please enter a valid number of exchanges (1-${maxExchanges}).`);
             maxTurnsInput.focus();
             startBtn.innerHTML = originalText;
             return;
@@ -698,12 +846,18 @@ document.addEventListener('DOMContentLoaded', function() {
                 session_id: sessionId,
                 for_model: selectedForModel,
                 against_model: selectedAgainstModel,
-                max_turns: numExchanges // Send max_turns
+                max_turns: numExchanges, // Send max_turns
+                thought_mode: thoughtModeSelect.value,
+                // Length limit of each debater turn; the server clamps it to its hard cap
+                ...(numPredictInput.value ? { options: { num_predict: parseInt(numPredictInput.value, 10) } } : {})
             })
         })
             .then(response => response.json())
             .then(data => {
                 console.log('Start response:', data);
+                if (data.status === 'error') {
+                    alert(data.message);
+                }
                 startBtn.innerHTML = originalText;
             })
             .catch(error => {
@@ -748,7 +902,7 @@ document.addEventListener('DOMContentLoaded', function() {
             .then(response => response.json())
             .then(data => {
                 console.log('Reset response:', data);
-                conversation.innerHTML = ''; // Clear conversation display
+                clearConversation(); // Clear conversation display and sync cursor
                 resetBtn.innerHTML = originalText;
             })
             .catch(error => {
@@ -801,7 +955,7 @@ document.addEventListener('DOMContentLoaded', function() {
             } else {
                 console.log('Topic set:', data);
                 // Clear any existing conversation
-                conversation.innerHTML = '';
+                clearConversation();
                 topicInput.value = '';
             }
             setTopicBtn.innerHTML = originalText;
@@ -822,6 +976,8 @@ document.addEventListener('DOMContentLoaded', function() {
             if (!socket.connected) {
                 console.log("Socket disconnected, attempting to reconnect");
                 socket.connect();
+            } else {
+                loadConversationHistory(); // Catch up on anything missed while hidden
             }
         }
     });
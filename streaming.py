@@ -0,0 +1,154 @@
+import os
+import time
+import threading
+
+# Helpers for the token streaming pipeline between Ollama and the Socket.IO clients.
+
+# Coalescing window for 'stream_message' emits. Chunks are batched until this many
+# milliseconds have passed since the first buffered chunk, or the buffer reaches
+# STREAM_FLUSH_MAX_CHARS. Set STREAM_FLUSH_INTERVAL_MS=0 to emit every chunk.
+STREAM_FLUSH_INTERVAL_MS = float(os.environ.get("STREAM_FLUSH_INTERVAL_MS", "40"))
+STREAM_FLUSH_MAX_CHARS = int(os.environ.get("STREAM_FLUSH_MAX_CHARS", "512"))
+
+class ChunkCoalescer:
+    """Buffers streamed text and decides when it should be flushed as one emit.
+
+    add() returns the text to emit once the time window or size limit is reached
+    (or immediately when force=True, e.g. on the final 'done' chunk), otherwise None.
+    """
+
+    __slots__ = ("interval", "max_chars", "_parts", "_size", "_window_start")
+
+    def __init__(self, interval_ms=None, max_chars=None):
+        interval_ms = STREAM_FLUSH_INTERVAL_MS if interval_ms is None else interval_ms
+        self.interval = interval_ms / 1000.0
+        self.max_chars = STREAM_FLUSH_MAX_CHARS if max_chars is None else max_chars
+        self._parts = []
+        self._size = 0
+        self._window_start = 0.0
+
+    def add(self, text, force=False):
+        if text:
+            if not self._parts:
+                self._window_start = time.monotonic()
+            self._parts.append(text)
+            self._size += len(text)
+        if force or self._size >= self.max_chars or (self._parts and time.monotonic() - self._window_start >= self.interval):
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Returns all buffered text (possibly empty) and resets the buffer."""
+        text = "".join(self._parts)
+        self._parts = []
+        self._size = 0
+        return text
+
+    def has_pending(self):
+        return bool(self._parts)
+
+# What reaches the client of a reasoning model's <think> blocks, per session:
+#   "show"   - stream the raw text, thoughts included (the browser hides them)
+#   "status" - strip thoughts and send a 'thinking' event when a block starts or ends
+#   "drop"   - strip thoughts silently
+THOUGHT_MODES = ("show", "status", "drop")
+THOUGHT_MODE = os.environ.get("THOUGHT_MODE", "status")
+if THOUGHT_MODE not in THOUGHT_MODES:
+    THOUGHT_MODE = "status"
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+def _partial_tag_length(text, tag):
+    """Length of the longest suffix of text that is a proper prefix of tag."""
+    for length in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+class ThoughtFilter:
+    """Incrementally removes <think>...</think> blocks from streamed text.
+
+    feed() returns the visible part of a chunk. A tag split across chunks is held back until
+    the next chunk decides it, and an unclosed block runs to the end of the stream, matching
+    context_window.strip_thoughts. `thinking` tells whether the stream is inside a block.
+    """
+
+    __slots__ = ("thinking", "_held", "_visible")
+
+    def __init__(self):
+        self.thinking = False
+        self._held = ""
+        self._visible = []
+
+    def feed(self, text):
+        text = self._held + text
+        self._held = ""
+        visible = []
+        while text:
+            tag = THINK_CLOSE if self.thinking else THINK_OPEN
+            index = text.find(tag)
+            if index == -1:
+                held = _partial_tag_length(text, tag)
+                if not self.thinking:
+                    visible.append(text[:len(text) - held])
+                self._held = text[len(text) - held:]
+                break
+            if not self.thinking:
+                visible.append(text[:index])
+            text = text[index + len(tag):]
+            self.thinking = not self.thinking
+        visible_text = "".join(visible)
+        if visible_text:
+            self._visible.append(visible_text)
+        return visible_text
+
+    def finish(self):
+        """Returns the held-back text once the stream has ended (it was not a tag after all)."""
+        held, self._held = self._held, ""
+        if self.thinking or not held:
+            return ""
+        self._visible.append(held)
+        return held
+
+    def clean_text(self):
+        """Everything visible so far, trimmed like strip_thoughts."""
+        return "".join(self._visible).strip()
+
+class CancelToken:
+    """Cancellation of one in-flight generation, observed by its streaming loop.
+
+    cancel() may be called from any thread. It records why and when, then runs the abort
+    callback the streaming loop registered with on_abort(), which drops the upstream
+    connection so a reader waiting for Ollama's next chunk wakes up at once.
+    """
+
+    __slots__ = ("reason", "cancelled_at", "_abort", "_lock")
+
+    def __init__(self):
+        self.reason = None
+        self.cancelled_at = None
+        self._abort = None
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self.reason is not None
+
+    def cancel(self, reason):
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            self.cancelled_at = time.monotonic()
+            abort = self._abort
+        if abort is not None:
+            abort()
+
+    def on_abort(self, abort):
+        """Registers the abort callback; it runs at once if the token is already cancelled."""
+        with self._lock:
+            self._abort = abort
+            cancelled = self.reason is not None
+        if cancelled:
+            abort()
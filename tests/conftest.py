@@ -0,0 +1,4 @@
+import os
+
+# Tests that import app keep their sessions in memory instead of writing debates.sqlite3
+os.environ.setdefault("SESSION_STORE_BACKEND", "memory")
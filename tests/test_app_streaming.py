@@ -0,0 +1,78 @@
+import pytest
+
+import app
+
+@pytest.fixture
+def session_id():
+    session_id = "test-session"
+    app.sessions[session_id] = app.new_session_data()
+    yield session_id
+    del app.sessions[session_id]
+    app.generation_tokens.pop(session_id, None)
+
+def test_turn_of_a_stopped_debate_is_cancelled_before_it_starts(session_id, monkeypatch):
+    app.sessions[session_id]['active'] = False  # Stopped after the turn's request was built
+    monkeypatch.setattr(app.scheduler, "acquire", lambda *args: pytest.fail("took a generation slot"))
+    assert app.stream_generation(session_id, "For", "http://ollama:11434", "/api/chat", {"model": "m"}, "msg") == ("", "", None)
+    assert session_id not in app.generation_tokens
+
+def test_debate_token_of_an_active_debate_is_live(session_id):
+    app.sessions[session_id]['active'] = True
+    assert not app.open_cancel_token(session_id, "debate").cancelled
+    app.sessions[session_id]['active'] = False
+    assert not app.open_cancel_token(session_id, "evaluation").cancelled  # The verdict outlives the debate
+
+def stream(session_id, budget):
+    stream = app.GenerationStream(session_id, "For", "http://ollama:11434", {"model": "m"}, "msg", "Error", app.CancelToken())
+    stream.budget = budget
+    return stream
+
+def test_stream_is_cut_off_at_the_token_cap(session_id):
+    generation = stream(session_id, app.GenerationBudget(max_seconds=0, max_tokens=2))
+    for word in ("one ", "two ", "three "):
+        generation.feed({"response": word})
+        if generation.ended:
+            break
+    assert generation.truncated == "tokens"
+    text, clean, stats = generation.result()
+    assert text == "one two three " and stats["truncated"] == "tokens"
+    assert app.cut_off_note("The For side", clean, stats) is None
+
+def test_stream_that_times_out_before_any_token_leaves_a_note(session_id):
+    generation = stream(session_id, app.GenerationBudget(max_seconds=5, max_tokens=0))
+    generation.budget.expire(lambda: None)  # The deadline timer fired while no chunk arrived
+    generation.finish()
+    text, clean, stats = generation.result()
+    assert (text, stats["truncated"]) == ("", "time")
+    assert app.cut_off_note("The For side", clean, stats) == "The For side gave no reply before the time limit cut it off."
+
+def test_empty_cut_off_turn_is_recorded_as_a_system_note(session_id, monkeypatch):
+    monkeypatch.setattr(app, "prewarm_evaluator", lambda: None)
+    monkeypatch.setattr(app.runtime, "start_evaluation", lambda session_id: None)
+    app.sessions[session_id].update(active=True, max_turns=1)
+    steps, emitted = app.debate_steps(session_id), []
+    step = next(steps)
+    while True:
+        if step[0] == "emit":
+            emitted.append(step[1:3])
+        try:
+            step = steps.send(("", "", {"model": "m", "truncated": "time"}) if step[0] == "stream" else None)
+        except StopIteration:
+            break
+    notes = [payload['message'] for event, payload in emitted if event == 'new_message' and payload['speaker'] == "System"]
+    assert sorted(notes) == ["The Against side gave no reply before the time limit cut it off.",
+                             "The For side gave no reply before the time limit cut it off."]
+    assert [msg.role for msg in app.sessions[session_id]['conversation']] == [app.Role.HUMAN, app.Role.SYSTEM, app.Role.SYSTEM]
+
+@pytest.mark.parametrize("mode, message, thoughts", [
+    ("show", "<think>hm</think>Cats.", True),
+    ("status", "Cats.", None),
+    ("drop", "Cats.", None),
+])
+def test_stream_payload_carries_the_sessions_thought_mode(session_id, mode, message, thoughts):
+    app.sessions[session_id]['thought_mode'] = mode
+    generation = stream(session_id, app.GenerationBudget(max_seconds=0, max_tokens=0))
+    app.sessions[session_id]['thought_mode'] = "show" if mode != "show" else "drop"  # Changed mid-stream
+    events = generation.feed({"response": "<think>hm</think>Cats.", "done": True})
+    payloads = [payload for event, payload in events if event == 'stream_message']
+    assert [(payload['message'], payload.get('thoughts')) for payload in payloads] == [(message, thoughts)]
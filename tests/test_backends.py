@@ -0,0 +1,73 @@
+import time
+
+from backends import BackendRegistry
+from scheduler import GenerationScheduler
+
+MODEL = "gemma3:4b"
+
+def make_registry(*names):
+    sched = GenerationScheduler(max_in_flight=1)
+    registry = BackendRegistry(sched)
+    for name in names:
+        registry.register(name, f"http://{name}:11434").models = {MODEL, "qwen3:4b"}
+    return registry, sched
+
+def load(backend, model):
+    backend.loaded_models[model] = time.monotonic() + 300
+
+def test_busy_instance_loses_to_an_idle_one():
+    registry, sched = make_registry("a", "b")
+    for _ in range(4):
+        sched._enqueue("http://b:11434", "busy", None)
+    assert registry.pick(MODEL) == "http://a:11434"
+
+def test_faster_instance_is_preferred():
+    registry, sched = make_registry("a", "b")
+    registry.get("a").tokens_per_second = 10.0
+    registry.get("b").tokens_per_second = 40.0
+    assert registry.pick(MODEL) == "http://b:11434"
+
+def test_instances_without_the_model_are_skipped():
+    registry, sched = make_registry("a", "b")
+    registry.get("a").models = {"qwen3:4b"}
+    assert registry.pick(MODEL) == "http://b:11434"
+    assert registry.pick("llama3:8b", "http://a:11434") == "http://a:11434"  # Nobody has it: keep the preference
+
+def test_unavailable_instances_are_skipped():
+    registry, sched = make_registry("a", "b")
+    registry.get("a").tokens_per_second = 10.0
+    registry.get("b").tokens_per_second = 40.0
+    registry.mark_unhealthy("http://b:11434")
+    assert registry.pick(MODEL) == "http://a:11434"
+    registry.mark_healthy("http://b:11434")
+    assert registry.pick(MODEL) == "http://b:11434"
+
+def test_warm_instance_wins_over_a_cold_idle_one():
+    registry, sched = make_registry("a", "b")
+    load(registry.get("b"), MODEL)
+    assert registry.pick(MODEL) == "http://b:11434"
+
+def test_busy_warm_instance_loses_to_a_cold_idle_one():
+    registry, sched = make_registry("a", "b")
+    load(registry.get("b"), MODEL)
+    for _ in range(4):
+        sched._enqueue("http://b:11434", "busy", None)
+    assert registry.pick(MODEL) == "http://a:11434"
+
+def test_loading_that_evicts_a_model_costs_its_reload():
+    registry, sched = make_registry("a", "b")
+    load(registry.get("a"), "qwen3:4b")  # Loading on a would push qwen out
+    assert registry.get("a").evictions(MODEL, time.monotonic()) == ["qwen3:4b"]
+    assert registry.pick(MODEL) == "http://b:11434"
+
+def test_preferred_instance_is_kept_within_the_affinity_margin():
+    registry, sched = make_registry("a", "b")
+    load(registry.get("a"), MODEL)
+    load(registry.get("b"), MODEL)
+    # a is slightly slower, but holds the side's chat prefix in its KV cache
+    registry.get("a").tokens_per_second = 20.0
+    registry.get("b").tokens_per_second = 24.0
+    assert registry.pick(MODEL) == "http://b:11434"
+    assert registry.pick(MODEL, "http://a:11434/") == "http://a:11434"
+    sched.acquire("http://a:11434", "running")  # Now a turn's worth slower: the turn moves
+    assert registry.pick(MODEL, "http://a:11434") == "http://b:11434"
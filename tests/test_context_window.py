@@ -0,0 +1,70 @@
+import pytest
+
+import app
+import context_window
+from context_window import debate_messages, fallback_summary, fold_point, recent_messages, strip_thoughts
+from messages import Message, Role
+
+LABELS = ("For Cats", "Against Cats")
+
+def conversation(*turns):
+    return [Message(seq, role, text, 1000.0 + seq) for seq, (role, text) in enumerate(turns, 1)]
+
+def turn(role, tokens):
+    """A turn estimated at the given (even) number of tokens."""
+    return role, "abcdefg " * (tokens // 2)
+
+def test_strip_thoughts_drops_closed_and_unclosed_blocks():
+    assert strip_thoughts("<think>plan</think> Cats win.") == "Cats win."
+    assert strip_thoughts("Cats win. <think>cut off mid-thought") == "Cats win."
+    assert strip_thoughts(None) == ""
+
+def test_debate_messages_skip_system_and_evaluator():
+    messages = debate_messages(conversation((Role.HUMAN, "Hi"), (Role.SYSTEM, "Note"), (Role.FOR, "Yes"), (Role.EVALUATOR, "Verdict")))
+    assert [(index, role) for index, role, _ in messages] == [(0, Role.HUMAN), (2, Role.FOR)]
+
+def test_recent_messages_keep_the_newest_that_fit():
+    turns = conversation(turn(Role.FOR, 40), turn(Role.AGAINST, 40), turn(Role.FOR, 40))
+    assert [index for index, _, _ in recent_messages(turns, 0, 85)] == [1, 2]
+    assert [index for index, _, _ in recent_messages(turns, 0, 10)] == [2]  # The latest always stays
+
+def test_no_fold_while_the_turns_fit():
+    turns = conversation(turn(Role.FOR, 40), turn(Role.AGAINST, 40))
+    assert fold_point(turns, 0, 100) is None
+
+def test_fold_leaves_recent_turns_at_the_ratio(monkeypatch):
+    monkeypatch.setattr(context_window, "RECENT_TOKEN_RATIO", 0.5)
+    turns = conversation(*(turn(Role.FOR if i % 2 else Role.AGAINST, 20) for i in range(8)))
+    # 160 tokens over a 100 budget: the newest 50 tokens' worth (two turns, the minimum kept) stay verbatim
+    assert fold_point(turns, 0, 100) == 6
+    # Once the summary covers the folded turns, the rest fits again
+    assert fold_point(turns, 6, 100) is None
+
+def test_fold_never_takes_the_latest_messages():
+    turns = conversation(turn(Role.FOR, 200), turn(Role.AGAINST, 200))
+    assert fold_point(turns, 0, 100) is None
+
+def test_fallback_summary_is_trimmed_to_the_summary_limit():
+    folded = debate_messages(conversation((Role.FOR, "x" * 500), (Role.AGAINST, "Dogs.")))
+    summary = fallback_summary("Earlier.", folded, LABELS)
+    assert summary.startswith("Earlier.\nFor Cats: " + "x" * 200) and summary.endswith("Against Cats: Dogs.")
+    assert len(fallback_summary("y" * 5000, folded, LABELS)) == context_window.SUMMARY_MAX_TOKENS * context_window.CHARS_PER_TOKEN
+
+@pytest.fixture
+def session_id():
+    session_id = "summary-session"
+    app.sessions[session_id] = app.new_session_data()
+    yield session_id
+    del app.sessions[session_id]
+
+def test_apply_summary_falls_back_when_generation_failed(session_id):
+    previous = app.sessions[session_id]['summary']
+    folded = debate_messages(conversation((Role.FOR, "Cats purr.")))
+    app.apply_summary(session_id, (previous, folded, 1, LABELS), "<think>hmm</think>")
+    assert app.sessions[session_id]['summary'] == {"text": "For Cats: Cats purr.", "covered": 1}
+
+def test_apply_summary_is_dropped_after_a_reset(session_id):
+    previous = app.sessions[session_id]['summary']
+    app.sessions[session_id]['summary'] = app.new_summary()  # Reset while the summary was generated
+    app.apply_summary(session_id, (previous, [], 4, LABELS), "Stale summary.")
+    assert app.sessions[session_id]['summary'] == app.new_summary()
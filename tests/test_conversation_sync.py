@@ -0,0 +1,41 @@
+import pytest
+
+import app
+from persistence import SQLiteBackend
+
+def stored_message(seq, text, clean=None):
+    return {'seq': seq, 'speaker': 'For Cats', 'message': text, 'clean': clean, 'stats': None, 'timestamp': 1000.0 + seq}
+
+@pytest.fixture
+def stored_session(tmp_path, monkeypatch):
+    backend = SQLiteBackend(str(tmp_path / "sessions.sqlite3"), flush_interval=60)
+    monkeypatch.setattr(app, "session_backend", backend)
+    backend.save_session('cold', {'flask_session_id': 'browser', 'topic': 'Cats', 'conversation_epoch': 2,
+                                  'for_position_label': 'For Cats', 'thought_mode': 'show'})
+    backend.append_message('cold', stored_message(1, "<think>hm</think>Cats win.", clean="Cats win."))
+    backend.append_message('cold', stored_message(2, "Still cats."))
+    yield 'cold'
+    backend.close()
+
+def get(query, **headers):
+    with app.app.test_client() as client:
+        return client.get('/api/conversation', query_string=query, headers=headers)
+
+def test_stored_session_is_served_without_loading_it(stored_session, monkeypatch):
+    monkeypatch.setattr(app.sessions, "load", lambda session_id: pytest.fail("session was loaded"))
+    body = get({'session_id': stored_session}).get_json()
+    assert [(entry['speaker'], entry['message']) for entry in body] == [
+        ('For Cats', "<think>hm</think>Cats win."), ('For Cats', "Still cats.")]
+    assert stored_session not in app.sessions
+
+def test_stored_session_sync_cursor_and_etag(stored_session):
+    response = get({'session_id': stored_session, 'since': 1, 'epoch': 2})
+    body = response.get_json()
+    assert (body['epoch'], body['last_seq'], body['full']) == (2, 2, False)
+    assert [entry['message'] for entry in body['messages']] == ["Still cats."]
+    assert get({'session_id': stored_session, 'since': 2, 'epoch': 2}, **{'If-None-Match': response.headers['ETag']}).status_code == 304
+
+def test_unknown_session_gets_the_cursor_shaped_payload(stored_session):
+    assert get({'session_id': 'nobody'}).get_json() == []
+    assert get({'session_id': 'nobody', 'since': 3, 'epoch': 1}).get_json() == {
+        "messages": [], "epoch": None, "last_seq": 0, "full": True}
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from generation_cache import GenerationCache, REPLAY_CHUNK_CHARS, areplay, cache_key, replay
+
+REQUEST = {"model": "m", "prompt": "Cats?", "options": {"seed": 7, "temperature": 0.5}, "stream": True, "keep_alive": "5m"}
+
+def test_key_ignores_transport_fields_and_key_order():
+    reordered = {"keep_alive": "1h", "options": {"temperature": 0.5, "seed": 7}, "prompt": "Cats?", "model": "m", "stream": False}
+    assert cache_key("/api/generate", REQUEST) == cache_key("/api/generate", reordered)
+
+@pytest.mark.parametrize("change", [
+    {"model": "other"}, {"prompt": "Dogs?"}, {"options": {"seed": 8, "temperature": 0.5}}, {"system": "Be brief."},
+])
+def test_key_changes_with_anything_that_shapes_the_reply(change):
+    assert cache_key("/api/generate", REQUEST) != cache_key("/api/generate", {**REQUEST, **change})
+
+def test_key_depends_on_the_endpoint():
+    assert cache_key("/api/generate", REQUEST) != cache_key("/api/chat", REQUEST)
+
+def test_replay_rebuilds_the_reply_in_ollama_shaped_chunks():
+    text = "x" * (REPLAY_CHUNK_CHARS * 2 + 3)
+    chunks = list(replay(text, pace=0))
+    assert "".join(chunk["response"] for chunk in chunks) == text
+    assert [chunk["done"] for chunk in chunks] == [False, False, False, True]
+    assert all(len(chunk["response"]) <= REPLAY_CHUNK_CHARS for chunk in chunks)
+
+def test_async_replay_matches_replay():
+    async def collect():
+        return [chunk async for chunk in areplay("Cats always win.", pace=0)]
+    assert asyncio.run(collect()) == list(replay("Cats always win.", pace=0))
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = GenerationCache(enabled=False, directory=str(tmp_path))
+    cache.put("key", "reply")
+    assert cache.get("key") is None and cache.counters["stores"] == 0
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = GenerationCache(enabled=True, max_entries=2, directory="")
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get("a")
+    cache.put("c", "C")
+    assert [cache.get(key) for key in ("a", "b", "c")] == ["A", None, "C"]
+    assert cache.stats()["memory_entries"] == 2
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    GenerationCache(enabled=True, directory=str(tmp_path)).put("ab12", "Cats win.")
+    cache = GenerationCache(enabled=True, directory=str(tmp_path))
+    assert cache.get("ab12") == "Cats win."
+    assert cache.get("ab12") == "Cats win."
+    assert (cache.counters["disk_hits"], cache.counters["memory_hits"]) == (1, 1)
+
+def test_empty_replies_are_not_cached():
+    cache = GenerationCache(enabled=True, directory="")
+    cache.put("key", "")
+    assert cache.get("key") is None and cache.stats()["hit_ratio"] == 0.0
+
+def test_corrupt_disk_entry_counts_as_a_miss(tmp_path):
+    cache = GenerationCache(enabled=True, directory=str(tmp_path))
+    cache.put("cd34", "reply")
+    with open(tmp_path / "cd" / "cd34.json", "w") as f:
+        f.write("{not json")
+    assert GenerationCache(enabled=True, directory=str(tmp_path)).get("cd34") is None
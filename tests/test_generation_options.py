@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+import generation_options
+from generation_options import GenerationBudget, parse_options, parse_request_options
+
+def test_parse_options_clamps_numbers_and_drops_the_rest():
+    options = parse_options({
+        "num_predict": 10**6, "num_ctx": 16, "temperature": "0.7", "seed": 42,
+        "top_k": 5, "stop": ["a", "b", "c", "d", "e"],
+    })
+    assert options == {
+        "num_predict": generation_options.NUMERIC_OPTIONS["num_predict"][2], "num_ctx": 256,
+        "temperature": 0.7, "seed": 42, "stop": ["a", "b", "c", "d"],
+    }
+
+@pytest.mark.parametrize("raw", [
+    {"num_predict": True}, {"temperature": "hot"}, {"num_ctx": None},
+    {"stop": []}, {"stop": ["ok", ""]}, {"stop": 3},
+])
+def test_parse_options_drops_malformed_values(raw):
+    assert parse_options(raw) == {}
+
+def test_parse_options_accepts_a_single_stop_string():
+    assert parse_options({"stop": "END"}) == {"stop": ["END"]}
+    assert parse_options(None) == {}
+
+def test_request_options_layer_shared_and_per_side_overrides():
+    overrides = parse_request_options({"options": {"temperature": 0.5}, "against_options": {"temperature": 1.5}})
+    assert overrides == {"for": {"temperature": 0.5}, "against": {"temperature": 1.5}}
+
+def test_budget_token_cap():
+    budget = GenerationBudget(max_seconds=0, max_tokens=3)
+    assert [budget.note_chunk() for _ in range(4)] == [None, None, None, "tokens"]
+    assert budget.seconds_left() is None
+
+def test_budget_time_cap():
+    budget = GenerationBudget(max_seconds=0.01, max_tokens=0)
+    assert budget.note_chunk() is None
+    time.sleep(0.02)
+    assert budget.seconds_left() == 0.0
+    assert budget.note_chunk() == "time"
+
+def test_budget_expire_aborts_the_response():
+    aborted = []
+    budget = GenerationBudget(max_seconds=5, max_tokens=0)
+    budget.expire(lambda: aborted.append(True))
+    assert budget.expired == "time" and aborted == [True]
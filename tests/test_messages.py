@@ -0,0 +1,28 @@
+from messages import Message, Role, role_for_speaker, speaker_label
+
+LABELS = ("For Cats", "Against Cats")
+
+def record(text, clean):
+    return Message(3, Role.FOR, text, 1000.0, clean).to_record(LABELS)
+
+def test_trimmed_reply_is_stored_once():
+    message = Message(3, Role.FOR, "\nCats win.  ", 1000.0, "Cats win.")
+    assert message.clean is message.text
+    assert record("\nCats win.  ", "Cats win.")["clean"] is None
+
+def test_reply_with_thoughts_keeps_its_clean_text():
+    assert record("<think>hm</think>\nCats win.", "Cats win.")["clean"] == "Cats win."
+    assert record("  <think>only thoughts</think>", "")["clean"] == ""
+
+def test_serialization_with_and_without_thoughts():
+    message = Message(3, Role.AGAINST, "<think>hm</think>Dogs.", 1000.0, "Dogs.", {"tokens": 4})
+    assert message.to_dict(LABELS) == {"seq": 3, "speaker": "Against Cats", "message": "<think>hm</think>Dogs.", "timestamp": 1000.0, "stats": {"tokens": 4}}
+    assert message.to_dict(LABELS, thoughts=False)["message"] == "Dogs."
+    restored = Message.from_dict(message.to_record(LABELS), LABELS)
+    assert (restored.role, restored.text, restored.clean, restored.stats) == (Role.AGAINST, message.text, "Dogs.", {"tokens": 4})
+
+def test_speakers_of_an_older_topic_keep_their_side():
+    assert role_for_speaker("Evaluator", LABELS) == Role.EVALUATOR
+    assert role_for_speaker("For Dogs", LABELS) == Role.FOR
+    assert role_for_speaker("Against Dogs", LABELS) == Role.AGAINST
+    assert speaker_label(Role.FOR, LABELS) == "For Cats"
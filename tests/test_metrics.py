@@ -0,0 +1,52 @@
+import app
+from metrics import CONTENT_TYPE, Registry
+
+def test_counter_renders_one_sample_per_label_set():
+    registry = Registry()
+    calls = registry.counter("calls_total", "Calls.", ("outcome",))
+    calls.inc(outcome="ok")
+    calls.inc(2, outcome="ok")
+    calls.inc(outcome="error")
+    assert registry.render() == (
+        '# HELP calls_total Calls.\n'
+        '# TYPE calls_total counter\n'
+        'calls_total{outcome="ok"} 3\n'
+        'calls_total{outcome="error"} 1\n'
+    )
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(1, 0.1))
+    for value in (0.05, 0.5, 0.5, 3):
+        latency.observe(value)
+    lines = registry.render().splitlines()
+    assert lines[1] == "# TYPE latency_seconds histogram"
+    assert lines[2:] == [
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        'latency_seconds_count 4',
+        'latency_seconds_sum 4.05',
+    ]
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter("odd_total", "Odd labels.", ("model",)).inc(model='a"b\\c\nd')
+    assert 'odd_total{model="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+def test_callback_is_read_at_scrape_time_and_failures_are_skipped():
+    registry = Registry()
+    values = {("for",): 1}
+    registry.callback("queued", "Queued.", lambda: values, ("side",))
+    registry.callback("broken", "Broken.", lambda: 1 / 0)
+    values[("against",)] = 2.5
+    assert registry.render().splitlines() == [
+        "# HELP queued Queued.", "# TYPE queued gauge", 'queued{side="for"} 1', 'queued{side="against"} 2.5',
+        "# HELP broken Broken.", "# TYPE broken gauge",
+    ]
+
+def test_metrics_endpoint_serves_the_exposition_format():
+    with app.app.test_client() as client:
+        response = client.get('/metrics')
+    assert response.status_code == 200 and response.content_type == CONTENT_TYPE
+    assert "# TYPE ollama_generations_total counter" in response.get_data(as_text=True)
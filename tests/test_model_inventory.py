@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+import model_inventory
+from backends import BackendRegistry
+from model_inventory import ModelInventory
+from scheduler import GenerationScheduler
+
+@pytest.fixture
+def listing(monkeypatch):
+    """Replaces the /api/tags call; set listing.models (or an exception) and count listing.calls."""
+    class Listing:
+        models = ["gemma3:4b"]
+        calls = 0
+        gate = None
+
+        def __call__(self, base_url):
+            self.calls += 1
+            if self.gate is not None:
+                self.gate.wait(5)
+            if isinstance(self.models, Exception):
+                raise self.models
+            return list(self.models)
+    listing = Listing()
+    monkeypatch.setattr(model_inventory.ollama_client, "list_models", listing)
+    return listing
+
+@pytest.fixture
+def inventory():
+    registry = BackendRegistry(GenerationScheduler(max_in_flight=1))
+    registry.register("a", "http://a:11434")
+    return ModelInventory(registry, ttl=60), registry.get("a")
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.005)
+
+def test_fresh_entry_is_served_from_the_cache(inventory, listing):
+    models, backend = inventory
+    assert models.get(backend) == ["gemma3:4b"]
+    listing.models = ["qwen3:4b"]
+    assert models.get(backend) == ["gemma3:4b"]
+    assert listing.calls == 1
+    assert backend.models == {"gemma3:4b"}  # The routing registry learns the list
+
+def test_refresh_bypasses_the_cache(inventory, listing):
+    models, backend = inventory
+    models.get(backend)
+    listing.models = ["gemma3:4b", "qwen3:4b"]
+    assert models.refresh(backend) == ["gemma3:4b", "qwen3:4b"]
+    assert models.get(backend) == ["gemma3:4b", "qwen3:4b"] and listing.calls == 2
+
+def test_expired_entry_is_served_while_one_background_refresh_runs(inventory, listing):
+    models, backend = inventory
+    models.get(backend)
+    models.invalidate(backend)
+    listing.models, listing.gate = ["qwen3:4b"], threading.Event()
+    assert [models.get(backend) for _ in range(3)] == [["gemma3:4b"]] * 3
+    listing.gate.set()
+    wait_until(lambda: models.get(backend) == ["qwen3:4b"])
+    assert listing.calls == 2
+
+def test_concurrent_first_fetches_share_one_request(inventory, listing):
+    models, backend = inventory
+    listing.gate = threading.Event()
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(models.get(backend))) for _ in range(3)]
+    for caller in callers:
+        caller.start()
+    wait_until(lambda: listing.calls == 1)
+    listing.gate.set()
+    for caller in callers:
+        caller.join(2)
+    assert results == [["gemma3:4b"]] * 3 and listing.calls == 1
+
+def test_failed_refresh_keeps_the_last_list(inventory, listing):
+    models, backend = inventory
+    models.get(backend)
+    listing.models = ConnectionError("refused")
+    assert models.refresh(backend) == ["gemma3:4b"]
+    assert backend.models == {"gemma3:4b"}
+
+def test_failed_first_fetch_returns_an_empty_list(inventory, listing):
+    models, backend = inventory
+    listing.models = ConnectionError("refused")
+    assert models.get(backend) == []
+    assert models.get(backend) == [] and listing.calls == 1  # Retried only after FAILED_REFRESH_RETRY_SECONDS
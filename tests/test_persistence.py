@@ -0,0 +1,134 @@
+import json
+import sqlite3
+import time
+
+import pytest
+
+from persistence import SQLiteBackend
+
+# messages table as first shipped, before seq, clean and stats
+BASELINE_SCHEMA = """
+CREATE TABLE sessions (
+    session_id TEXT PRIMARY KEY,
+    flask_session_id TEXT,
+    settings TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    speaker TEXT NOT NULL,
+    message TEXT NOT NULL,
+    timestamp REAL NOT NULL
+);
+"""
+
+def message(seq, text, clean=None, stats=None):
+    return {'seq': seq, 'speaker': 'For', 'message': text, 'clean': clean, 'stats': stats, 'timestamp': 1000.0 + seq}
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "sessions.sqlite3")
+
+@pytest.fixture
+def backend(db_path):
+    # A long flush interval keeps writes queued until a read or flush needs them
+    backend = SQLiteBackend(db_path, flush_interval=60)
+    yield backend
+    backend.close()
+
+def test_session_round_trip(backend):
+    backend.save_session('s1', {'flask_session_id': 'browser', 'topic': 'Cats'})
+    backend.append_message('s1', message(1, "<think>hm</think>Cats win.", clean="Cats win.", stats={"tokens": 3}))
+    backend.append_message('s1', message(2, "Dogs win."))
+    settings, messages = backend.load_session('s1')
+    assert settings == {'flask_session_id': 'browser', 'topic': 'Cats'}
+    assert [(m['seq'], m['message'], m['clean'], m['stats']) for m in messages] == [
+        (1, "<think>hm</think>Cats win.", "Cats win.", {"tokens": 3}),
+        (2, "Dogs win.", None, None),
+    ]
+    assert backend.load_session('unknown') is None
+
+def test_find_session_returns_the_browsers_latest_session(backend):
+    backend.save_session('old', {'flask_session_id': 'browser'})
+    time.sleep(0.01)
+    backend.save_session('new', {'flask_session_id': 'browser'})
+    backend.save_session('other', {'flask_session_id': 'someone-else'})
+    assert backend.find_session('browser') == 'new'
+    assert backend.find_session('nobody') is None
+
+def test_messages_since_and_clear(backend):
+    for seq in range(1, 5):
+        backend.append_message('s1', message(seq, f"turn {seq}"))
+    assert [m['seq'] for m in backend.get_messages('s1', since=2)] == [3, 4]
+    backend.clear_messages('s1')
+    assert backend.get_messages('s1') == []
+
+def test_settings_are_upserted(backend):
+    backend.save_session('s1', {'flask_session_id': 'browser', 'topic': 'Cats'})
+    backend.save_session('s1', {'flask_session_id': 'browser', 'topic': 'Dogs'})
+    assert backend.load_session('s1')[0]['topic'] == 'Dogs'
+
+def test_settings_and_last_seq_without_messages(backend):
+    backend.save_session('s1', {'flask_session_id': 'browser', 'topic': 'Cats'})
+    assert backend.last_seq('s1') == 0
+    for seq in range(1, 4):
+        backend.append_message('s1', message(seq, f"turn {seq}"))
+    assert backend.load_settings('s1') == {'flask_session_id': 'browser', 'topic': 'Cats'}
+    assert backend.last_seq('s1') == 3
+    assert backend.load_settings('unknown') is None
+
+def test_reads_only_wait_for_their_own_pending_writes(backend):
+    backend.save_session('busy', {'flask_session_id': 'b1'})
+    backend.append_message('busy', message(1, "queued"))
+    assert backend._pending['busy'] == 2 and backend._pending[('browser', 'b1')] == 1
+    # Nothing of 'idle' is queued, so reading it does not flush 'busy' out
+    assert backend.load_session('idle') is None
+    assert backend.find_session('b2') is None
+    assert backend._pending['busy'] == 2
+    assert backend.load_session('busy') is not None
+    assert not backend._pending
+
+def test_writer_commits_batches_larger_than_one_transaction(backend):
+    for seq in range(1, 601):
+        backend.append_message('s1', message(seq, "x"))
+    backend.flush()
+    assert len(backend.get_messages('s1')) == 600
+    assert not backend._pending
+
+def test_writes_survive_a_restart(db_path):
+    first = SQLiteBackend(db_path)
+    first.save_session('s1', {'flask_session_id': 'browser'})
+    first.append_message('s1', message(1, "kept"))
+    first.close()
+    second = SQLiteBackend(db_path)
+    assert second.find_session('browser') == 's1'
+    assert second.load_session('s1')[1][0]['message'] == "kept"
+
+def test_migrates_a_baseline_database(db_path):
+    connection = sqlite3.connect(db_path)
+    connection.executescript(BASELINE_SCHEMA)
+    connection.execute("INSERT INTO sessions VALUES ('s1', 'browser', ?, 1.0)", (json.dumps({'topic': 'Cats'}),))
+    connection.executemany("INSERT INTO messages (session_id, speaker, message, timestamp) VALUES (?, ?, ?, ?)", [
+        ('s1', 'For', "<think>plan</think>Cats win.", 1.0),
+        ('s2', 'For', "Other debate.", 2.0),
+        ('s1', 'Against', "Dogs win.", 3.0),
+    ])
+    connection.commit()
+    connection.close()
+
+    backend = SQLiteBackend(db_path)
+    columns = [row[1] for row in sqlite3.connect(db_path).execute("PRAGMA table_info(messages)")]
+    assert {'seq', 'clean', 'stats'} <= set(columns)
+    settings, messages = backend.load_session('s1')
+    assert settings == {'topic': 'Cats'}
+    # seq is numbered per session in insertion order; clean is filled where a block was removed
+    assert [(m['seq'], m['message'], m['clean'], m['stats']) for m in messages] == [
+        (1, "<think>plan</think>Cats win.", "Cats win.", None),
+        (2, "Dogs win.", None, None),
+    ]
+    assert [m['seq'] for m in backend.get_messages('s2')] == [1]
+    backend.append_message('s1', message(3, "New turn."))
+    assert [m['seq'] for m in backend.get_messages('s1', since=2)] == [3]
+    backend.close()
+    SQLiteBackend(db_path).close()  # Migrating again is a no-op
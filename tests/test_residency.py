@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from backends import BackendRegistry
+from residency import ResidencyManager, keep_alive_seconds
+from scheduler import GenerationScheduler
+
+DEBATER = "gemma3:4b"
+JUDGE = "qwen3:4b"
+
+@pytest.fixture
+def manager(monkeypatch):
+    registry = BackendRegistry(GenerationScheduler(max_in_flight=1))
+    for name in ("a", "b"):
+        registry.register(name, f"http://{name}:11434").models = {DEBATER, JUDGE}
+    manager = ResidencyManager(registry)
+    monkeypatch.setattr(manager, "refresh_stale", lambda: None)  # No /api/ps reads
+    return manager
+
+@pytest.mark.parametrize("keep_alive, seconds", [("30m", 1800), ("90", 90), ("1.5h", 5400), ("10s", 10), ("-1", None), ("soon", None)])
+def test_keep_alive_seconds(keep_alive, seconds):
+    assert keep_alive_seconds(keep_alive) == seconds
+
+def test_note_loaded_evicts_the_least_recently_used_model(manager):
+    backend = manager.registry.get("a")
+    backend.max_loaded_models = 2
+    for model in ("m1", "m2", "m1", "m3"):
+        manager.note_loaded(backend.base_url, model, "5m")
+    assert list(backend.loaded_models) == ["m1", "m3"]
+    assert backend.is_warm("m3", time.monotonic())
+    assert not backend.is_warm("m2", time.monotonic())
+
+def test_evaluator_is_placed_without_evicting_a_debate_model(manager):
+    manager.note_loaded("http://a:11434", DEBATER, "30m")
+    assert manager.place(JUDGE, {DEBATER}, "http://a:11434") == "http://b:11434"
+
+def test_warm_evaluator_stays_where_it_is_loaded(manager):
+    manager.note_loaded("http://a:11434", JUDGE, "10m")
+    manager.note_loaded("http://b:11434", DEBATER, "30m")
+    assert manager.place(JUDGE, {DEBATER}) == "http://a:11434"
+
+def test_eviction_cost(manager):
+    backend = manager.registry.get("a")
+    now = time.monotonic()
+    assert manager.eviction_cost(backend, JUDGE, {DEBATER}, now) == 1
+    manager.note_loaded(backend.base_url, DEBATER, "30m")
+    assert manager.eviction_cost(backend, DEBATER, {DEBATER}, now) == 0
+    assert manager.eviction_cost(backend, JUDGE, {DEBATER}, now) == 2
+    assert manager.eviction_cost(backend, JUDGE, set(), now) == 1
+
+def test_preload_in_flight_counts_as_resident(manager):
+    backend = manager.registry.get("a")
+    backend.preloading.add(DEBATER)
+    assert manager.eviction_cost(backend, DEBATER, set(), time.monotonic()) == 0
+    assert manager.eviction_cost(backend, JUDGE, {DEBATER}, time.monotonic()) == 2
+    assert not manager.preload(backend.base_url, DEBATER, "30m")  # Already loading
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import scheduler
+from scheduler import GenerationScheduler
+
+BACKEND = "http://ollama:11434"
+
+@pytest.fixture(autouse=True)
+def fast_poll(monkeypatch):
+    monkeypatch.setattr(scheduler, "QUEUE_POLL_SECONDS", 0.01)
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+def queue_turn(sched, session_id, granted, is_alive=None):
+    """Starts a thread that queues a turn and records the session once it holds a slot."""
+    def run():
+        if sched.acquire(BACKEND, session_id, is_alive):
+            granted.append(session_id)
+    thread = threading.Thread(target=run, daemon=True)
+    queued = sched.load(BACKEND)
+    thread.start()
+    wait_until(lambda: sched.load(BACKEND) > queued)
+    return thread
+
+def test_queued_turns_are_granted_in_fifo_order():
+    updates = []
+    sched = GenerationScheduler(max_in_flight=1, on_queue_update=lambda session_id, payload: updates.append((session_id, payload["position"])))
+    assert sched.acquire(BACKEND, "a")
+    granted = []
+    threads = [queue_turn(sched, session_id, granted) for session_id in ("b", "c", "d")]
+    assert ("b", 1) in updates and ("c", 2) in updates and ("d", 3) in updates
+    for expected in ("b", "c", "d"):
+        sched.release(BACKEND, 1.0)
+        wait_until(lambda: expected in granted)
+        assert sched.in_flight(BACKEND) == 1
+    for thread in threads:
+        thread.join(1)
+    assert granted == ["b", "c", "d"]
+    sched.release(BACKEND)
+    assert sched.load(BACKEND) == 0
+
+def test_abandoned_turn_leaves_the_queue():
+    sched = GenerationScheduler(max_in_flight=1)
+    assert sched.acquire(BACKEND, "a")
+    alive = {"b": True}
+    granted = []
+    queue_turn(sched, "b", granted, is_alive=lambda: alive["b"])
+    queue_turn(sched, "c", granted)
+    alive["b"] = False
+    wait_until(lambda: sched.load(BACKEND) == 2)  # a running, c queued
+    sched.release(BACKEND)
+    wait_until(lambda: granted == ["c"])
+    assert sched.in_flight(BACKEND) == 1 and sched.load(BACKEND) == 1
+
+def test_slot_granted_while_abandoning_is_passed_on():
+    sched = GenerationScheduler(max_in_flight=1)
+    assert sched.acquire(BACKEND, "a")
+    waiter = sched._enqueue(BACKEND, "b", None)
+    granted = []
+    queue_turn(sched, "c", granted)
+    sched.release(BACKEND)  # Hands the slot to b...
+    assert waiter.granted
+    sched._abandon(BACKEND, waiter)  # ...which gave up in the meantime
+    wait_until(lambda: granted == ["c"])
+    assert sched.in_flight(BACKEND) == 1
+
+def test_async_acquire_waits_for_release_and_can_be_abandoned():
+    async def run():
+        sched = GenerationScheduler(max_in_flight=1)
+        assert await sched.acquire_async(BACKEND, "a")
+        alive = {"b": True}
+        b = asyncio.create_task(sched.acquire_async(BACKEND, "b", lambda: alive["b"]))
+        c = asyncio.create_task(sched.acquire_async(BACKEND, "c"))
+        await asyncio.sleep(0.02)
+        assert sched.load(BACKEND) == 3
+        alive["b"] = False
+        assert await b is False
+        sched.release(BACKEND)
+        assert await asyncio.wait_for(c, 1) is True
+        assert sched.in_flight(BACKEND) == 1
+    asyncio.run(run())
+
+def test_raised_limit_admits_queued_turns():
+    sched = GenerationScheduler(max_in_flight=1)
+    assert sched.acquire(BACKEND, "a")
+    granted = []
+    queue_turn(sched, "b", granted)
+    sched.set_limit(BACKEND, 2)
+    wait_until(lambda: granted == ["b"])
+    assert sched.in_flight(BACKEND) == 2 and sched.limit(BACKEND) == 2
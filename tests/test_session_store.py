@@ -0,0 +1,72 @@
+import threading
+
+from session_store import SessionStore
+
+def new_session(pinned=False):
+    return {'conversation': [], 'evaluation_transcript': [], 'active': pinned}
+
+def make_store(**kwargs):
+    evicted = []
+    store = SessionStore(
+        lock_for=lambda session_id: threading.Lock(),
+        is_pinned=lambda session_data: session_data['active'],
+        on_evict=lambda session_id, session_data, reason: evicted.append((session_id, reason)),
+        **kwargs)
+    return store, evicted
+
+def test_lru_eviction_skips_pinned_sessions():
+    store, evicted = make_store(max_sessions=2)
+    store['running'] = new_session(pinned=True)  # Least recently used, but pinned
+    store['idle'] = new_session()
+    store['newest'] = new_session()
+    store.sweep()
+    assert 'running' in store and 'newest' in store and 'idle' not in store
+    assert evicted == [('idle', 'max_sessions')]
+    assert store.evictions['max_sessions'] == 1
+
+def test_pinned_sessions_stay_over_the_cap():
+    store, evicted = make_store(max_sessions=1)
+    store['a'] = new_session(pinned=True)
+    store['b'] = new_session(pinned=True)
+    store.sweep()
+    assert len(store) == 2 and evicted == []
+    assert store.stats()['pinned_sessions'] == 2
+
+def test_session_is_evictable_once_unpinned():
+    store, evicted = make_store(idle_ttl=0)
+    store['a'] = new_session(pinned=True)
+    store.sweep()
+    assert 'a' in store
+    store['a']['active'] = False
+    store.sweep()
+    assert 'a' not in store and evicted == [('a', 'idle')]
+
+def test_access_refreshes_lru_order():
+    store, evicted = make_store(max_sessions=2)
+    store['a'] = new_session()
+    store['b'] = new_session()
+    store.get('a')
+    store['c'] = new_session()
+    store.sweep()
+    assert 'a' in store and 'b' not in store
+
+def test_byte_cap_evicts_unpinned_sessions():
+    store, evicted = make_store(max_bytes=1000)
+    store['running'] = {**new_session(pinned=True), 'evaluation_transcript': ["x" * 600]}
+    store['done'] = {**new_session(), 'evaluation_transcript': ["x" * 600]}
+    store.sweep()
+    assert 'running' in store and evicted == [('done', 'max_bytes')]
+
+def test_lookups_stay_in_memory_and_load_uses_the_loader():
+    loaded = []
+    def loader(session_id):
+        loaded.append(session_id)
+        return new_session() if session_id == 'stored' else None
+    store, evicted = make_store(loader=loader)
+    assert 'stored' not in store
+    assert store.get('stored') is None
+    assert loaded == []
+    assert store.load('unknown') is None
+    assert store.load('stored') is not None
+    assert 'stored' in store and store.stats()['loads'] == 1
+    assert loaded == ['unknown', 'stored']
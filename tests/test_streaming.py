@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from context_window import strip_thoughts
+from streaming import ChunkCoalescer, ThoughtFilter, CancelToken
+
+def test_coalescer_flushes_at_size_limit():
+    coalescer = ChunkCoalescer(interval_ms=60000, max_chars=5)
+    assert coalescer.add("ab") is None
+    assert coalescer.has_pending()
+    assert coalescer.add("cde") == "abcde"
+    assert not coalescer.has_pending()
+
+def test_coalescer_force_and_empty_flush():
+    coalescer = ChunkCoalescer(interval_ms=60000, max_chars=512)
+    assert coalescer.add("tok") is None
+    assert coalescer.add("", force=True) == "tok"
+    assert coalescer.flush() == ""
+
+def test_coalescer_flushes_after_interval():
+    coalescer = ChunkCoalescer(interval_ms=10, max_chars=512)
+    assert coalescer.add("a") is None
+    time.sleep(0.02)
+    assert coalescer.add("b") == "ab"
+
+def test_coalescer_without_interval_emits_every_chunk():
+    coalescer = ChunkCoalescer(interval_ms=0, max_chars=512)
+    assert [coalescer.add(text) for text in ("a", "b")] == ["a", "b"]
+
+REPLY = "Opening. <think>weigh the\nrebuttal</think>Cats win.<think>again</think> Done."
+
+def stream(chunks):
+    """Feeds chunks through a ThoughtFilter; returns (visible text, filter)."""
+    thought_filter = ThoughtFilter()
+    visible = "".join(thought_filter.feed(chunk) for chunk in chunks)
+    return visible + thought_filter.finish(), thought_filter
+
+@pytest.mark.parametrize("split", range(1, len(REPLY)))
+def test_tags_split_at_any_chunk_boundary(split):
+    visible, thought_filter = stream([REPLY[:split], REPLY[split:]])
+    assert visible == "Opening. Cats win. Done."
+    assert thought_filter.clean_text() == strip_thoughts(REPLY)
+    assert not thought_filter.thinking
+
+def test_one_character_per_chunk():
+    visible, thought_filter = stream(list(REPLY))
+    assert visible == "Opening. Cats win. Done."
+    assert thought_filter.clean_text() == strip_thoughts(REPLY)
+
+def test_partial_tag_is_held_until_decided():
+    thought_filter = ThoughtFilter()
+    assert thought_filter.feed("Plain <th") == "Plain "
+    assert thought_filter.feed("ink>hidden") == ""
+    assert thought_filter.thinking
+    assert thought_filter.feed("</thi") == ""
+    assert thought_filter.feed("nk>shown") == "shown"
+    assert not thought_filter.thinking
+
+def test_held_text_that_is_not_a_tag_is_released_at_the_end():
+    thought_filter = ThoughtFilter()
+    assert thought_filter.feed("a < b and x <thin") == "a < b and x "
+    assert thought_filter.finish() == "<thin"
+    assert thought_filter.clean_text() == "a < b and x <thin"
+
+def test_unclosed_block_runs_to_the_end():
+    visible, thought_filter = stream(["Answer <think>never", " closed</th"])
+    assert visible == "Answer "
+    assert thought_filter.thinking
+    assert thought_filter.clean_text() == strip_thoughts("Answer <think>never closed</th")
+
+def test_cancel_token_runs_abort_once():
+    aborts = []
+    token = CancelToken()
+    token.on_abort(lambda: aborts.append(1))
+    token.cancel("stop")
+    token.cancel("reset")
+    assert token.cancelled and token.reason == "stop" and aborts == [1]
+
+def test_cancel_token_aborts_at_once_when_registered_late():
+    aborts = []
+    token = CancelToken()
+    token.cancel("disconnect")
+    token.on_abort(lambda: aborts.append(1))
+    assert aborts == [1]